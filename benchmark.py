@@ -0,0 +1,351 @@
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import multiprocessing
+import pathlib
+import random
+import resource
+import statistics
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable
+
+# Synthetic stand-ins, not saved pages: the NSE page is rendered from the
+# snapshot CSV, the document page and PDF are hand-built, and the Gemini
+# responses are canned. Timings track relative changes, not live-site cost.
+FIXTURES_DIR = pathlib.Path(__file__).parent / "bench_fixtures"
+NSE_HTML = FIXTURES_DIR / "nse_listed_companies.html"
+DOCUMENT_PAGE = FIXTURES_DIR / "document_page.html"
+SAMPLE_PDF = FIXTURES_DIR / "annual_report.pdf"
+GEMINI_RESPONSES = FIXTURES_DIR / "gemini_responses.jsonl"
+# The recorded listing harvest (3,480 reports).
+QUEUE_CSV = pathlib.Path(__file__).parent / "annual_reports_queue_20260108_102010.csv"
+
+# A regression is a stage whose p50 got this much slower than the baseline.
+DEFAULT_TOLERANCE = 0.25
+
+
+@dataclass
+class BenchResult:
+    """Timings of `repeat` runs of one stage, each over `items` items."""
+
+    stage: str
+    items: int
+    samples: list[float]
+    peak_rss_mb: float
+
+    @property
+    def p50(self) -> float:
+        return statistics.median(self.samples)
+
+    @property
+    def p95(self) -> float:
+        if len(self.samples) < 2:
+            return self.samples[0]
+        return statistics.quantiles(self.samples, n=20, method="inclusive")[-1]
+
+    @property
+    def throughput(self) -> float:
+        """Items per second over all runs."""
+        return self.items * len(self.samples) / sum(self.samples)
+
+    def summary(self) -> dict:
+        return {
+            "stage": self.stage,
+            "items": self.items,
+            "runs": len(self.samples),
+            "throughput": self.throughput,
+            "p50": self.p50,
+            "p95": self.p95,
+            "peak_rss_mb": self.peak_rss_mb,
+        }
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is in KiB on Linux.
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def measure(stage: str, items: int, run: Callable[[], None], repeat: int) -> BenchResult:
+    """Times `run` `repeat` times, after one untimed warm-up run."""
+    samples = []
+    # The code under test reports progress with print; keep it out of the timings.
+    with contextlib.redirect_stdout(io.StringIO()):
+        run()
+        for _ in range(repeat):
+            start = time.perf_counter()
+            run()
+            samples.append(time.perf_counter() - start)
+    return BenchResult(stage, items, samples, peak_rss_mb())
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    """/document/<n>/ serves the recorded document page, /files/<n>.pdf the sample PDF."""
+
+    def do_GET(self):
+        if self.path.startswith("/document/"):
+            body, content_type = DOCUMENT_PAGE.read_bytes(), "text/html; charset=utf-8"
+        elif self.path.startswith("/files/"):
+            body, content_type = SAMPLE_PDF.read_bytes(), "application/pdf"
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@contextlib.contextmanager
+def local_site():
+    """A local HTTP stand-in for africanfinancials.com and Drive; yields its base URL."""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FixtureHandler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_port}"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+# --- Stages. Each returns a BenchResult; imports are local so that a
+# stage run in its own process only loads what it uses.
+
+
+def bench_nse_parse(size: int, repeat: int, backend: str = "lxml") -> BenchResult:
+    from nse_listed_companies_extraction import parse_nse_data
+
+    html = NSE_HTML.read_text(encoding="utf-8")
+    companies = len(parse_nse_data(html, backend=backend))
+
+    def run():
+        for _ in range(size):
+            parse_nse_data(html, backend=backend)
+
+    stage = "nse_parse" if backend == "lxml" else f"nse_parse_{backend}"
+    return measure(stage, companies * size, run, repeat)
+
+
+def bench_nse_parse_soup(size: int, repeat: int) -> BenchResult:
+    return bench_nse_parse(size, repeat, backend="soup")
+
+
+def bench_title_filter(size: int, repeat: int) -> BenchResult:
+    from filter_annual_reports import filter_annual_reports
+
+    with tempfile.TemporaryDirectory() as tmp:
+        output_csv = f"{tmp}/cleaned.csv"
+        total, _ = filter_annual_reports(str(QUEUE_CSV), output_csv)
+
+        def run():
+            for _ in range(size):
+                filter_annual_reports(str(QUEUE_CSV), output_csv)
+
+        return measure("title_filter", total * size, run, repeat)
+
+
+def bench_iframe_resolve(size: int, repeat: int) -> BenchResult:
+    from iframe_resolver import resolve_with_http
+
+    with local_site() as base_url:
+        doc_urls = [f"{base_url}/document/{i}/" for i in range(size)]
+
+        def run():
+            links = asyncio.run(resolve_with_http(doc_urls, workers=16, rate=1e6))
+            assert all(links), "a document page did not resolve"
+
+        return measure("iframe_resolve", size, run, repeat)
+
+
+def bench_download(size: int, repeat: int) -> BenchResult:
+    from pdf_store import PdfStore, download_all
+
+    with local_site() as base_url, tempfile.TemporaryDirectory() as tmp:
+        reports = [(f"Report {i}", f"{base_url}/files/{i}.pdf") for i in range(size)]
+        runs = iter(range(repeat + 1))
+
+        def run():
+            # A fresh store each run, so every report is really downloaded.
+            store = PdfStore(f"{tmp}/{next(runs)}")
+            paths = asyncio.run(download_all(store, reports, workers=8))
+            assert all(paths), "a download failed"
+
+        return measure("download", size, run, repeat)
+
+
+def bench_name_clean(size: int, repeat: int) -> BenchResult:
+    import pandas as pd
+
+    from title_parser import parse_titles
+    from utils import clean_company_names
+
+    titles = pd.read_csv(QUEUE_CSV, dtype=str, keep_default_na=False)["title"]
+    # Title-style names, as they reach the joins with the NSE list.
+    companies = parse_titles(titles)["company"].dropna()
+    names = pd.Series(companies.tolist() * (size // len(companies) + 1)).head(size)
+
+    return measure("name_clean", size, lambda: clean_company_names(names), repeat)
+
+
+def canned_responses() -> list[str]:
+    return GEMINI_RESPONSES.read_text(encoding="utf-8").splitlines()
+
+
+def bench_validate(size: int, repeat: int) -> BenchResult:
+    from dataset_store import flatten_extraction
+    from schemas import FinancialReportExtraction
+
+    responses = canned_responses()
+    texts = [responses[i % len(responses)] for i in range(size)]
+
+    def run():
+        for text in texts:
+            flatten_extraction(FinancialReportExtraction.model_validate_json(text))
+
+    return measure("validate", size, run, repeat)
+
+
+def screening_universe(size: int):
+    """`size` company-years built from the canned responses, varied with a fixed seed."""
+    import pandas as pd
+
+    from dataset_store import NUMERIC_COLUMNS, flatten_extraction
+    from schemas import FinancialReportExtraction
+
+    templates = [
+        flatten_extraction(FinancialReportExtraction.model_validate_json(text))[0]
+        for text in canned_responses()
+    ]
+    rng = random.Random(0)
+    rows = []
+    for i in range(size):
+        row = dict(templates[i % len(templates)])
+        row["ticker"] = f"T{i // 10:04d}"
+        row["fiscal_year"] = 2015 + i % 10
+        for column in NUMERIC_COLUMNS:
+            if row[column] is not None:
+                row[column] *= rng.uniform(0.8, 1.2)
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+
+def bench_screening(size: int, repeat: int) -> BenchResult:
+    from normalization import normalize
+    from screening import DEFAULT_FILTERS, DEFAULT_RANKING, score_universe, screen
+
+    universe = screening_universe(size)
+
+    def run():
+        screen(score_universe(normalize(universe)), DEFAULT_FILTERS, DEFAULT_RANKING)
+
+    return measure("screening", size, run, repeat)
+
+
+# stage -> (benchmark, default size). Sizes are repetitions of the NSE page
+# and queue CSV, document pages, PDFs, responses and company-years.
+STAGES = {
+    "nse_parse": (bench_nse_parse, 20),
+    "nse_parse_soup": (bench_nse_parse_soup, 20),
+    "title_filter": (bench_title_filter, 1),
+    "iframe_resolve": (bench_iframe_resolve, 200),
+    "download": (bench_download, 50),
+    "name_clean": (bench_name_clean, 20000),
+    "validate": (bench_validate, 2000),
+    "screening": (bench_screening, 5000),
+}
+
+
+def run_stage(stage: str, repeat: int, size: int | None = None) -> BenchResult:
+    bench, default_size = STAGES[stage]
+    return bench(size or default_size, repeat)
+
+
+def run_isolated(stage: str, repeat: int, size: int | None = None) -> BenchResult:
+    """Runs a stage in a fresh process, so its peak RSS is its own."""
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+        return pool.submit(run_stage, stage, repeat, size).result()
+
+
+def regressions(
+    results: list[BenchResult], baseline: dict, tolerance: float = DEFAULT_TOLERANCE
+) -> list[str]:
+    """Stages whose p50 is more than `tolerance` slower than in `baseline`."""
+    slower = []
+    for result in results:
+        before = baseline.get(result.stage)
+        if before and result.p50 > before["p50"] * (1 + tolerance):
+            slower.append(
+                f"{result.stage}: p50 {before['p50'] * 1000:.1f}ms -> {result.p50 * 1000:.1f}ms"
+            )
+    return slower
+
+
+def print_table(results: list[BenchResult]):
+    print(
+        f"{'STAGE':<16} | {'ITEMS':>7} | {'ITEMS/S':>10} | {'P50 MS':>9} | {'P95 MS':>9} | {'PEAK RSS MB':>11}"
+    )
+    print("-" * 78)
+    for r in results:
+        print(
+            f"{r.stage:<16} | {r.items:>7} | {r.throughput:>10.1f} | {r.p50 * 1000:>9.1f} | "
+            f"{r.p95 * 1000:>9.1f} | {r.peak_rss_mb:>11.1f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark each pipeline stage offline against the recorded fixtures."
+    )
+    parser.add_argument("--stages", nargs="+", choices=list(STAGES), default=list(STAGES))
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per stage.")
+    parser.add_argument("--size", type=int, default=None, help="Override every stage's size.")
+    parser.add_argument(
+        "--in-process",
+        action="store_true",
+        help="Run all stages in this process (faster; peak RSS is then cumulative).",
+    )
+    parser.add_argument("--save", help="Write the results to this JSON file.")
+    parser.add_argument("--baseline", help="Fail if slower than the results in this JSON file.")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    args = parser.parse_args()
+
+    run = run_stage if args.in_process else run_isolated
+    results = []
+    for stage in args.stages:
+        print(f">>> Benchmarking {stage}...")
+        results.append(run(stage, args.repeat, args.size))
+
+    print()
+    print_table(results)
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump({r.stage: r.summary() | {"samples": r.samples} for r in results}, f, indent=2)
+        print(f"\n>>> Saved results to {args.save}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            slower = regressions(results, json.load(f), args.tolerance)
+        if slower:
+            print("\n>>> REGRESSIONS:")
+            for line in slower:
+                print(f"   -> {line}")
+            raise SystemExit(1)
+        print("\n>>> No regressions against the baseline.")
+
+
+if __name__ == "__main__":
+    main()
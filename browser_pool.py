@@ -0,0 +1,229 @@
+import asyncio
+from contextlib import asynccontextmanager, suppress
+from urllib.parse import urlsplit
+
+from playwright.async_api import Error as PlaywrightError
+from playwright.async_api import async_playwright
+from playwright.sync_api import sync_playwright
+
+from resilience import RetryPolicy
+
+# The scrapers only read DOM text and attributes, which none of these
+# change. Stylesheets stay allowed by default because the listing relies
+# on CSS visibility to tell real cards from hidden templates.
+BLOCKED_RESOURCE_TYPES = frozenset({"image", "media", "font"})
+# For pages where only an attribute matters (the document page's iframe src).
+ATTRIBUTE_ONLY_RESOURCE_TYPES = BLOCKED_RESOURCE_TYPES | {"stylesheet"}
+# Ads and analytics that the listing and document pages pull in.
+BLOCKED_HOSTS = (
+    "googletagmanager.com",
+    "google-analytics.com",
+    "doubleclick.net",
+    "googlesyndication.com",
+    "adservice.google.com",
+    "facebook.net",
+    "facebook.com",
+    "hotjar.com",
+)
+# Navigations one context serves before it is replaced, to cap memory.
+MAX_NAVIGATIONS = 50
+# Page loads time out after 60s, so a few attempts are plenty.
+BROWSER_RETRY_POLICY = RetryPolicy(attempts=3, base_delay=5.0)
+
+
+def _is_subframe(request) -> bool:
+    try:
+        return request.frame.parent_frame is not None
+    except Exception:
+        # Service worker requests have no frame.
+        return False
+
+
+def is_main_navigation(request) -> bool:
+    return request.is_navigation_request() and not _is_subframe(request)
+
+
+def should_block(
+    request,
+    blocked_types: frozenset[str] = BLOCKED_RESOURCE_TYPES,
+    block_subframes: bool = False,
+) -> bool:
+    """
+    Whether a request can be aborted without changing what the scraper
+    reads. With `block_subframes`, documents inside iframes (e.g. the Drive
+    preview behind #annual-report) aren't loaded; their src still is there.
+    """
+    if request.resource_type in blocked_types:
+        return True
+    host = urlsplit(request.url).hostname or ""
+    if any(host == blocked or host.endswith("." + blocked) for blocked in BLOCKED_HOSTS):
+        return True
+    return block_subframes and request.resource_type == "document" and _is_subframe(request)
+
+
+class _PooledContext:
+    def __init__(self, context):
+        self.context = context
+        self.page = None
+        self.navigations = 0
+
+
+class BrowserPool:
+    """
+    Headless browser contexts (one page each) shared by a scraper's
+    workers. Every context aborts images, fonts, media and ad/analytics
+    requests through route interception, and is closed and replaced after
+    `max_navigations` page loads (None = never) so memory stays flat on
+    long runs.
+
+        async with BrowserPool(size=4) as pool:
+            async with pool.page() as page:
+                await page.goto(url)
+
+    Pass an already launched `browser` to share it between pools; the pool
+    then leaves it open on exit.
+    """
+
+    def __init__(
+        self,
+        size: int = 4,
+        headless: bool = True,
+        blocked_types: frozenset[str] = BLOCKED_RESOURCE_TYPES,
+        block_subframes: bool = False,
+        max_navigations: int | None = MAX_NAVIGATIONS,
+        browser=None,
+        **context_options,
+    ):
+        self.size = size
+        self.headless = headless
+        self.blocked_types = blocked_types
+        self.block_subframes = block_subframes
+        self.max_navigations = max_navigations
+        self.browser = browser
+        self.context_options = context_options
+        self.recycled = 0
+        self._owns_browser = browser is None
+        self._playwright = None
+        self._idle: asyncio.Queue[_PooledContext] = asyncio.Queue()
+
+    async def __aenter__(self) -> "BrowserPool":
+        if self._owns_browser:
+            self._playwright = await async_playwright().start()
+            self.browser = await self._playwright.chromium.launch(headless=self.headless)
+        for _ in range(self.size):
+            self._idle.put_nowait(await self._new_context())
+        return self
+
+    async def __aexit__(self, *exc_info):
+        while not self._idle.empty():
+            await self._idle.get_nowait().context.close()
+        if self._owns_browser:
+            await self.browser.close()
+            await self._playwright.stop()
+
+    async def _new_context(self) -> _PooledContext:
+        pooled = _PooledContext(await self.browser.new_context(**self.context_options))
+
+        async def route(route):
+            if is_main_navigation(route.request):
+                pooled.navigations += 1
+            if should_block(route.request, self.blocked_types, self.block_subframes):
+                await route.abort()
+            else:
+                await route.continue_()
+
+        await pooled.context.route("**/*", route)
+        pooled.page = await pooled.context.new_page()
+        return pooled
+
+    def _worn_out(self, pooled: _PooledContext) -> bool:
+        if pooled.page.is_closed():
+            return True
+        return self.max_navigations is not None and pooled.navigations >= self.max_navigations
+
+    async def _recycle(self, pooled: _PooledContext) -> _PooledContext:
+        with suppress(PlaywrightError):
+            await pooled.context.close()
+        pooled = await self._new_context()
+        self.recycled += 1
+        return pooled
+
+    @asynccontextmanager
+    async def page(self):
+        """Borrows a page; waits while all `size` pages are in use."""
+        pooled = await self._idle.get()
+        try:
+            # Left worn out if replacing it failed last time (e.g. a crash).
+            if self._worn_out(pooled):
+                pooled = await self._recycle(pooled)
+            yield pooled.page
+        finally:
+            try:
+                if self._worn_out(pooled):
+                    pooled = await self._recycle(pooled)
+            finally:
+                # The slot always goes back, or waiting workers would hang.
+                self._idle.put_nowait(pooled)
+
+
+class SyncBrowserPage:
+    """
+    BrowserPool's blocking and recycling for the sync, one-page loops:
+    `page()` returns the current page, swapping in a fresh context once
+    it has served `max_navigations` page loads.
+    """
+
+    def __init__(
+        self,
+        headless: bool = True,
+        blocked_types: frozenset[str] = BLOCKED_RESOURCE_TYPES,
+        block_subframes: bool = False,
+        max_navigations: int | None = MAX_NAVIGATIONS,
+        **context_options,
+    ):
+        self.headless = headless
+        self.blocked_types = blocked_types
+        self.block_subframes = block_subframes
+        self.max_navigations = max_navigations
+        self.context_options = context_options
+        self.recycled = 0
+        self._pooled: _PooledContext | None = None
+
+    def __enter__(self) -> "SyncBrowserPage":
+        self._playwright = sync_playwright().start()
+        self.browser = self._playwright.chromium.launch(headless=self.headless)
+        return self
+
+    def __exit__(self, *exc_info):
+        self.browser.close()
+        self._playwright.stop()
+
+    def _new_context(self) -> _PooledContext:
+        pooled = _PooledContext(self.browser.new_context(**self.context_options))
+
+        def route(route):
+            if is_main_navigation(route.request):
+                pooled.navigations += 1
+            if should_block(route.request, self.blocked_types, self.block_subframes):
+                route.abort()
+            else:
+                route.continue_()
+
+        pooled.context.route("**/*", route)
+        pooled.page = pooled.context.new_page()
+        return pooled
+
+    def page(self):
+        pooled = self._pooled
+        if pooled is not None and (
+            pooled.page.is_closed()
+            or self.max_navigations is not None
+            and pooled.navigations >= self.max_navigations
+        ):
+            with suppress(PlaywrightError):
+                pooled.context.close()
+            self.recycled += 1
+            pooled = None
+        if pooled is None:
+            self._pooled = pooled = self._new_context()
+        return pooled.page
@@ -0,0 +1,199 @@
+import math
+import os
+import re
+from collections import defaultdict
+from dataclasses import dataclass
+from functools import lru_cache
+
+import pandas as pd
+
+from utils import clean_company_name, clean_company_names
+
+# Latest NSE list, refreshed by the pipeline's companies stage.
+COMPANIES_CSV = "nse_listed_companies.csv"
+# Dated scrape kept in the repo: the fallback before the first refresh, and
+# the reference copy the parser tests read.
+COMPANIES_SNAPSHOT_CSV = "nse_listed_companies_20260108_160702.csv"
+
+# nse_listed_companies_*.csv column -> master column.
+CSV_COLUMNS = {
+    "Symbol": "ticker",
+    "ISIN": "isin",
+    "Sector": "sector",
+    "Company": "listed_company_name",
+    "Exchange": "exchange",
+}
+
+# Legal-form words that vary between the NSE list, titles and the LLM
+# ("Ltd" / "Limited" / "PLC") and say nothing about which company it is.
+STOP_TOKENS = {
+    "ltd",
+    "limited",
+    "plc",
+    "the",
+    "of",
+    "co",
+    "company",
+    "corp",
+    "corporation",
+    "inc",
+    "ord",
+    "k",
+}
+TOKEN_ALIASES = {"&": "and", "ea": "east africa", "e a": "east africa"}
+NON_WORD = re.compile(r"[^a-z0-9&]+")
+# "B.O.C" -> "b o c" -> "boc"
+SPELLED_OUT = re.compile(r"\b(?:[a-z] )+[a-z]\b")
+ALIAS_PATTERN = re.compile(
+    r"\b(" + "|".join(re.escape(alias) for alias in TOKEN_ALIASES) + r")\b|(&)"
+)
+# "SKL.O0000", "SMWF.E0000" -> "SKL", "SMWF"
+TICKER_SUFFIX = re.compile(r"\.[A-Z]\d+$")
+
+# Weighted token overlap (0-1) a fuzzy match needs to count.
+MIN_MATCH_SCORE = 0.5
+
+
+@dataclass(frozen=True)
+class Company:
+    ticker: str
+    isin: str | None
+    name: str
+    sector: str | None
+    exchange: str | None
+
+
+def normalize_ticker(ticker: str | None) -> str | None:
+    if not ticker or not isinstance(ticker, str):
+        return None
+    return TICKER_SUFFIX.sub("", ticker.strip().upper())
+
+
+@lru_cache(maxsize=65536)
+def name_tokens(name: str) -> tuple[str, ...]:
+    """
+    "Car and General (K) Ltd" -> ("car", "and", "general")
+    "E.A.Cables PLC"          -> ("east", "africa", "cable")
+    """
+    text = clean_company_name(name).lower().replace("-", "").replace(".", " ")
+    text = NON_WORD.sub(" ", text)
+    text = ALIAS_PATTERN.sub(lambda m: TOKEN_ALIASES[m.group(0)], text)
+    text = SPELLED_OUT.sub(lambda m: m.group(0).replace(" ", ""), text)
+    # Crude plural folding: "Supermarkets" / "Supermarket".
+    return tuple(
+        token[:-1] if len(token) > 4 and token.endswith("s") else token
+        for token in text.split()
+        if token not in STOP_TOKENS
+    )
+
+
+def default_companies_csv() -> str:
+    """The refreshed list if the pipeline has written one, else the snapshot."""
+    return COMPANIES_CSV if os.path.exists(COMPANIES_CSV) else COMPANIES_SNAPSHOT_CSV
+
+
+def read_companies(companies_csv: str | None = None) -> pd.DataFrame:
+    """The NSE list with master column names and normalized tickers."""
+    companies = pd.read_csv(companies_csv or default_companies_csv()).rename(
+        columns=CSV_COLUMNS
+    )
+    companies["ticker"] = companies["ticker"].map(normalize_ticker)
+    return companies
+
+
+class CompanyMaster:
+    """
+    Listed companies indexed by ISIN, ticker, normalized name and name
+    token. A fuzzy lookup only scores companies sharing a token with the
+    query (a few postings lists), weighted by how rare each token is, so
+    it doesn't scan the whole list.
+    """
+
+    def __init__(self, companies: pd.DataFrame):
+        self.companies: list[Company] = []
+        self.by_isin: dict[str, Company] = {}
+        self.by_ticker: dict[str, Company] = {}
+        self.by_tokens: dict[tuple[str, ...], Company] = {}
+        self.postings: dict[str, set[int]] = defaultdict(set)
+        self.token_sets: list[frozenset[str]] = []
+
+        names = clean_company_names(companies["listed_company_name"])
+        for row, name in zip(companies.itertuples(index=False), names):
+            company = Company(
+                ticker=row.ticker,
+                isin=row.isin if isinstance(row.isin, str) and row.isin else None,
+                name=name,
+                sector=row.sector,
+                exchange=row.exchange,
+            )
+            i = len(self.companies)
+            self.companies.append(company)
+            if company.isin:
+                self.by_isin[company.isin] = company
+            self.by_ticker[company.ticker] = company
+
+            tokens = name_tokens(company.name)
+            self.by_tokens[tokens] = company
+            self.token_sets.append(frozenset(tokens))
+            for token in tokens:
+                self.postings[token].add(i)
+
+        # Rare tokens ("safaricom") identify a company; common ones ("bank") don't.
+        count = len(self.companies)
+        self.weights = {
+            token: math.log(1 + count / len(ids)) for token, ids in self.postings.items()
+        }
+
+    @classmethod
+    def from_csv(cls, companies_csv: str | None = None) -> "CompanyMaster":
+        return cls(read_companies(companies_csv))
+
+    def _weight(self, tokens) -> float:
+        # Tokens the master has never seen count as maximally rare.
+        unseen = math.log(1 + len(self.companies))
+        return sum(self.weights.get(token, unseen) for token in tokens)
+
+    def match_name(self, name: str) -> tuple[Company | None, float]:
+        """Best company for a free-text name and its score (1.0 = same tokens)."""
+        tokens = name_tokens(name)
+        exact = self.by_tokens.get(tokens)
+        if exact is not None:
+            return exact, 1.0
+
+        query = frozenset(tokens)
+        candidates = set().union(*(self.postings.get(token, ()) for token in query))
+        best, best_score = None, 0.0
+        for i in candidates:
+            shared = self._weight(query & self.token_sets[i])
+            score = shared / self._weight(query | self.token_sets[i])
+            if score > best_score:
+                best, best_score = self.companies[i], score
+        return best, best_score
+
+    def lookup(
+        self,
+        isin: str | None = None,
+        ticker: str | None = None,
+        name: str | None = None,
+        min_score: float = MIN_MATCH_SCORE,
+    ) -> Company | None:
+        """ISIN, then ticker, then a fuzzy name match above `min_score`."""
+        if isin and isin in self.by_isin:
+            return self.by_isin[isin]
+        ticker = normalize_ticker(ticker)
+        if ticker and ticker in self.by_ticker:
+            return self.by_ticker[ticker]
+        if name:
+            company, score = self.match_name(name)
+            if score >= min_score:
+                return company
+        return None
+
+    def tickers_for(self, names: pd.Series, min_score: float = MIN_MATCH_SCORE) -> pd.Series:
+        """Matches a column of names; each distinct name is looked up once."""
+        unique = names.dropna().unique()
+        matched = {}
+        for name in unique:
+            company = self.lookup(name=name, min_score=min_score)
+            matched[name] = company.ticker if company else None
+        return names.map(matched).astype("string")
@@ -0,0 +1,211 @@
+import argparse
+import json
+import os
+import pathlib
+import uuid
+from datetime import datetime, timezone
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from company_master import CompanyMaster, normalize_ticker, read_companies
+from schemas import (
+    BalanceSheetData,
+    CashFlowData,
+    FinancialReportExtraction,
+    IncomeStatementData,
+)
+from title_parser import parse_report
+
+DATASET_DIR = "financial_dataset"
+
+SECTIONS = {
+    "income_statement": IncomeStatementData,
+    "balance_sheet": BalanceSheetData,
+    "cash_flow": CashFlowData,
+}
+
+# income_statement.revenue, balance_sheet.total_assets, ...
+NUMERIC_COLUMNS = [
+    f"{section}.{name}" for section, model in SECTIONS.items() for name in model.model_fields
+]
+
+METADATA_FIELDS = [
+    ("ticker", pa.string()),
+    ("company_name", pa.string()),
+    ("currency_symbol", pa.string()),
+    ("scale", pa.string()),
+    ("is_comparative", pa.bool_()),
+    ("source_title", pa.string()),
+    ("document_url", pa.string()),
+    ("pdf_sha256", pa.string()),
+    ("extraction_source", pa.string()),
+    ("written_at", pa.timestamp("us", tz="UTC")),
+]
+
+# fiscal_year lives in the directory name (fiscal_year=2025/), not the files.
+SCHEMA = pa.schema(
+    METADATA_FIELDS + [(column, pa.float64()) for column in NUMERIC_COLUMNS]
+)
+TABLE_SCHEMA = SCHEMA.append(pa.field("fiscal_year", pa.int64()))
+PARTITIONING = ds.partitioning(pa.schema([("fiscal_year", pa.int64())]), flavor="hive")
+
+
+def flatten_extraction(
+    extraction: FinancialReportExtraction, metadata: dict | None = None
+) -> list[dict]:
+    """One flat row per fiscal period (current year, then comparative)."""
+    metadata = metadata or {}
+    written_at = datetime.now(timezone.utc)
+    ticker = metadata.get("ticker") or parse_report(
+        metadata.get("source_title"), metadata.get("document_url")
+    ).ticker
+
+    rows = []
+    for period in extraction.periods():
+        row = {
+            "ticker": ticker,
+            "company_name": extraction.company_name,
+            "fiscal_year": period.fiscal_year,
+            "currency_symbol": extraction.currency_symbol,
+            "scale": extraction.scale,
+            "is_comparative": period.fiscal_year != extraction.fiscal_year,
+            "source_title": metadata.get("source_title"),
+            "document_url": metadata.get("document_url"),
+            "pdf_sha256": metadata.get("pdf_sha256"),
+            "extraction_source": metadata.get("extraction_source"),
+            "written_at": written_at,
+        }
+        for section in SECTIONS:
+            for name, value in getattr(period, section).model_dump().items():
+                row[f"{section}.{name}"] = value
+        rows.append(row)
+    return rows
+
+
+def flatten_record(record: dict) -> list[dict]:
+    """Flattens one line of financial_data_extracted.jsonl."""
+    extraction = FinancialReportExtraction.model_validate(record)
+    return flatten_extraction(extraction, record)
+
+
+class FinancialDataset:
+    """
+    Flattened extractions as Parquet, partitioned by fiscal_year.
+
+    Each append writes new part files; compact() merges a partition's
+    parts into one file and drops superseded company-years. Reads only
+    touch the requested columns and partitions.
+    """
+
+    def __init__(self, root: str | os.PathLike = DATASET_DIR):
+        self.root = pathlib.Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def append(self, rows: list[dict]):
+        if not rows:
+            return
+        table = pa.Table.from_pylist(rows, schema=TABLE_SCHEMA)
+        pq.write_to_dataset(
+            table,
+            self.root,
+            partitioning=PARTITIONING,
+            basename_template=f"part-{uuid.uuid4().hex}-{{i}}.parquet",
+        )
+
+    def read(self, columns: list[str] | None = None, filter=None) -> pd.DataFrame:
+        """
+        Loads the dataset into pandas. `columns` limits the Parquet columns
+        read; `filter` is a pyarrow expression, e.g.
+        `ds.field("fiscal_year") >= 2020`, pushed down to skip partitions.
+        """
+        if not any(self.root.rglob("*.parquet")):
+            return pd.DataFrame(columns=columns or TABLE_SCHEMA.names)
+        dataset = ds.dataset(
+            self.root, format="parquet", schema=TABLE_SCHEMA, partitioning=PARTITIONING
+        )
+        return dataset.to_table(columns=columns, filter=filter).to_pandas()
+
+    def compact(self):
+        """Rewrites each partition as a single file with duplicates dropped."""
+        for partition in sorted(self.root.glob("fiscal_year=*")):
+            parts = sorted(partition.glob("*.parquet"))
+            if len(parts) <= 1:
+                continue
+
+            df = pq.read_table(parts, schema=SCHEMA).to_pandas()
+            df["fiscal_year"] = int(partition.name.split("=")[1])
+            df = deduplicate(df).drop(columns="fiscal_year")
+
+            compacted = partition / f"part-{uuid.uuid4().hex}-compacted.parquet"
+            # Readers skip "_" files; the old parts go only once it is complete.
+            tmp_path = partition / f"_{compacted.name}.tmp"
+            pq.write_table(
+                pa.Table.from_pandas(df, schema=SCHEMA, preserve_index=False),
+                tmp_path,
+            )
+            os.replace(tmp_path, compacted)
+            for part in parts:
+                part.unlink()
+
+    def import_jsonl(self, path: str | os.PathLike) -> int:
+        """Loads a financial_data_extracted.jsonl file; returns rows written."""
+        rows = []
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    rows.extend(flatten_record(json.loads(line)))
+        self.append(rows)
+        return len(rows)
+
+
+def deduplicate(df: pd.DataFrame) -> pd.DataFrame:
+    """Keeps one row per company-year: current-year over comparative, then newest."""
+    df = df.sort_values(["is_comparative", "written_at"], ascending=[False, True])
+    key = df["ticker"].fillna(df["company_name"])
+    return df.loc[~pd.concat([key, df["fiscal_year"]], axis=1).duplicated(keep="last")]
+
+
+def join_companies(df: pd.DataFrame, companies_csv: str | None = None) -> pd.DataFrame:
+    """
+    Adds ISIN, sector and listed company name from the NSE list. Rows whose
+    ticker isn't on the list (missing, or an old ticker like CFC for
+    Stanbic) are matched on company_name through the company master;
+    `listed_ticker` is the ticker the row was joined on.
+    """
+    master = CompanyMaster.from_csv(companies_csv)
+    listed_ticker = df["ticker"].map(normalize_ticker).astype("string")
+    if "company_name" in df:
+        unlisted = ~listed_ticker.isin(list(master.by_ticker))
+        listed_ticker = listed_ticker.where(
+            ~unlisted, master.tickers_for(df["company_name"].where(unlisted))
+        )
+
+    companies = read_companies(companies_csv).rename(columns={"ticker": "listed_ticker"})
+    companies["listed_ticker"] = companies["listed_ticker"].astype("string")
+    return df.assign(listed_ticker=listed_ticker).merge(
+        companies, on="listed_ticker", how="left"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage the Parquet financial dataset.")
+    parser.add_argument("--import-jsonl", help="Append extractions from a JSONL file.")
+    parser.add_argument("--compact", action="store_true", help="Merge part files.")
+    args = parser.parse_args()
+
+    dataset = FinancialDataset(DATASET_DIR)
+
+    if args.import_jsonl:
+        count = dataset.import_jsonl(args.import_jsonl)
+        print(f">>> Imported {count} rows from {args.import_jsonl}")
+
+    if args.compact:
+        dataset.compact()
+        print(f">>> Compacted {DATASET_DIR}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,85 +1,221 @@
+import argparse
+import asyncio
+import csv
+import json
 import os
 import time
 
-import pandas as pd
-from playwright.sync_api import sync_playwright
+from playwright.sync_api import Error as PlaywrightError
 
+from browser_pool import ATTRIBUTE_ONLY_RESOURCE_TYPES, BROWSER_RETRY_POLICY, SyncBrowserPage
+from iframe_resolver import resolve_download_urls
+from metrics import add_metrics_arguments, instrumented_run
+from resilience import CircuitOpenError, Resilience, endpoint
 from utils import convert_to_download_url
 
-
-def main():
-    input_csv = "annual_reports_queue_20260108_102010_cleaned.csv"
-    output_csv = "annual_reports_ready_for_ai.csv"
-
-    if os.path.exists(output_csv):
-        print(f">>> Resuming from existing progress file: {output_csv}")
-        df = pd.read_csv(output_csv)
-    else:
-        print(f">>> Starting fresh from: {input_csv}")
-        try:
-            df = pd.read_csv(input_csv)
-        except FileNotFoundError:
-            print(f"Error: {input_csv} not found.")
+INPUT_CSV = "annual_reports_queue_20260108_102010_cleaned.csv"
+OUTPUT_CSV = "annual_reports_ready_for_ai.csv"
+# Append-only document_url -> direct_download_url records, one per line.
+CHECKPOINT_PATH = "annual_reports_links.jsonl"
+
+
+class LinkCheckpoint:
+    """
+    Resolved links as append-only JSONL. Each link costs one appended line
+    the moment it is found, so a killed run loses at most the line being
+    written (skipped on replay) instead of everything since the last save.
+    """
+
+    def __init__(self, path: str | os.PathLike = CHECKPOINT_PATH):
+        self.path = path
+        self.links: dict[str, str] = {}
+
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    self.links[record["document_url"]] = record["direct_download_url"]
+
+    def __contains__(self, document_url: str) -> bool:
+        return document_url in self.links
+
+    def record(self, document_url: str, direct_download_url: str):
+        self.links[document_url] = direct_download_url
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(
+                json.dumps(
+                    {"document_url": document_url, "direct_download_url": direct_download_url}
+                )
+                + "\n"
+            )
+
+    def seed_from_csv(self, output_csv: str):
+        """Imports links from a progress CSV written before the checkpoint existed."""
+        if self.links or not os.path.exists(output_csv):
             return
-
-    # Create new columns if they don't exist
-    if "direct_download_url" not in df.columns:
-        df["direct_download_url"] = None
-
-    print(f">>> Processing {len(df)} reports...")
-
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=False)  # Use True for speed later
-        page = browser.new_page()
+        with open(output_csv, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                if row.get("direct_download_url"):
+                    self.record(row["document_url"], row["direct_download_url"])
+        print(f">>> Imported {len(self.links)} links from {output_csv}")
+
+
+def load_queue(input_csv: str, checkpoint: LinkCheckpoint) -> list[dict] | None:
+    try:
+        with open(input_csv, newline="", encoding="utf-8") as f:
+            rows = list(csv.DictReader(f))
+    except FileNotFoundError:
+        print(f"Error: {input_csv} not found.")
+        return None
+
+    done = sum(row["document_url"] in checkpoint for row in rows)
+    print(f">>> {input_csv}: {len(rows)} reports, {done} already resolved.")
+    return rows
+
+
+def write_output(rows: list[dict], checkpoint: LinkCheckpoint, output_csv: str):
+    """Writes the input rows plus their links once, at the end of a run."""
+    fieldnames = list(rows[0]) if rows else []
+    if "direct_download_url" not in fieldnames:
+        fieldnames.append("direct_download_url")
+
+    tmp_path = f"{output_csv}.tmp"
+    with open(tmp_path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames, lineterminator="\n")
+        writer.writeheader()
+        for row in rows:
+            writer.writerow(
+                {**row, "direct_download_url": checkpoint.links.get(row["document_url"])}
+            )
+    os.replace(tmp_path, output_csv)
+
+
+def main_concurrent(
+    workers: int,
+    rate: float,
+    input_csv: str = INPUT_CSV,
+    output_csv: str = OUTPUT_CSV,
+    checkpoint_path: str = CHECKPOINT_PATH,
+):
+    checkpoint = LinkCheckpoint(checkpoint_path)
+    checkpoint.seed_from_csv(output_csv)
+    rows = load_queue(input_csv, checkpoint)
+    if rows is None:
+        return
+
+    pending = [row["document_url"] for row in rows if row["document_url"] not in checkpoint]
+    print(f">>> Resolving {len(pending)} of {len(rows)} reports with {workers} workers...")
+
+    def on_found(index: int, link: str):
+        checkpoint.record(pending[index], link)
+        print(f"[{len(checkpoint.links)}/{len(rows)}] Found: {link}")
+
+    links = asyncio.run(
+        resolve_download_urls(pending, workers=workers, rate=rate, on_found=on_found)
+    )
+
+    write_output(rows, checkpoint, output_csv)
+    found = sum(link is not None for link in links)
+    print(f">>> Done! Resolved {found}/{len(pending)}. Saved to {output_csv}")
+
+
+def main_serial():
+    input_csv = INPUT_CSV
+    output_csv = OUTPUT_CSV
+
+    checkpoint = LinkCheckpoint(CHECKPOINT_PATH)
+    checkpoint.seed_from_csv(output_csv)
+    rows = load_queue(input_csv, checkpoint)
+    if rows is None:
+        return
+
+    print(f">>> Processing {len(rows)} reports...")
+
+    resilience = Resilience(policy=BROWSER_RETRY_POLICY)
+
+    with SyncBrowserPage(
+        blocked_types=ATTRIBUTE_ONLY_RESOURCE_TYPES, block_subframes=True
+    ) as browser:
+
+        def fetch_iframe_src(doc_url: str) -> str | None:
+            page = browser.page()
+            page.goto(doc_url, timeout=60000)
+
+            # Wait for the iframe to attach
+            iframe_locator = page.locator("#annual-report")
+            iframe_locator.wait_for(state="attached", timeout=60000)
+
+            # Extract SRC
+            return iframe_locator.get_attribute("src")
 
         # Iterate through rows
-        # We use iterrows for simplicity, though batch processing is faster for massive datasets
-        for index, row in df.iterrows():
+        for index, row in enumerate(rows):
             # Skip if we already have a link (allows restarting script)
             title = row["title"]
 
-            if pd.notna(row["direct_download_url"]):
-                print(f"[{index + 1}/{len(df)}] URL Already Fetched for: {title}")
+            if row["document_url"] in checkpoint:
+                print(f"[{index + 1}/{len(rows)}] URL Already Fetched for: {title}")
                 continue
 
-            print(f"[{index + 1}/{len(df)}] Fetching URL for: {title}")
+            print(f"[{index + 1}/{len(rows)}] Fetching URL for: {title}")
 
             doc_url = row["document_url"]
 
+            # Timeouts and browser errors are retried with backoff
             try:
-                page.goto(doc_url, timeout=60000)
-
-                # Wait for the iframe to attach
-                iframe_locator = page.locator("#annual-report")
-                iframe_locator.wait_for(state="attached", timeout=60000)
-
-                # Extract SRC
-                raw_drive_url = iframe_locator.get_attribute("src")
-
-                # Convert to direct link
-                direct_link = convert_to_download_url(raw_drive_url)
-
-                if direct_link:
-                    print(f"    -> Found: {direct_link}")
-                    df.at[index, "direct_download_url"] = direct_link
-
-                    # Save progress every 5 rows to be safe
-                    if index % 5 == 0:
-                        df.to_csv(output_csv, index=False)
-                else:
-                    print("    -> ERROR: Could not extract ID.")
+                raw_drive_url = resilience.call_sync(
+                    endpoint(doc_url), fetch_iframe_src, doc_url
+                )
+            except (PlaywrightError, CircuitOpenError) as e:
+                print(f"    -> FAILED: {e}")
+                continue
 
-                time.sleep(5)
+            # Convert to direct link
+            direct_link = convert_to_download_url(raw_drive_url)
 
-            except Exception as e:
-                print(f"    -> FAILED: {e}")
+            if direct_link:
+                print(f"    -> Found: {direct_link}")
+                # Persisted right away, so a restart picks up from here
+                checkpoint.record(doc_url, direct_link)
+            else:
+                print("    -> ERROR: Could not extract ID.")
 
-        browser.close()
+            # Pace page loads
+            time.sleep(5)
 
     # Final Save
-    df.to_csv(output_csv, index=False)
+    write_output(rows, checkpoint, output_csv)
     print(f">>> Done! Saved to {output_csv}")
 
 
+def main():
+    parser = argparse.ArgumentParser(
+        description="Resolve document pages to direct Drive download links."
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Concurrent browser pages. 1 keeps the one-row-at-a-time loop.",
+    )
+    parser.add_argument(
+        "--rate",
+        type=float,
+        default=1.0,
+        help="Page loads per second per host when --workers > 1.",
+    )
+    add_metrics_arguments(parser)
+    args = parser.parse_args()
+
+    with instrumented_run(args.trace, args.metrics_port):
+        if args.workers > 1:
+            main_concurrent(args.workers, args.rate)
+        else:
+            main_serial()
+
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,99 @@
+import json
+import os
+from datetime import datetime, timezone
+from enum import Enum
+
+from resilience import is_retryable
+
+LEDGER_PATH = "extraction_ledger.jsonl"
+
+
+class ReportState(str, Enum):
+    PENDING = "pending"
+    UPLOADED = "uploaded"
+    # In a Gemini batch job; the entry names the batch and the position.
+    SUBMITTED = "submitted"
+    EXTRACTED = "extracted"
+    FAILED = "failed"
+    RETRYABLE = "retryable"
+
+
+def classify_error(error: Exception) -> ReportState:
+    """RETRYABLE for transient network/API errors, FAILED for everything else."""
+    return ReportState.RETRYABLE if is_retryable(error) else ReportState.FAILED
+
+
+class ExtractionLedger:
+    """
+    Append-only record of where each report is in the extraction pipeline,
+    keyed by document URL plus PDF SHA-256.
+
+    The file is replayed into dicts once at startup, so checking a row is a
+    dict lookup. Each state change is one appended line, which survives a
+    crash without rewriting anything.
+    """
+
+    def __init__(self, path: str | os.PathLike = LEDGER_PATH):
+        self.path = path
+        # Latest entry per document URL, and per (document URL, sha256).
+        self.latest: dict[str, dict] = {}
+        self.entries: dict[tuple[str, str | None], dict] = {}
+
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        self._apply(json.loads(line))
+
+    def _apply(self, entry: dict):
+        self.latest[entry["document_url"]] = entry
+        self.entries[(entry["document_url"], entry.get("sha256"))] = entry
+
+    def state(self, document_url: str, sha256: str | None = None) -> ReportState:
+        if sha256 is None:
+            entry = self.latest.get(document_url)
+        else:
+            entry = self.entries.get((document_url, sha256))
+        return ReportState(entry["state"]) if entry else ReportState.PENDING
+
+    def should_process(self, document_url: str, retry_failed: bool = False) -> bool:
+        """
+        Extracted reports are skipped. Pending, uploaded (interrupted),
+        submitted (batch to resume) and retryable reports are processed.
+        Failed reports only when asked.
+        """
+        state = self.state(document_url)
+        if state == ReportState.EXTRACTED:
+            return False
+        if state == ReportState.FAILED:
+            return retry_failed
+        return True
+
+    def mark(
+        self,
+        document_url: str,
+        state: ReportState,
+        sha256: str | None = None,
+        error: str | None = None,
+        batch: str | None = None,
+        batch_index: int | None = None,
+    ):
+        entry = {
+            "document_url": document_url,
+            "sha256": sha256,
+            "state": state.value,
+            "error": error,
+            "updated_at": datetime.now(timezone.utc).isoformat(),
+        }
+        if batch is not None:
+            entry["batch"] = batch
+            entry["batch_index"] = batch_index
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry) + "\n")
+        self._apply(entry)
+
+    def counts(self) -> dict[str, int]:
+        counts = {state.value: 0 for state in ReportState}
+        for entry in self.latest.values():
+            counts[entry["state"]] += 1
+        return counts
@@ -1,20 +1,53 @@
 import pandas as pd
 
-# 1. Load the harvested CSV
-filename = "annual_reports_queue_20260108_102010"
-df = pd.read_csv(f"{filename}.csv")
+from title_parser import latest_revisions, parse_reports
 
-# 2. Filter: Keep only rows where 'title' contains "Annual Report"
-# case=False makes it insensitive to capitalization (e.g., "Annual report" vs "ANNUAL REPORT")
-annual_reports = df[df["title"].str.contains("Annual Report", case=False, na=False)]
+# Rows parsed per chunk: memory stays flat however long the queue grows.
+CHUNK_ROWS = 10_000
 
-# Optional: You can also filter by year if you only want 2025
-# annual_reports = annual_reports[annual_reports['title'].str.contains("2025")]
 
-# 3. Check the result
-print(f"Original count: {len(df)}")
-print(f"Filtered count: {len(annual_reports)}")
-print(annual_reports.head())
+def filter_annual_reports(
+    input_csv: str, output_csv: str, latest_only: bool = False
+) -> tuple[int, int]:
+    """
+    Keeps the full-year annual reports of the harvested CSV, using the
+    report kind parsed from each title and document URL slug. With
+    `latest_only`, re-uploads (ke-...-ar-00-2) replace earlier revisions.
+    Returns (rows read, rows kept).
+    """
+    # Read as text so kept rows are written back exactly as harvested.
+    chunks = pd.read_csv(input_csv, dtype=str, keep_default_na=False, chunksize=CHUNK_ROWS)
+    if latest_only:
+        # Dedup needs every revision of a report at once.
+        chunks = [pd.concat(chunks, ignore_index=True)]
 
-# 4. Save the cleaned list for the downloader
-annual_reports.to_csv(f"{filename}_cleaned.csv", index=False)
+    total = kept = 0
+    for i, chunk in enumerate(chunks):
+        parsed = parse_reports(chunk)
+        annual = (parsed["report_kind"] == "annual") & (parsed["period"] == "FY")
+        if latest_only:
+            annual = chunk.index.isin(latest_revisions(parsed[annual]).index)
+
+        annual_reports = chunk[annual]
+        annual_reports.to_csv(
+            output_csv, mode="w" if i == 0 else "a", header=i == 0, index=False
+        )
+        total += len(chunk)
+        kept += len(annual_reports)
+
+    return total, kept
+
+
+if __name__ == "__main__":
+    # 1. Load the harvested CSV
+    filename = "annual_reports_queue_20260108_102010"
+
+    # 2. Filter and save the cleaned list for the downloader
+    total, kept = filter_annual_reports(f"{filename}.csv", f"{filename}_cleaned.csv")
+
+    # Optional: You can also filter by year if you only want 2025, e.g. with
+    # parse_reports(chunk)["fiscal_year"] == 2025 in the mask above
+
+    # 3. Check the result
+    print(f"Original count: {total}")
+    print(f"Filtered count: {kept}")
@@ -1,11 +1,13 @@
-import io
 import pathlib
+import tempfile
 
 from google import genai
 
+from llm_cache import CACHE_DIR, ResponseCache, cache_key
+from pdf_store import _hash_file
 from schemas import FinancialReportExtraction
 from settings import settings
-from utils import get_google_drive_file_content, read_pdf_into_bytes
+from utils import stream_google_drive_file
 
 
 def main():
@@ -36,52 +38,58 @@ def main():
 
     client = genai.Client(api_key=settings.gemini_api_key)
 
-    print(">>> Downloading file from Drive...")
-
     file_id = "1r-UQ_saLPgdcduj-IUbPV1zQJKQxgNmp"
-    pdf_bytes = get_google_drive_file_content(file_id)
-    print(f">>> Downloaded {len(pdf_bytes)} bytes.")
-    # response = client.models
-    # doc_io = read_pdf_into_bytes(file_path=pdf_path)
-
-    # doc_io = io.BytesIO(
-    #     httpx.get(
-    #         "https://drive.google.com/uc?export=download&id=1r-UQ_saLPgdcduj-IUbPV1zQJKQxgNmp"
-    #     ).content
-    # )
-    doc_io = io.BytesIO(pdf_bytes)
-
-    # print(doc_io)
-
-    print(">>> Uploading to Gemini...")
-    sample_doc = client.files.upload(
-        file=doc_io, config={"mime_type": "application/pdf"}
-    )
-
-    # sample_doc = client.files.upload(file=pdf_path)
-
-    # prompt = "Summarise this document"
 
     prompt = """
     Analyze this financial report. Extract the specific values for the Income Statement, 
     Balance Sheet, and Cash Flow statement for the most recent fiscal year available in the document.
+    Also extract the prior-year comparative column into `comparative`, with its own fiscal_year.
     
     If a specific field (like R&D or Treasury Stock) is not explicitly present, return null.
     Ensure you capture the correct scale (e.g., if the table says 'in millions', extract the number as seen).
     """
+    model = "gemini-2.5-flash"
+    schema = FinancialReportExtraction.model_json_schema()
 
-    response = client.models.generate_content(
-        model="gemini-2.5-flash",
-        contents=[sample_doc, prompt],
-        config={
-            "response_mime_type": "application/json",
-            "response_json_schema": FinancialReportExtraction.model_json_schema(),
-        },
-    )
+    # Stream to a temp file instead of holding the whole PDF in memory
+    print(">>> Downloading file from Drive...")
+    with tempfile.TemporaryDirectory() as download_dir:
+        download_path = pathlib.Path(download_dir) / f"{file_id}.pdf"
+        size = stream_google_drive_file(file_id, download_path)
+        print(f">>> Downloaded {size} bytes.")
+
+        # Same PDF + model + prompt + schema -> reuse the previous answer
+        cache = ResponseCache(CACHE_DIR)
+        pdf_sha256 = _hash_file(download_path).hexdigest()
+        key = cache_key(pdf_sha256, model, prompt, schema)
+        response_text = cache.get(key)
+
+        if response_text is not None:
+            print(">>> Cache hit, skipping Gemini.")
+        else:
+            print(">>> Uploading to Gemini...")
+            sample_doc = client.files.upload(
+                file=download_path, config={"mime_type": "application/pdf"}
+            )
+
+            # sample_doc = client.files.upload(file=pdf_path)
+
+            # prompt = "Summarise this document"
+
+            response = client.models.generate_content(
+                model=model,
+                contents=[sample_doc, prompt],
+                config={
+                    "response_mime_type": "application/json",
+                    "response_json_schema": schema,
+                },
+            )
+            response_text = response.text
+            cache.put(key, response_text)
 
     # print(response.text)
 
-    financial_report = FinancialReportExtraction.model_validate_json(response.text)
+    financial_report = FinancialReportExtraction.model_validate_json(response_text)
     print(financial_report)
 
 
@@ -0,0 +1,208 @@
+import asyncio
+
+from pydantic import ValidationError
+
+from extraction_ledger import ReportState
+from gemini_pipeline import (
+    _DONE,
+    GEMINI_ENDPOINT,
+    ExtractionPipeline,
+    ReportJob,
+    validate_extraction,
+)
+from metrics import METRICS
+from pdf_store import new_download_client
+
+# Inlined requests per batch job. Requests only reference uploaded files,
+# so this stays far below the inline size limit.
+BATCH_SIZE = 100
+# Batch jobs take minutes to hours; no point asking more often.
+BATCH_POLL_INTERVAL = 30.0
+
+SUCCEEDED = "JOB_STATE_SUCCEEDED"
+TERMINAL_STATES = {SUCCEEDED, "JOB_STATE_FAILED", "JOB_STATE_CANCELLED", "JOB_STATE_EXPIRED"}
+
+
+class BatchError(Exception):
+    """A batch job, or one request in it, ended without a response."""
+
+
+class BatchExtractionPipeline(ExtractionPipeline):
+    """
+    ExtractionPipeline for bulk backfills: download, upload and wait run
+    as usual, but instead of one generate_content call per report the
+    uploaded reports are submitted as Gemini batch jobs of `batch_size`
+    requests, polled until done, and their responses validated against
+    FinancialReportExtraction. Batches have far higher throughput than
+    the online quota and cost less per token, at the price of latency.
+
+    `client` also needs `aio.batches.create` / `aio.batches.get`.
+    Cache hits and rule extractions never reach a batch.
+
+    With a `ledger`, each submitted report is marked with its batch name
+    and position. A restarted run polls those batches again instead of
+    downloading, uploading and paying for the reports a second time.
+    """
+
+    def __init__(
+        self,
+        *args,
+        batch_size: int = BATCH_SIZE,
+        batch_poll_interval: float = BATCH_POLL_INTERVAL,
+        **kwargs,
+    ):
+        super().__init__(*args, **kwargs)
+        self.batch_size = batch_size
+        self.batch_poll_interval = batch_poll_interval
+
+    def _request(self, job: ReportJob) -> dict:
+        return {
+            "contents": [
+                {
+                    "role": "user",
+                    "parts": [
+                        {
+                            "file_data": {
+                                "file_uri": job.uploaded_file.uri,
+                                "mime_type": "application/pdf",
+                            }
+                        },
+                        {"text": self.prompt},
+                    ],
+                }
+            ],
+            "config": {
+                "response_mime_type": "application/json",
+                "response_json_schema": self.schema,
+            },
+            "metadata": {"document_url": job.document_url},
+        }
+
+    async def submit(self, jobs: list[ReportJob]):
+        batch = await self.resilience.call(
+            GEMINI_ENDPOINT,
+            self.client.aio.batches.create,
+            model=self.model,
+            src=[self._request(job) for job in jobs],
+            config={"display_name": f"nse-extraction-{jobs[0].index}-{jobs[-1].index}"},
+        )
+        print(f"   -> Submitted batch {batch.name} with {len(jobs)} reports")
+        for i, job in enumerate(jobs):
+            job.batch_name, job.batch_index = batch.name, i
+            self._mark(job, ReportState.SUBMITTED)
+        return batch
+
+    async def resume(self, name: str, jobs: list[ReportJob]):
+        print(f"   -> Resuming batch {name} with {len(jobs)} reports")
+        return await self.resilience.call(
+            GEMINI_ENDPOINT, self.client.aio.batches.get, name=name
+        )
+
+    async def poll(self, batch):
+        while batch.state.name not in TERMINAL_STATES:
+            await asyncio.sleep(self.batch_poll_interval)
+            batch = await self.resilience.call(
+                GEMINI_ENDPOINT, self.client.aio.batches.get, name=batch.name
+            )
+        print(f"   -> Batch {batch.name} finished: {batch.state.name}")
+        return batch
+
+    async def collect(self, jobs: list[ReportJob], batch):
+        """Validates each job's inlined response (they come back in request order)."""
+        if batch.state.name != SUCCEEDED:
+            error = BatchError(f"batch {batch.name} ended {batch.state.name}")
+            for job in jobs:
+                await self._fail(job, error, ReportState.RETRYABLE)
+            return
+
+        responses = batch.dest.inlined_responses
+        for job in jobs:
+            inlined = responses[job.batch_index]
+            if inlined.error is not None:
+                await self._fail(job, BatchError(inlined.error.message), ReportState.RETRYABLE)
+                continue
+            text = inlined.response.text
+            try:
+                job.result = validate_extraction(text)
+            except ValidationError as e:
+                await self._fail(job, e, ReportState.FAILED)
+                continue
+
+            job.source = "gemini-batch"
+            if self.cache is not None:
+                self.cache.put(self._cache_key(job), text)
+            await self.delete(job)
+            await self._finish(job)
+
+    def _mark(self, job: ReportJob, state: ReportState):
+        job.state = state
+        if self.ledger is not None:
+            self.ledger.mark(
+                job.document_url,
+                state,
+                sha256=job.sha256,
+                error=job.error,
+                batch=job.batch_name if state == ReportState.SUBMITTED else None,
+                batch_index=job.batch_index,
+            )
+
+    def _submitted_batches(self, jobs: list[ReportJob]) -> dict[str, list[ReportJob]]:
+        """Jobs the ledger has in a batch from an earlier run, by batch name."""
+        batches = {}
+        if self.ledger is None:
+            return batches
+        for job in jobs:
+            entry = self.ledger.latest.get(job.document_url)
+            if entry and entry["state"] == ReportState.SUBMITTED and entry.get("batch"):
+                job.sha256 = entry["sha256"]
+                job.batch_name, job.batch_index = entry["batch"], entry["batch_index"]
+                batches.setdefault(job.batch_name, []).append(job)
+        return batches
+
+    async def _run_batch(self, jobs: list[ReportJob], name: str | None = None):
+        """Submits `jobs` as a new batch, or with `name` resumes that one."""
+        try:
+            with METRICS.span("gemini_batch", attrs={"reports": len(jobs)}):
+                batch = await (self.resume(name, jobs) if name else self.submit(jobs))
+                batch = await self.poll(batch)
+        except Exception as e:
+            for job in jobs:
+                await self._fail(job, e)
+            return
+        await self.collect(jobs, batch)
+
+    async def _batch_stage(self, inbox: asyncio.Queue):
+        """Groups uploaded jobs into batches; each batch is polled on its own."""
+        pending, batches = [], []
+        while (job := await inbox.get()) is not _DONE:
+            if job.result is not None:
+                await self._finish(job)
+                continue
+            pending.append(job)
+            if len(pending) >= self.batch_size:
+                batches.append(asyncio.create_task(self._run_batch(pending)))
+                pending = []
+        if pending:
+            batches.append(asyncio.create_task(self._run_batch(pending)))
+        await asyncio.gather(*batches)
+
+    async def run(self, jobs: list[ReportJob]) -> list[ReportJob]:
+        submitted = self._submitted_batches(jobs)
+        fresh = [job for job in jobs if job.batch_name is None]
+        size = self.limits.queue_size
+        to_download, to_upload, to_wait, to_batch = (
+            asyncio.Queue(maxsize=size) for _ in range(4)
+        )
+
+        async with new_download_client(self.limits.download) as http_client:
+            self.http_client = http_client
+            await asyncio.gather(
+                self._feed(fresh, to_download),
+                self._stage(self.download, self.limits.download, to_download, to_upload),
+                self._stage(self.upload, self.limits.upload, to_upload, to_wait),
+                self._stage(self.wait, self.limits.wait, to_wait, to_batch),
+                self._batch_stage(to_batch),
+                *(self._run_batch(batch, name) for name, batch in submitted.items()),
+            )
+
+        return jobs
@@ -0,0 +1,350 @@
+import asyncio
+import pathlib
+from dataclasses import dataclass, field
+from typing import Callable
+
+import httpx
+from pydantic import ValidationError
+from pypdf.errors import PyPdfError
+
+from extraction_ledger import ExtractionLedger, ReportState, classify_error
+from llm_cache import ResponseCache, cache_key
+from metrics import METRICS
+from pdf_slicer import SLICER_VERSION, slice_pdf
+from pdf_store import PdfStore, download_to_store, new_download_client
+from resilience import Resilience
+from rule_extractor import extract_from_pdf
+from schemas import FinancialReportExtraction
+from title_parser import parse_report
+
+MODEL = "gemini-2.0-flash"
+# Breaker/limiter names for Gemini API calls. Files API calls have their
+# own, so uploads and polls aren't held to the generate quota.
+GEMINI_ENDPOINT = "gemini"
+GEMINI_UPLOAD_ENDPOINT = "gemini.upload"
+GEMINI_FILES_ENDPOINT = "gemini.files"
+
+EXTRACTION_PROMPT = """
+Analyze this financial report. Extract the specific values for the Income Statement,
+Balance Sheet, and Cash Flow statement for the most recent fiscal year available.
+
+The statements also print the prior year's figures as a comparative column.
+Extract those into `comparative`, with its own fiscal_year, using the same fields.
+
+If a field is not present, return null.
+Ensure you capture the correct scale (e.g. if 'in millions', extract the number as seen).
+"""
+
+# Marks the end of a stage's input; each worker passes it on to its siblings.
+_DONE = object()
+
+
+@dataclass
+class StageLimits:
+    """Concurrency per stage, and the size of the queues between them."""
+
+    download: int = 4
+    upload: int = 4
+    wait: int = 8
+    generate: int = 2
+    queue_size: int = 8
+
+
+@dataclass
+class ReportJob:
+    index: int
+    title: str
+    download_url: str
+    document_url: str = ""
+    report: dict = field(default_factory=dict)
+    path: pathlib.Path | None = None
+    upload_path: pathlib.Path | None = None
+    sha256: str | None = None
+    uploaded_file: object = None
+    result: FinancialReportExtraction | None = None
+    error: str | None = None
+    state: ReportState = ReportState.PENDING
+    # Where the result came from: "gemini", "cache" or "rules".
+    source: str | None = None
+    # Gemini batch job holding the request, and its position in it.
+    batch_name: str | None = None
+    batch_index: int | None = None
+
+
+def validate_extraction(text: str) -> FinancialReportExtraction:
+    """Parses a model response, counting the ones that don't match the schema."""
+    try:
+        return FinancialReportExtraction.model_validate_json(text)
+    except ValidationError:
+        METRICS.inc("validation_failures")
+        raise
+
+
+class ExtractionPipeline:
+    """
+    Download -> upload -> wait for processing -> generate, as four async
+    stages joined by bounded queues. Each stage has its own worker count,
+    so a slow stage (usually generate, bound by API quota) doesn't stall
+    the others, and the queue bound keeps at most a few PDFs in flight.
+
+    `client` is a `genai.Client` (only its `.aio` API is used), or any
+    object exposing the same `aio.files` / `aio.models` methods.
+
+    With a `ledger`, every state change (uploaded, extracted, failed,
+    retryable) is recorded against the job's document URL and PDF hash.
+    Pass `mark_extracted=False` when `on_result` buffers results and marks
+    them extracted itself once they are written (see ResultWriter).
+
+    With a `cache`, a report whose (PDF hash, model, prompt, schema) was
+    extracted before skips upload and generation entirely.
+
+    With `slice_pages`, only the financial statement pages (found locally
+    by pdf_slicer) are uploaded; reports that can't be sliced go up whole.
+
+    With `min_rule_confidence`, the local rule_extractor runs first and
+    reports it reads with at least that confidence never reach Gemini.
+
+    Downloads and Gemini calls go through `resilience` (one is created if
+    not given): transient errors are retried with backoff, a failing
+    endpoint trips its circuit breaker, and 429s shrink the number of
+    concurrent Gemini calls until the quota recovers.
+    """
+
+    def __init__(
+        self,
+        client,
+        store: PdfStore,
+        limits: StageLimits | None = None,
+        model: str = MODEL,
+        prompt: str = EXTRACTION_PROMPT,
+        poll_interval: float = 2.0,
+        on_result: Callable[[ReportJob], None] | None = None,
+        on_error: Callable[[ReportJob], None] | None = None,
+        ledger: ExtractionLedger | None = None,
+        cache: ResponseCache | None = None,
+        slice_pages: bool = False,
+        min_rule_confidence: float | None = None,
+        resilience: Resilience | None = None,
+        mark_extracted: bool = True,
+    ):
+        self.client = client
+        self.store = store
+        self.limits = limits or StageLimits()
+        self.model = model
+        self.prompt = prompt
+        self.poll_interval = poll_interval
+        self.on_result = on_result
+        self.on_error = on_error
+        self.ledger = ledger
+        self.cache = cache
+        self.slice_pages = slice_pages
+        self.min_rule_confidence = min_rule_confidence
+        self.mark_extracted = mark_extracted
+        self.resilience = resilience or Resilience(
+            concurrency=max(self.limits.download, self.limits.upload, self.limits.wait)
+        )
+        # Each call type is limited like the stage that makes it.
+        self.resilience.limiter(GEMINI_ENDPOINT, self.limits.generate)
+        self.resilience.limiter(GEMINI_UPLOAD_ENDPOINT, self.limits.upload)
+        self.resilience.limiter(GEMINI_FILES_ENDPOINT, self.limits.wait)
+        self.schema = FinancialReportExtraction.model_json_schema()
+        self.http_client: httpx.AsyncClient | None = None
+
+    async def download(self, job: ReportJob) -> ReportJob:
+        print(f"   -> Downloading: {job.title}")
+        job.path = await download_to_store(
+            self.store, self.http_client, job.title, job.download_url, self.resilience
+        )
+        job.sha256 = job.path.stem
+
+        if self.cache is not None:
+            cached = self.cache.get(self._cache_key(job))
+            if cached is not None:
+                print(f"   -> Cache hit: {job.title}")
+                job.result = FinancialReportExtraction.model_validate_json(cached)
+                job.source = "cache"
+                return job
+
+        if self.min_rule_confidence is not None:
+            extraction = await asyncio.to_thread(self._extract_with_rules, job)
+            if extraction.result and extraction.confidence >= self.min_rule_confidence:
+                print(f"   -> Rules extracted ({extraction.confidence:.2f}): {job.title}")
+                job.result = extraction.result
+                job.source = "rules"
+                return job
+
+        job.upload_path = job.path
+        if self.slice_pages:
+            job.upload_path = await asyncio.to_thread(self._slice, job.path, job.sha256)
+        return job
+
+    def _extract_with_rules(self, job: ReportJob):
+        info = parse_report(job.title, job.document_url)
+        return extract_from_pdf(job.path, info.company or job.title, info.fiscal_year)
+
+    def _slice(self, path: pathlib.Path, sha256: str) -> pathlib.Path:
+        sliced = self.store.sliced_path(sha256)
+        try:
+            if sliced.exists() or slice_pdf(path, sliced) is not None:
+                return sliced
+        except PyPdfError as e:
+            print(f"   -> Slicing failed, uploading whole PDF: {path.name}: {e}")
+        return path
+
+    async def upload(self, job: ReportJob) -> ReportJob:
+        if job.result is not None:
+            return job
+
+        print(f"   -> Uploading: {job.title}")
+        job.uploaded_file = await self.resilience.call(
+            GEMINI_UPLOAD_ENDPOINT,
+            self.client.aio.files.upload,
+            file=job.upload_path,
+            config=dict(mime_type="application/pdf", display_name=job.title),
+        )
+        self._mark(job, ReportState.UPLOADED)
+        return job
+
+    async def wait(self, job: ReportJob) -> ReportJob:
+        if job.result is not None:
+            return job
+
+        with METRICS.span("upload_wait", attrs={"title": job.title}):
+            while job.uploaded_file.state.name == "PROCESSING":
+                await asyncio.sleep(self.poll_interval)
+                job.uploaded_file = await self.resilience.call(
+                    GEMINI_FILES_ENDPOINT, self.client.aio.files.get, name=job.uploaded_file.name
+                )
+
+        if job.uploaded_file.state.name == "FAILED":
+            raise RuntimeError("Gemini processing FAILED")
+        return job
+
+    async def generate(self, job: ReportJob) -> ReportJob:
+        if job.result is not None:
+            return job
+
+        print(f"   -> Extracting: {job.title}")
+        with METRICS.span("gemini_generate", attrs={"title": job.title}):
+            response = await self.resilience.call(
+                GEMINI_ENDPOINT,
+                self.client.aio.models.generate_content,
+                model=self.model,
+                contents=[job.uploaded_file, self.prompt],
+                config={
+                    "response_mime_type": "application/json",
+                    "response_json_schema": self.schema,
+                },
+            )
+        job.result = validate_extraction(response.text)
+        job.source = "gemini"
+
+        if self.cache is not None:
+            self.cache.put(self._cache_key(job), response.text)
+
+        await self.delete(job)
+        return job
+
+    async def delete(self, job: ReportJob):
+        """Frees the uploaded file (Files API storage counts against quota)."""
+        if job.uploaded_file is None:
+            return
+        try:
+            await self.client.aio.files.delete(name=job.uploaded_file.name)
+            job.uploaded_file = None
+        except Exception as e:
+            print(f"   -> Cleanup failed for {job.title}: {e}")
+
+    def _cache_key(self, job: ReportJob) -> str:
+        variant = f"sliced-v{SLICER_VERSION}" if self.slice_pages else ""
+        return cache_key(job.sha256, self.model, self.prompt, self.schema, variant)
+
+    def _mark(self, job: ReportJob, state: ReportState):
+        job.state = state
+        if self.ledger is not None:
+            self.ledger.mark(job.document_url, state, sha256=job.sha256, error=job.error)
+
+    async def _finish(self, job: ReportJob):
+        if self.on_result:
+            try:
+                self.on_result(job)
+            except Exception as e:
+                # Saving failed, not the extraction: worth another run.
+                await self._fail(job, e, ReportState.RETRYABLE)
+                return
+        METRICS.inc("reports_extracted", source=job.source)
+        if self.mark_extracted:
+            self._mark(job, ReportState.EXTRACTED)
+
+    async def _fail(self, job: ReportJob, error: Exception, state: ReportState | None = None):
+        job.error = f"{type(error).__name__}: {error}"
+        print(f"   -> ERROR: {job.title}: {job.error}")
+        await self.delete(job)
+        self._mark(job, state or classify_error(error))
+        METRICS.inc("reports_failed", state=job.state.value)
+        if self.on_error:
+            self.on_error(job)
+
+    async def _stage(self, handle, workers: int, inbox: asyncio.Queue, outbox):
+        async def worker():
+            while True:
+                job = await inbox.get()
+                if job is _DONE:
+                    await inbox.put(_DONE)
+                    return
+
+                try:
+                    with METRICS.span(
+                        "extraction_stage", attrs={"title": job.title}, stage=handle.__name__
+                    ):
+                        job = await handle(job)
+                except Exception as e:
+                    await self._fail(job, e)
+                    continue
+
+                if outbox is not None:
+                    await outbox.put(job)
+                else:
+                    await self._finish(job)
+
+        await asyncio.gather(*(worker() for _ in range(workers)))
+        if outbox is not None:
+            await outbox.put(_DONE)
+
+    async def _feed(self, jobs: list[ReportJob], outbox: asyncio.Queue):
+        for job in jobs:
+            await outbox.put(job)
+        await outbox.put(_DONE)
+
+    async def run(self, jobs: list[ReportJob]) -> list[ReportJob]:
+        size = self.limits.queue_size
+        to_download, to_upload, to_wait, to_generate = (
+            asyncio.Queue(maxsize=size) for _ in range(4)
+        )
+
+        async with new_download_client(self.limits.download) as http_client:
+            self.http_client = http_client
+            await asyncio.gather(
+                self._feed(jobs, to_download),
+                self._stage(self.download, self.limits.download, to_download, to_upload),
+                self._stage(self.upload, self.limits.upload, to_upload, to_wait),
+                self._stage(self.wait, self.limits.wait, to_wait, to_generate),
+                self._stage(self.generate, self.limits.generate, to_generate, None),
+            )
+
+        return jobs
+
+
+def jobs_from_reports(reports: list[dict]) -> list[ReportJob]:
+    """Builds jobs from rows of annual_reports_ready_for_ai.csv, skipping rows without a link."""
+    return [
+        ReportJob(
+            index=i,
+            title=report.get("title", "Unknown"),
+            download_url=report["direct_download_url"],
+            document_url=report.get("document_url") or report["direct_download_url"],
+            report=report,
+        )
+        for i, report in enumerate(reports)
+        if report.get("direct_download_url")
+    ]
@@ -1,20 +1,334 @@
+import argparse
+import asyncio
 import csv
+import itertools
+import os
 import time
 from pprint import pprint
 from datetime import datetime
-from playwright.sync_api import sync_playwright
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
 
+from playwright.async_api import Error as PlaywrightError
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
 
-def main():
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=False)
-        context = browser.new_context(accept_downloads=True)
-        page = context.new_page()
+from browser_pool import BrowserPool, SyncBrowserPage
+from resilience import RetryPolicy
+
+LISTING_URL = "https://africanfinancials.com/kenya-listed-company-documents/"
+# Persistent queue that incremental runs upsert into, newest first.
+QUEUE_CSV = "annual_reports_queue.csv"
+# Consecutive already-known cards after which an incremental run stops.
+STOP_AFTER_KNOWN = 20
+FIELDNAMES = ["title", "document_url", "company_url", "page_number"]
+# Tries per listing page before it is reported as failed.
+PAGE_RETRY_POLICY = RetryPolicy(attempts=3, base_delay=2.0)
+CARD_SELECTOR = ".af20-news"
+PAGINATION_SELECTOR = '[class*="wpv-archive-pagination-link"]'
+
+# Runs inside the page so a whole listing page costs one round-trip instead of
+# three locator calls per card. Mirrors the `card.is_visible()` filter below.
+EXTRACT_CARDS_JS = """
+cards => cards
+    .filter(card => card.offsetParent !== null)
+    .map(card => {
+        const link = card.querySelector("h2 a");
+        const company = card.querySelector("cite a");
+        return {
+            title: link ? link.innerText.trim() : null,
+            document_url: link ? link.getAttribute("href") : null,
+            company_url: company ? company.getAttribute("href") : null,
+        };
+    })
+    .filter(row => row.title && row.document_url)
+"""
+
+PAGE_COUNT_JS = """
+links => Math.max(0, ...links
+    .map(link => parseInt(link.innerText.trim(), 10))
+    .filter(n => !isNaN(n)))
+"""
+
+
+def listing_page_url(base_url: str, page_num: int) -> str:
+    """
+    Builds the URL of a listing page. Page 1 is the bare listing URL, later
+    pages are addressed with the `wpv_paged` query parameter used by the
+    site's WP Views pagination.
+    """
+    if page_num == 1:
+        return base_url
+
+    scheme, netloc, path, query, fragment = urlsplit(base_url)
+    params = [(k, v) for k, v in parse_qsl(query) if k != "wpv_paged"]
+    params.append(("wpv_paged", str(page_num)))
+    return urlunsplit((scheme, netloc, path, urlencode(params), fragment))
+
+
+async def fetch_listing_page(page, base_url: str, page_num: int) -> list[dict]:
+    """
+    Loads one listing page by number and returns its cards as CSV rows.
+    An empty list means the page has no visible cards (past the last page).
+    """
+    await page.goto(
+        listing_page_url(base_url, page_num),
+        timeout=60000,
+        wait_until="domcontentloaded",
+    )
+
+    try:
+        await page.locator(CARD_SELECTOR).first.wait_for(
+            state="visible", timeout=30000
+        )
+    except PlaywrightTimeoutError:
+        return []
+
+    rows = await page.eval_on_selector_all(CARD_SELECTOR, EXTRACT_CARDS_JS)
+    for row in rows:
+        row["page_number"] = page_num
+    return rows
+
+
+async def read_page_count(page) -> int | None:
+    """Highest page number shown in the pagination bar of the loaded page."""
+    count = await page.eval_on_selector_all(PAGINATION_SELECTOR, PAGE_COUNT_JS)
+    return count or None
+
+
+async def fetch_with_retries(
+    pool, base_url: str, page_num: int, retry_empty: bool
+) -> tuple[list[dict], int | None] | None:
+    """
+    Fetches one listing page, retrying errors (and empty pages, if
+    `retry_empty`) with PAGE_RETRY_POLICY backoff. Returns the rows and, for
+    a non-empty page 1, the page count; None if every try failed.
+    """
+    for attempt in range(PAGE_RETRY_POLICY.attempts):
+        if attempt:
+            await asyncio.sleep(PAGE_RETRY_POLICY.delay(attempt - 1))
+        try:
+            async with pool.page() as page:
+                rows = await fetch_listing_page(page, base_url, page_num)
+                page_count = None
+                if page_num == 1 and rows:
+                    page_count = await read_page_count(page)
+        except PlaywrightError as e:
+            print(f"    Page {page_num} failed ({type(e).__name__}: {e}).")
+            continue
+        if rows or not retry_empty:
+            return rows, page_count
+        print(f"    Page {page_num} is empty.")
+    return None
+
+
+async def harvest_concurrently(
+    base_url: str = LISTING_URL, workers: int = 4, max_pages: int | None = None
+) -> list[dict]:
+    """
+    Harvests the listing with a pool of headless browser contexts, each
+    fetching pages by number in parallel. Results are merged in page order.
+
+    The page count is read from the pagination bar of page 1. If the bar is
+    missing, workers keep claiming pages until one comes back empty.
+
+    Pages that error (or come back empty although the count is known) are
+    retried with backoff; pages that still fail are skipped and reported,
+    without cutting off the pages after them.
+    """
+    async with BrowserPool(size=workers) as pool:
+        results: dict[int, list[dict]] = {}
+        failed: list[int] = []
+        page_count = None
+
+        async def fetch(page_num: int, count_known: bool) -> list[dict] | None:
+            """The page's rows; [] past the end of the listing, None if it failed."""
+            nonlocal page_count
+            # Without a page count, an empty page is the end of the listing.
+            fetched = await fetch_with_retries(
+                pool, base_url, page_num, retry_empty=count_known
+            )
+            if fetched is None:
+                failed.append(page_num)
+                return None
+            rows, count = fetched
+            if count is not None:
+                page_count = count
+            return rows
+
+        print(f">>> Loading page 1 with {workers} workers...")
+        results[1] = await fetch(1, count_known=False) or []
+        last_page = page_count if results[1] else 1
+        if max_pages is not None:
+            last_page = min(last_page or max_pages, max_pages)
+        count_known = page_count is not None
+        print(f">>> Page count: {last_page or 'unknown'}")
+
+        page_numbers = itertools.count(2)
+
+        async def worker():
+            nonlocal last_page
+            for page_num in page_numbers:
+                if last_page is not None and page_num > last_page:
+                    return
+
+                rows = await fetch(page_num, count_known)
+                if rows is None and count_known:
+                    continue
+                if not rows:
+                    # Past the end, or (count unknown) can't tell: stop here.
+                    if rows == []:
+                        print(f"    Page {page_num} is empty.")
+                    if last_page is None or page_num - 1 < last_page:
+                        last_page = page_num - 1
+                    return
+
+                results[page_num] = rows
+                print(f"    Page {page_num}: {len(rows)} cards.")
+
+        await asyncio.gather(*(worker() for _ in range(workers)))
+
+    if failed:
+        print(f">>> WARNING: {len(failed)} listing pages failed: {sorted(failed)}")
+    return [
+        row
+        for page_num in sorted(results)
+        if last_page is None or page_num <= last_page
+        for row in results[page_num]
+    ]
+
+
+class ChangeDetector:
+    """
+    Tracks listing cards against the document URLs already in the queue.
+    The listing is newest first, so once `stop_after` known cards appear in
+    a row everything further back has been harvested before.
+    """
+
+    def __init__(self, known_urls: set[str], stop_after: int = STOP_AFTER_KNOWN):
+        self.known_urls = known_urls
+        self.stop_after = stop_after
+        self.known_run = 0
+        self.done = False
+
+    def feed(self, rows: list[dict]) -> list[dict]:
+        """Returns the rows of one page that aren't in the queue yet."""
+        new_rows = []
+        for row in rows:
+            if row["document_url"] in self.known_urls:
+                self.known_run += 1
+                if self.known_run >= self.stop_after:
+                    self.done = True
+            else:
+                self.known_run = 0
+                self.known_urls.add(row["document_url"])
+                new_rows.append(row)
+        return new_rows
+
+
+def read_queue(queue_csv: str = QUEUE_CSV) -> list[dict]:
+    if not os.path.exists(queue_csv):
+        return []
+    with open(queue_csv, newline="", encoding="utf-8") as f:
+        return list(csv.DictReader(f))
+
+
+def upsert_queue(rows: list[dict], queue_csv: str = QUEUE_CSV) -> int:
+    """
+    Merges harvested rows into the queue by document_url: existing rows are
+    updated in place, new ones go on top. Written to a temp file and swapped
+    in, so an interrupted run leaves the old queue intact. Returns the
+    number of new rows.
+    """
+    existing = read_queue(queue_csv)
+    harvested = {row["document_url"]: row for row in rows}
+    known = {row["document_url"] for row in existing}
+
+    new_rows = [row for url, row in harvested.items() if url not in known]
+    updated = [harvested.get(row["document_url"], row) for row in existing]
+
+    tmp_path = f"{queue_csv}.tmp"
+    with open(tmp_path, mode="w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=FIELDNAMES, extrasaction="ignore")
+        writer.writeheader()
+        writer.writerows(new_rows + updated)
+    os.replace(tmp_path, queue_csv)
+
+    return len(new_rows)
+
+
+async def harvest_incrementally(
+    base_url: str = LISTING_URL,
+    queue_csv: str = QUEUE_CSV,
+    stop_after: int = STOP_AFTER_KNOWN,
+    max_pages: int | None = None,
+) -> list[dict]:
+    """
+    Walks the listing from page 1 until a run of `stop_after` cards already
+    in the queue, and returns only the new cards. Pages are fetched one at
+    a time since each one decides whether the next is needed.
+
+    Pages are retried like in harvest_concurrently. The end of the list is
+    the last page in the pagination bar of page 1; an empty page before it
+    is a slow load, not the end. If a page still fails, the new cards found
+    so far are upserted into the queue before the error is raised, so the
+    next run picks up from there.
+    """
+    detector = ChangeDetector(
+        {row["document_url"] for row in read_queue(queue_csv)}, stop_after
+    )
+    new_rows = []
+    page_count = None
+
+    async with BrowserPool(size=1) as pool:
+        for page_num in itertools.count(1):
+            if max_pages is not None and page_num > max_pages:
+                break
+            if page_count is not None and page_num > page_count:
+                print(f"    Page {page_count} was the last page. Reached end of list.")
+                break
+
+            # Without a page count (no pagination bar), an empty page past
+            # page 1 is the only end-of-list signal left.
+            fetched = await fetch_with_retries(
+                pool,
+                base_url,
+                page_num,
+                retry_empty=page_num == 1 or page_count is not None,
+            )
+            if fetched is None:
+                added = upsert_queue(new_rows, queue_csv)
+                print(f">>> Page {page_num} kept failing. Saved {added} new reports first.")
+                raise RuntimeError(
+                    f"Listing page {page_num} failed after "
+                    f"{PAGE_RETRY_POLICY.attempts} tries"
+                )
+
+            rows, count = fetched
+            if count is not None:
+                page_count = count
+            if not rows:
+                print(f"    Page {page_num} is empty. Reached end of list.")
+                break
+
+            fresh = detector.feed(rows)
+            new_rows.extend(fresh)
+            print(f"    Page {page_num}: {len(fresh)} new of {len(rows)} cards.")
+
+            if detector.done:
+                print(f">>> {stop_after} known reports in a row. Stopping.")
+                break
+
+    return new_rows
+
+
+def harvest_serially():
+    # The click-through pagination lives in one page, so it is never recycled.
+    with SyncBrowserPage(max_navigations=None, accept_downloads=True) as browser:
+        page = browser.page()
 
         print(">>> Main page")
         try:
             page.goto(
-                "https://africanfinancials.com/kenya-listed-company-documents/",
+                LISTING_URL,
                 timeout=60000,
                 wait_until="domcontentloaded",
             )
@@ -37,13 +351,7 @@ def main():
         #     f">>> List refreshed. First item found: {first_item_text.splitlines()[0]}"
         # )
 
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        csv_filename = f"annual_reports_queue_{timestamp}.csv"
-        fieldnames = ["title", "document_url", "company_url", "page_number"]
-
-        with open(csv_filename, mode="w", newline="", encoding="utf-8") as f:
-            writer = csv.DictWriter(f, fieldnames=fieldnames)
-            writer.writeheader()
+        csv_filename = new_queue_csv()
 
         print(f">>> Created {csv_filename}.")
 
@@ -89,7 +397,7 @@ def main():
 
             if current_page_data:
                 with open(csv_filename, mode="a", newline="", encoding="utf-8") as f:
-                    writer = csv.DictWriter(f, fieldnames=fieldnames)
+                    writer = csv.DictWriter(f, fieldnames=FIELDNAMES)
                     writer.writerows(current_page_data)
                 print(f"    Saved {len(current_page_data)} reports to CSV.")
 
@@ -115,7 +423,61 @@ def main():
                 break
 
         print(">>> Harvest complete!")
-        browser.close()
+
+
+def new_queue_csv() -> str:
+    """Creates an empty timestamped queue CSV and returns its filename."""
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    csv_filename = f"annual_reports_queue_{timestamp}.csv"
+
+    with open(csv_filename, mode="w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=FIELDNAMES)
+        writer.writeheader()
+
+    return csv_filename
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Harvest the africanfinancials.com Kenya document listing."
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Number of headless browser contexts. 1 keeps the click-through harvest.",
+    )
+    parser.add_argument("--max-pages", type=int, default=None)
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help=f"Only fetch pages until known reports show up, and upsert into {QUEUE_CSV}.",
+    )
+    parser.add_argument("--stop-after", type=int, default=STOP_AFTER_KNOWN)
+    args = parser.parse_args()
+
+    if args.incremental:
+        rows = asyncio.run(
+            harvest_incrementally(stop_after=args.stop_after, max_pages=args.max_pages)
+        )
+        added = upsert_queue(rows, QUEUE_CSV)
+        print(f">>> Harvest complete! Added {added} new reports to {QUEUE_CSV}.")
+        return
+
+    if args.workers <= 1:
+        harvest_serially()
+        return
+
+    rows = asyncio.run(
+        harvest_concurrently(workers=args.workers, max_pages=args.max_pages)
+    )
+
+    csv_filename = new_queue_csv()
+    with open(csv_filename, mode="a", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=FIELDNAMES)
+        writer.writerows(rows)
+
+    print(f">>> Harvest complete! Saved {len(rows)} reports to {csv_filename}.")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,205 @@
+import asyncio
+from html.parser import HTMLParser
+from typing import Callable
+
+import httpx
+from playwright.async_api import Error as PlaywrightError
+
+from browser_pool import ATTRIBUTE_ONLY_RESOURCE_TYPES, BROWSER_RETRY_POLICY, BrowserPool
+from metrics import METRICS
+from rate_limit import HostRateLimiter
+from resilience import CircuitOpenError, Resilience, endpoint
+from utils import convert_to_download_url
+
+IFRAME_ID = "annual-report"
+
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+}
+
+# Lazy-loading plugins move `src` into one of these before the page's JS runs.
+SRC_ATTRIBUTES = ("src", "data-src", "data-lazy-src")
+
+# Called with (input index, download link) as soon as a link is found.
+OnFound = Callable[[int, str], None]
+
+
+class _IframeSrcParser(HTMLParser):
+    def __init__(self, element_id: str):
+        super().__init__()
+        self.element_id = element_id
+        self.src = None
+
+    def handle_starttag(self, tag, attrs):
+        if self.src is not None or tag != "iframe":
+            return
+        attrs = dict(attrs)
+        if attrs.get("id") != self.element_id:
+            return
+        for name in SRC_ATTRIBUTES:
+            if attrs.get(name):
+                self.src = attrs[name]
+                return
+
+
+def extract_iframe_src(html: str, element_id: str = IFRAME_ID) -> str | None:
+    """Returns the src of `iframe#<element_id>` in raw HTML, or None."""
+    parser = _IframeSrcParser(element_id)
+    parser.feed(html)
+    parser.close()
+    return parser.src
+
+
+def new_http_client(workers: int = 16, **kwargs) -> httpx.AsyncClient:
+    """Pooled client for document pages, sized to the number of workers."""
+    return httpx.AsyncClient(
+        headers=HEADERS,
+        follow_redirects=True,
+        timeout=30.0,
+        limits=httpx.Limits(
+            max_connections=workers, max_keepalive_connections=workers
+        ),
+        **kwargs,
+    )
+
+
+async def fetch_iframe_src(client: httpx.AsyncClient, doc_url: str) -> str | None:
+    response = await client.get(doc_url)
+    response.raise_for_status()
+    return extract_iframe_src(response.text)
+
+
+def fetch_iframe_src_sync(client: httpx.Client, doc_url: str) -> str | None:
+    response = client.get(doc_url)
+    response.raise_for_status()
+    return extract_iframe_src(response.text)
+
+
+async def resolve_with_http(
+    doc_urls: list[str],
+    workers: int = 16,
+    rate: float = 5.0,
+    client=None,
+    on_found: OnFound | None = None,
+) -> list[str | None]:
+    """
+    Fast path: fetches each document page over plain HTTP and reads the
+    iframe src from the static HTML. Returns download links in input order,
+    None where the page failed or had no iframe src.
+    """
+    results: list[str | None] = [None] * len(doc_urls)
+    limiter = HostRateLimiter(rate=rate, capacity=workers)
+    semaphore = asyncio.Semaphore(workers)
+    resilience = Resilience(concurrency=workers)
+
+    async def fetch(client: httpx.AsyncClient, doc_url: str) -> str | None:
+        await limiter.acquire(doc_url)
+        return await fetch_iframe_src(client, doc_url)
+
+    async def resolve(index: int, doc_url: str, client: httpx.AsyncClient):
+        async with semaphore:
+            try:
+                src = await resilience.call(endpoint(doc_url), fetch, client, doc_url)
+                results[index] = convert_to_download_url(src)
+                METRICS.inc("iframe_lookups", result="found" if results[index] else "missing")
+                if on_found and results[index]:
+                    on_found(index, results[index])
+            except (httpx.HTTPError, CircuitOpenError) as e:
+                METRICS.inc("iframe_lookups", result="failed")
+                print(f"    -> HTTP FAILED: {doc_url}: {e}")
+
+    async def resolve_all(client: httpx.AsyncClient):
+        await asyncio.gather(*(resolve(i, u, client) for i, u in enumerate(doc_urls)))
+
+    if client is None:
+        async with new_http_client(workers) as client:
+            await resolve_all(client)
+    else:
+        await resolve_all(client)
+
+    return results
+
+
+async def resolve_with_browser(
+    doc_urls: list[str],
+    workers: int = 4,
+    rate: float = 1.0,
+    on_found: OnFound | None = None,
+) -> list[str | None]:
+    """
+    Resolves each document page to the direct Drive download link of its
+    `#annual-report` iframe, using `workers` pages concurrently.
+
+    Requests are spaced by a per-host token bucket (`rate` page loads per
+    second) instead of a fixed sleep, and failed loads are retried with
+    backoff. Results come back in input order, with None for pages that
+    failed.
+    """
+    results: list[str | None] = [None] * len(doc_urls)
+    queue: asyncio.Queue[tuple[int, str]] = asyncio.Queue()
+    for item in enumerate(doc_urls):
+        queue.put_nowait(item)
+
+    limiter = HostRateLimiter(rate=rate, capacity=workers)
+    resilience = Resilience(policy=BROWSER_RETRY_POLICY, concurrency=workers)
+
+    # Only the iframe's src is read: skip styles and the Drive preview itself.
+    async with BrowserPool(
+        size=workers, blocked_types=ATTRIBUTE_ONLY_RESOURCE_TYPES, block_subframes=True
+    ) as pool:
+
+        async def fetch(doc_url: str) -> str | None:
+            await limiter.acquire(doc_url)
+            async with pool.page() as page:
+                await page.goto(doc_url, timeout=60000)
+                iframe_locator = page.locator(f"#{IFRAME_ID}")
+                await iframe_locator.wait_for(state="attached", timeout=60000)
+                return await iframe_locator.get_attribute("src")
+
+        async def worker():
+            while not queue.empty():
+                index, doc_url = queue.get_nowait()
+                try:
+                    raw_drive_url = await resilience.call(endpoint(doc_url), fetch, doc_url)
+                except (PlaywrightError, CircuitOpenError) as e:
+                    print(f"    -> FAILED: {doc_url}: {e}")
+                    continue
+                results[index] = convert_to_download_url(raw_drive_url)
+                if on_found and results[index]:
+                    on_found(index, results[index])
+
+        await asyncio.gather(*(worker() for _ in range(workers)))
+
+    return results
+
+
+async def resolve_download_urls(
+    doc_urls: list[str],
+    workers: int = 4,
+    rate: float = 1.0,
+    http_workers: int = 16,
+    http_rate: float = 5.0,
+    on_found: OnFound | None = None,
+) -> list[str | None]:
+    """
+    Resolves document pages over plain HTTP first and only launches
+    Chromium for the pages whose static HTML had no usable iframe src.
+    `on_found` sees every link as it arrives, with its index in `doc_urls`.
+    """
+    results = await resolve_with_http(
+        doc_urls, workers=http_workers, rate=http_rate, on_found=on_found
+    )
+
+    misses = [i for i, link in enumerate(results) if link is None]
+    if misses:
+        print(f"    -> {len(misses)} pages need a browser.")
+        fallback = await resolve_with_browser(
+            [doc_urls[i] for i in misses],
+            workers=workers,
+            rate=rate,
+            on_found=on_found and (lambda j, link: on_found(misses[j], link)),
+        )
+        for i, link in zip(misses, fallback):
+            results[i] = link
+
+    return results
@@ -0,0 +1,81 @@
+import hashlib
+import json
+import os
+import pathlib
+
+CACHE_DIR = ".llm_cache"
+MAX_CACHE_BYTES = 256 * 1024 * 1024
+
+
+def _sha256(text: str) -> str:
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def cache_key(
+    pdf_sha256: str, model: str, prompt: str, schema: dict, variant: str = ""
+) -> str:
+    """
+    Key for one extraction: same PDF, model, prompt and response schema
+    give an equivalent answer, so any change to one of them is a miss.
+    `variant` separates answers for transformed inputs (e.g. sliced PDFs).
+    """
+    prompt_hash = _sha256(prompt)
+    schema_hash = _sha256(json.dumps(schema, sort_keys=True))
+    key = f"{pdf_sha256}:{model}:{prompt_hash}:{schema_hash}"
+    if variant:
+        key += f":{variant}"
+    return _sha256(key)
+
+
+class ResponseCache:
+    """
+    On-disk cache of raw model responses, one file per key.
+
+    Reads bump the file's mtime, so evicting by oldest mtime once the cache
+    grows past `max_bytes` drops the least recently used entries first.
+    """
+
+    def __init__(
+        self, root: str | os.PathLike = CACHE_DIR, max_bytes: int = MAX_CACHE_BYTES
+    ):
+        self.root = pathlib.Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.size = sum(path.stat().st_size for path in self.root.glob("*.json"))
+
+    def _path(self, key: str) -> pathlib.Path:
+        return self.root / f"{key}.json"
+
+    def get(self, key: str) -> str | None:
+        path = self._path(key)
+        try:
+            text = path.read_text(encoding="utf-8")
+        except FileNotFoundError:
+            return None
+        os.utime(path)
+        return text
+
+    def put(self, key: str, text: str):
+        path = self._path(key)
+        old_size = path.stat().st_size if path.exists() else 0
+
+        tmp_path = path.with_suffix(".tmp")
+        tmp_path.write_text(text, encoding="utf-8")
+        os.replace(tmp_path, path)
+
+        self.size += path.stat().st_size - old_size
+        if self.size > self.max_bytes:
+            self.evict()
+
+    def evict(self):
+        """Deletes least recently used entries until the cache fits max_bytes."""
+        entries = sorted(
+            (path.stat().st_mtime, path.stat().st_size, path)
+            for path in self.root.glob("*.json")
+        )
+        self.size = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if self.size <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            self.size -= size
@@ -0,0 +1,232 @@
+import argparse
+import json
+import statistics
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+TRACE_PATH = "pipeline_trace.jsonl"
+METRICS_PORT = 9108
+
+# Seconds histograms are named "<span>_seconds".
+SECONDS_SUFFIX = "_seconds"
+
+
+def _key(name: str, labels: dict) -> tuple:
+    return (name, tuple(sorted(labels.items())))
+
+
+def _format_labels(labels: tuple) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in labels) + "}"
+
+
+class Metrics:
+    """
+    Counters and histograms keyed by name and labels, plus an optional
+    JSON-lines trace of every observation and span. Thread-safe, since
+    pipeline.py runs stages in threads; one process-wide instance
+    (METRICS) is shared by every module.
+
+    Labels should be low-cardinality (stage, endpoint, state); per-report
+    details like titles go in a span's `attrs`, which only reach the trace.
+    """
+
+    def __init__(self):
+        self.counters: dict[tuple, float] = {}
+        self.histograms: dict[tuple, list[float]] = {}
+        self.trace_file = None
+        self._lock = threading.Lock()
+
+    def open_trace(self, path: str = TRACE_PATH):
+        self.trace_file = open(path, "a", encoding="utf-8", buffering=1)
+
+    def close(self):
+        if self.trace_file is not None:
+            self.trace_file.close()
+            self.trace_file = None
+
+    def reset(self):
+        with self._lock:
+            self.counters.clear()
+            self.histograms.clear()
+
+    def _trace(self, record: dict):
+        if self.trace_file is None:
+            return
+        record = {"ts": datetime.now(timezone.utc).isoformat(), **record}
+        line = json.dumps(record, default=str)
+        with self._lock:
+            self.trace_file.write(line + "\n")
+
+    def inc(self, name: str, value: float = 1, **labels):
+        key = _key(name, labels)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+        self._trace({"type": "counter", "name": name, "labels": labels, "value": value})
+
+    def observe(self, name: str, value: float, **labels):
+        key = _key(name, labels)
+        with self._lock:
+            self.histograms.setdefault(key, []).append(value)
+        self._trace({"type": "histogram", "name": name, "labels": labels, "value": value})
+
+    @contextmanager
+    def span(self, name: str, attrs: dict | None = None, **labels):
+        """
+        Times the block into the "<name>_seconds" histogram and traces it,
+        with whether it raised. Works around awaits too.
+        """
+        start = time.perf_counter()
+        error = None
+        try:
+            yield
+        except BaseException as e:
+            error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            duration = time.perf_counter() - start
+            key = _key(name + SECONDS_SUFFIX, labels)
+            with self._lock:
+                self.histograms.setdefault(key, []).append(duration)
+            self._trace(
+                {
+                    "type": "span",
+                    "name": name,
+                    "labels": labels,
+                    "duration": duration,
+                    "error": error,
+                    **(attrs or {}),
+                }
+            )
+
+    def counter(self, name: str, **labels) -> float:
+        return self.counters.get(_key(name, labels), 0)
+
+    def values(self, name: str, **labels) -> list[float]:
+        return list(self.histograms.get(_key(name, labels), []))
+
+    def summary(self) -> str:
+        """End-of-run table: every counter, then count/mean/p50/p95/max per histogram."""
+        with self._lock:
+            counters = sorted(self.counters.items())
+            histograms = sorted((k, list(v)) for k, v in self.histograms.items())
+
+        lines = []
+        if counters:
+            lines.append(f"{'COUNTER':<52} | {'VALUE':>12}")
+            lines.append("-" * 67)
+            for (name, labels), value in counters:
+                lines.append(f"{name + _format_labels(labels):<52} | {value:>12,.0f}")
+        if histograms:
+            if lines:
+                lines.append("")
+            lines.append(
+                f"{'HISTOGRAM':<52} | {'COUNT':>7} | {'MEAN':>9} | {'P50':>9} | {'P95':>9} | {'MAX':>9}"
+            )
+            lines.append("-" * 108)
+            for (name, labels), values in histograms:
+                p50, p95 = _quantiles(values)
+                lines.append(
+                    f"{name + _format_labels(labels):<52} | {len(values):>7} | "
+                    f"{statistics.fmean(values):>9.3f} | {p50:>9.3f} | {p95:>9.3f} | {max(values):>9.3f}"
+                )
+        return "\n".join(lines)
+
+    def prometheus_text(self) -> str:
+        """Prometheus text exposition: counters, and histograms as summaries."""
+        with self._lock:
+            counters = sorted(self.counters.items())
+            histograms = sorted((k, list(v)) for k, v in self.histograms.items())
+
+        lines = []
+        typed = set()
+        for (name, labels), value in counters:
+            if name not in typed:
+                lines.append(f"# TYPE {name} counter")
+                typed.add(name)
+            lines.append(f"{name}{_format_labels(labels)} {value}")
+        for (name, labels), values in histograms:
+            if name not in typed:
+                lines.append(f"# TYPE {name} summary")
+                typed.add(name)
+            for quantile, value in zip(("0.5", "0.95"), _quantiles(values)):
+                quantile_labels = labels + (("quantile", quantile),)
+                lines.append(f"{name}{_format_labels(quantile_labels)} {value}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {sum(values)}")
+            lines.append(f"{name}_count{_format_labels(labels)} {len(values)}")
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port: int = METRICS_PORT) -> ThreadingHTTPServer:
+        """Serves prometheus_text() at /metrics from a daemon thread."""
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path != "/metrics":
+                    self.send_error(404)
+                    return
+                body = metrics.prometheus_text().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        print(f">>> Serving metrics at http://127.0.0.1:{server.server_port}/metrics")
+        return server
+
+
+def _quantiles(values: list[float]) -> tuple[float, float]:
+    if len(values) < 2:
+        return values[0], values[0]
+    cuts = statistics.quantiles(values, n=20, method="inclusive")
+    return cuts[9], cuts[18]
+
+
+METRICS = Metrics()
+
+
+def add_metrics_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument(
+        "--trace",
+        nargs="?",
+        const=TRACE_PATH,
+        default=None,
+        help=f"Append a JSON-lines trace of every span and metric (default file: {TRACE_PATH}).",
+    )
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        default=None,
+        help="Serve Prometheus metrics at http://127.0.0.1:PORT/metrics during the run.",
+    )
+
+
+@contextmanager
+def instrumented_run(trace_path: str | None = None, metrics_port: int | None = None):
+    """
+    Wraps an entry point: optionally traces to `trace_path` and serves
+    /metrics on `metrics_port`, and prints the summary when the run ends.
+    """
+    if trace_path:
+        METRICS.open_trace(trace_path)
+    server = METRICS.serve(metrics_port) if metrics_port else None
+    try:
+        yield METRICS
+    finally:
+        print("\n>>> Run metrics:")
+        print(METRICS.summary() or "   -> nothing recorded")
+        METRICS.close()
+        if server is not None:
+            server.shutdown()
+            server.server_close()
@@ -0,0 +1,193 @@
+import os
+from enum import Enum
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from dataset_store import NUMERIC_COLUMNS
+
+FX_TABLE_CSV = "fx_rates.csv"
+BASE_CURRENCY = "KES"
+
+
+class Scale(str, Enum):
+    UNITS = "Units"
+    THOUSANDS = "Thousands"
+    MILLIONS = "Millions"
+    BILLIONS = "Billions"
+
+
+class Currency(str, Enum):
+    KES = "KES"
+    USD = "USD"
+    EUR = "EUR"
+    GBP = "GBP"
+    UGX = "UGX"
+    TZS = "TZS"
+    RWF = "RWF"
+    ZAR = "ZAR"
+
+
+SCALE_FACTORS = {
+    Scale.UNITS: 1.0,
+    Scale.THOUSANDS: 1e3,
+    Scale.MILLIONS: 1e6,
+    Scale.BILLIONS: 1e9,
+}
+
+# Free text as it comes out of the LLM / rule extractor, lower-cased with
+# spaces, dots and quotes stripped -> enum.
+SCALE_ALIASES = {
+    "": Scale.UNITS,
+    "units": Scale.UNITS,
+    "unit": Scale.UNITS,
+    "ones": Scale.UNITS,
+    "none": Scale.UNITS,
+    "thousands": Scale.THOUSANDS,
+    "thousand": Scale.THOUSANDS,
+    "000": Scale.THOUSANDS,
+    "000s": Scale.THOUSANDS,
+    "k": Scale.THOUSANDS,
+    "millions": Scale.MILLIONS,
+    "million": Scale.MILLIONS,
+    "mn": Scale.MILLIONS,
+    "m": Scale.MILLIONS,
+    "mln": Scale.MILLIONS,
+    "billions": Scale.BILLIONS,
+    "billion": Scale.BILLIONS,
+    "bn": Scale.BILLIONS,
+    "b": Scale.BILLIONS,
+}
+CURRENCY_ALIASES = {
+    "kes": Currency.KES,
+    "kshs": Currency.KES,
+    "ksh": Currency.KES,
+    "shs": Currency.KES,
+    "sh": Currency.KES,
+    "kenyashillings": Currency.KES,
+    "usd": Currency.USD,
+    "us$": Currency.USD,
+    "$": Currency.USD,
+    "eur": Currency.EUR,
+    "€": Currency.EUR,
+    "gbp": Currency.GBP,
+    "£": Currency.GBP,
+    "ugx": Currency.UGX,
+    "ushs": Currency.UGX,
+    "tzs": Currency.TZS,
+    "tshs": Currency.TZS,
+    "rwf": Currency.RWF,
+    "zar": Currency.ZAR,
+    "r": Currency.ZAR,
+}
+ALIAS_JUNK = r"[\s.'’`,]+"
+
+# Money columns get scale and FX; per-share values only FX; share counts
+# are left as reported.
+PER_SHARE_COLUMNS = ["income_statement.eps_diluted"]
+COUNT_COLUMNS = ["income_statement.weighted_average_shares"]
+
+
+def _canonical(values: pd.Series, aliases: dict, enum: type[Enum]) -> pd.Series:
+    """Maps free text to enum values once per distinct string, not per row."""
+    text = values.astype("string").str.lower().str.replace(ALIAS_JUNK, "", regex=True)
+    mapped = text.map({key: member.value for key, member in aliases.items()})
+    categories = [member.value for member in enum]
+    return pd.Categorical(mapped, categories=categories)
+
+
+def canonical_scale(values: pd.Series) -> pd.Series:
+    """"Millions", "mn", "'000" ... -> Scale values; unknown text -> NaN."""
+    return pd.Series(_canonical(values, SCALE_ALIASES, Scale), index=values.index)
+
+
+def canonical_currency(values: pd.Series) -> pd.Series:
+    """"KShs", "Shs", "$" ... -> Currency values; unknown text -> NaN."""
+    return pd.Series(_canonical(values, CURRENCY_ALIASES, Currency), index=values.index)
+
+
+class FxTable:
+    """
+    Year-end exchange rates as `base` per unit of each currency, loaded from
+    a small local CSV (currency, year_end, rate). A row applies to every
+    fiscal year-end on or after its date until the next row.
+    """
+
+    def __init__(self, rates: pd.DataFrame, base: str = BASE_CURRENCY):
+        self.base = base
+        rates = rates.assign(
+            currency=canonical_currency(rates["currency"]).astype(str),
+            year_end=pd.to_datetime(rates["year_end"]).astype("datetime64[ns]"),
+            rate=rates["rate"].astype(float),
+        )
+        # The base currency converts to itself at every date.
+        identity = pd.DataFrame(
+            {"currency": [base], "year_end": [pd.Timestamp.min], "rate": [1.0]}
+        )
+        self.rates = pd.concat([rates, identity], ignore_index=True).sort_values("year_end")
+
+    @classmethod
+    def load(cls, path: str | os.PathLike = FX_TABLE_CSV) -> "FxTable":
+        """Reads the CSV once per file version; an absent file means base-only."""
+        mtime = os.path.getmtime(path) if os.path.exists(path) else None
+        return _load_fx_table(os.fspath(path), mtime)
+
+    def rates_for(self, currencies: pd.Series, year_ends: pd.Series) -> pd.Series:
+        """The rate in force at each year-end, NaN where the table has none."""
+        lookup = pd.DataFrame(
+            {
+                "currency": currencies.astype(str),
+                "year_end": pd.to_datetime(year_ends).astype("datetime64[ns]"),
+                "_row": np.arange(len(currencies)),
+            }
+        ).sort_values("year_end")
+        matched = pd.merge_asof(
+            lookup, self.rates, on="year_end", by="currency", direction="backward"
+        ).sort_values("_row")
+        return pd.Series(matched["rate"].to_numpy(), index=currencies.index)
+
+
+@lru_cache(maxsize=4)
+def _load_fx_table(path: str, mtime: float | None) -> FxTable:
+    if mtime is None:
+        return FxTable(pd.DataFrame(columns=["currency", "year_end", "rate"]))
+    return FxTable(pd.read_csv(path))
+
+
+def fiscal_year_ends(df: pd.DataFrame) -> pd.Series:
+    """The `fiscal_year_end` column if present, else 31 December of fiscal_year."""
+    years = df["fiscal_year"].astype("Int64").astype(str)
+    default = pd.to_datetime(years + "-12-31", errors="coerce")
+    if "fiscal_year_end" in df:
+        return pd.to_datetime(df["fiscal_year_end"]).fillna(default)
+    return default
+
+
+def normalize(
+    df: pd.DataFrame, fx: FxTable | None = None, columns: list[str] | None = None
+) -> pd.DataFrame:
+    """
+    Converts the numeric columns of a flat dataset frame to units of the
+    FX table's base currency. Adds `currency` and `scale_unit` (canonical),
+    `fx_rate` and `normalized` (False where the scale, currency or rate is
+    unknown, in which case the numbers are left as NaN).
+    """
+    fx = fx or FxTable.load()
+    columns = [column for column in (columns or NUMERIC_COLUMNS) if column in df]
+    out = df.copy()
+
+    out["currency"] = canonical_currency(df["currency_symbol"])
+    out["scale_unit"] = canonical_scale(df["scale"])
+    out["fx_rate"] = fx.rates_for(out["currency"], fiscal_year_ends(df))
+    out["normalized"] = out["scale_unit"].notna() & out["fx_rate"].notna()
+
+    scale_factor = out["scale_unit"].map(
+        {member.value: factor for member, factor in SCALE_FACTORS.items()}
+    ).astype(float)
+    money = [c for c in columns if c not in PER_SHARE_COLUMNS + COUNT_COLUMNS]
+    per_share = [c for c in columns if c in PER_SHARE_COLUMNS]
+
+    out[money] = df[money].mul(scale_factor * out["fx_rate"], axis=0)
+    out[per_share] = df[per_share].mul(out["fx_rate"], axis=0)
+    return out
@@ -1,14 +1,116 @@
-import re
+import argparse
+import os
+from collections.abc import Iterator
+from dataclasses import dataclass
 from datetime import datetime
 
 import httpx
 import pandas as pd
 from bs4 import BeautifulSoup
+from lxml import etree, html
 
 from utils import clean_company_name
 
+NSE_URL = "https://www.nse.co.ke/listed-companies/"
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+}
 
-def parse_nse_data(html_content):
+EXCHANGE = "Nairobi Securities Exchange PLC"
+MISSING = "N/A"
+
+
+def _has_class(name: str) -> str:
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+# Compiled once; each one only visits the nodes it needs.
+SECTOR_TOGGLES = etree.XPath(f"//div[{_has_class('toggle')}]")
+SECTOR_HEADING = etree.XPath(f"(.//a[{_has_class('toggle-heading')}])[1]")
+COMPANY_BLOCKS = etree.XPath(f".//div[{_has_class('nse_comptext')}]")
+NAME_HEADING = etree.XPath(
+    f"(preceding-sibling::div[{_has_class('nectar-animated-title')}][1]//h6)[1]"
+)
+
+# Text inside these never shows on the page.
+SKIPPED_TAGS = {"script", "style"}
+
+
+@dataclass(frozen=True)
+class ListedCompany:
+    exchange: str
+    sector: str
+    symbol: str
+    isin: str
+    company: str
+
+    def as_row(self) -> dict:
+        """The row parse_nse_data has always produced (CSV column names)."""
+        return {
+            "Exchange": self.exchange,
+            "Sector": self.sector,
+            "Symbol": self.symbol,
+            "ISIN": self.isin,
+            "Company": self.company,
+        }
+
+
+def _strings(element) -> Iterator[str]:
+    """Text nodes under `element`, like BeautifulSoup: no comments, scripts or styles."""
+    if isinstance(element.tag, str) and element.tag not in SKIPPED_TAGS and element.text:
+        yield element.text
+    for child in element:
+        if isinstance(child.tag, str):
+            yield from _strings(child)
+        if child.tail:
+            yield child.tail
+
+
+def _text(element) -> str:
+    """Equivalent of BeautifulSoup's get_text(strip=True)."""
+    return "".join(part.strip() for part in _strings(element))
+
+
+def parse_listed_companies(html_content: str | bytes) -> Iterator[ListedCompany]:
+    """
+    lxml backend of parse_nse_data: targeted XPath lookups over a C-built
+    tree instead of a full BeautifulSoup tree, yielding one typed record
+    per company block. Same rules, same output.
+    """
+    root = html.fromstring(html_content)
+
+    for toggle in SECTOR_TOGGLES(root):
+        headings = SECTOR_HEADING(toggle)
+        if not headings:
+            continue
+        sector = _text(headings[0])
+
+        for block in COMPANY_BLOCKS(toggle):
+            symbol = isin = company = MISSING
+
+            text_content = "|".join(_strings(block)).strip()
+            for part in text_content.split("|"):
+                part = part.strip().replace("\xa0", " ")
+                if "Trading Symbol" in part:
+                    symbol = part.split(":")[-1].strip()
+                elif "ISIN" in part:
+                    isin = part.split(":")[-1].strip()
+
+            names = NAME_HEADING(block)
+            if names:
+                company = clean_company_name(_text(names[0]))
+
+            yield ListedCompany(EXCHANGE, sector, symbol, isin, company)
+
+
+def parse_nse_data(html_content, backend: str = "lxml") -> list[dict]:
+    """Rows of the listed-companies page; `backend` is "lxml" or "soup"."""
+    if backend == "soup":
+        return parse_nse_data_soup(html_content)
+    return [company.as_row() for company in parse_listed_companies(html_content)]
+
+
+def parse_nse_data_soup(html_content) -> list[dict]:
     soup = BeautifulSoup(html_content, "html.parser")
 
     extracted_data = []
@@ -27,11 +129,11 @@ def parse_nse_data(html_content):
 
         for block in company_blocks:
             company_info = {
-                "Exchange": "Nairobi Securities Exchange PLC",
+                "Exchange": EXCHANGE,
                 "Sector": sector_name,
-                "Symbol": "N/A",
-                "ISIN": "N/A",
-                "Company": "N/A",
+                "Symbol": MISSING,
+                "ISIN": MISSING,
+                "Company": MISSING,
             }
 
             text_content = block.get_text(separator="|").strip()
@@ -61,39 +163,52 @@ def parse_nse_data(html_content):
     return extracted_data
 
 
-if __name__ == "__main__":
-    # 1. READ FILE (Save your HTML paste to a file named nse.html)
-    try:
-        url = "https://www.nse.co.ke/listed-companies/"
-
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-        }
-
-        response = httpx.get(url, headers=headers, timeout=10.0)
-        response.raise_for_status()
-
-        print("Parsing HTML...")
-        data = parse_nse_data(response.text)
-
-        # # 2. DISPLAY RESULTS
-        # print(f"{'SECTOR':<30} | {'SYMBOL':<10} | {'ISIN':<15} | {'COMPANY'}")
-        # print("-" * 90)
-        # for item in data:
-        #     print(
-        #         f"{item['Sector'][:28]:<30} | {item['Symbol']:<10} | {item['ISIN']:<15} | {item['Company']}"
-        #     )
-
-        # 3. OPTIONAL: Save to CSV
-        df = pd.DataFrame(data)
+def fetch_listed_companies(url: str = NSE_URL, backend: str = "lxml") -> list[dict]:
+    response = httpx.get(url, headers=HEADERS, timeout=10.0)
+    response.raise_for_status()
+
+    print("Parsing HTML...")
+    return parse_nse_data(response.text, backend=backend)
+
+
+def parse_snapshots(paths: list[str], backend: str = "lxml") -> pd.DataFrame:
+    """
+    Parses saved copies of the page (e.g. archived snapshots) into one
+    frame, with a Snapshot column naming the file each row came from.
+    """
+    frames = []
+    for path in paths:
+        with open(path, "rb") as f:
+            companies = parse_nse_data(f.read(), backend=backend)
+        frame = pd.DataFrame(companies)
+        frame["Snapshot"] = os.path.basename(path)
+        frames.append(frame)
+        print(f"   -> {path}: {len(companies)} companies")
+    return pd.concat(frames, ignore_index=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scrape the NSE listed-companies page.")
+    parser.add_argument(
+        "--html",
+        nargs="+",
+        help="Parse these saved copies of the page instead of fetching it.",
+    )
+    parser.add_argument("--backend", choices=["lxml", "soup"], default="lxml")
+    args = parser.parse_args()
+
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+
+    if args.html:
+        df = parse_snapshots(args.html, backend=args.backend)
+        filename = f"nse_listed_companies_snapshots_{timestamp}.csv"
+    else:
+        df = pd.DataFrame(fetch_listed_companies(backend=args.backend))
+        filename = f"nse_listed_companies_{timestamp}.csv"
 
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    df.to_csv(filename, index=False)
+    print(f"\nSaved {len(df)} companies to {filename}")
 
-        filename = f"nse_listed_companies_{timestamp}.csv"
-        df.to_csv(filename, index=False)
-        print(f"\nSaved {len(data)} companies to {filename}")
 
-    except FileNotFoundError:
-        print(
-            "Please save the HTML content into a file named 'nse.html' in the same folder."
-        )
+if __name__ == "__main__":
+    main()
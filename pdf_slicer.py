@@ -0,0 +1,157 @@
+import os
+import re
+
+from pypdf import PdfReader, PdfWriter
+
+# Bump when the scoring changes, so cached extractions of old slices miss.
+SLICER_VERSION = "1"
+
+# Statement titles as they appear at the top of IFRS statement pages.
+STATEMENT_HEADINGS = {
+    "income_statement": (
+        "statement of profit or loss",
+        "statement of comprehensive income",
+        "income statement",
+        "profit and loss account",
+    ),
+    "balance_sheet": (
+        "statement of financial position",
+        "balance sheet",
+    ),
+    "cash_flow": (
+        "statement of cash flows",
+        "statement of cash flow",
+        "cash flow statement",
+    ),
+}
+
+# Line items the schema asks for; statement pages list many of them.
+LINE_ITEMS = {
+    "income_statement": (
+        "revenue",
+        "turnover",
+        "gross profit",
+        "operating profit",
+        "profit before tax",
+        "income tax",
+        "profit for the year",
+        "earnings per share",
+        "finance costs",
+    ),
+    "balance_sheet": (
+        "total assets",
+        "current assets",
+        "current liabilities",
+        "total liabilities",
+        "total equity",
+        "trade and other receivables",
+        "borrowings",
+        "retained earnings",
+    ),
+    "cash_flow": (
+        "operating activities",
+        "investing activities",
+        "financing activities",
+        "purchase of property",
+        "cash and cash equivalents",
+        "depreciation",
+    ),
+}
+
+# Pages that discuss the statements rather than present them.
+NARRATIVE_MARKERS = (
+    "notes to the financial statements",
+    "independent auditor",
+    "directors' report",
+    "chairman",
+)
+
+HEADING_WEIGHT = 6.0
+LINE_ITEM_WEIGHT = 1.0
+NARRATIVE_PENALTY = 4.0
+MAX_NUMBER_SCORE = 4.0
+
+# Numbers as printed in statements: 1,234  (1,234)  12,345.6
+NUMBER_PATTERN = re.compile(r"\(?\d{1,3}(?:,\d{3})+(?:\.\d+)?\)?")
+WHITESPACE = re.compile(r"\s+")
+
+
+def score_page(text: str) -> dict[str, float]:
+    """Scores how much a page's text looks like each financial statement."""
+    text = WHITESPACE.sub(" ", text.lower())
+    number_score = min(len(NUMBER_PATTERN.findall(text)) / 10, MAX_NUMBER_SCORE)
+    penalty = NARRATIVE_PENALTY * sum(marker in text for marker in NARRATIVE_MARKERS)
+
+    scores = {}
+    for statement, headings in STATEMENT_HEADINGS.items():
+        heading_score = HEADING_WEIGHT * any(heading in text for heading in headings)
+        line_score = LINE_ITEM_WEIGHT * sum(item in text for item in LINE_ITEMS[statement])
+        scores[statement] = heading_score + line_score + number_score - penalty
+    return scores
+
+
+def find_statement_pages(
+    page_texts: list[str],
+    min_score: float = 10.0,
+    pages_per_statement: int = 2,
+    spill_over: int = 1,
+) -> list[int]:
+    """
+    Picks the best-scoring pages for each statement (group and company
+    versions usually both appear, hence two per statement), plus the
+    `spill_over` pages after each, since statements often run onto the
+    next page. Returns sorted zero-based page indices.
+    """
+    scores = [score_page(text) for text in page_texts]
+
+    selected = set()
+    for statement in STATEMENT_HEADINGS:
+        ranked = sorted(
+            range(len(scores)), key=lambda i: scores[i][statement], reverse=True
+        )
+        for i in ranked[:pages_per_statement]:
+            if scores[i][statement] < min_score:
+                break
+            selected.update(range(i, min(i + spill_over + 1, len(page_texts))))
+
+    return sorted(selected)
+
+
+def read_page_texts(pdf: str | os.PathLike | PdfReader) -> list[str]:
+    """Text layer of every page ("" for image-only pages)."""
+    reader = pdf if isinstance(pdf, PdfReader) else PdfReader(pdf)
+    return [page.extract_text() or "" for page in reader.pages]
+
+
+def slice_pdf(
+    src_path: str | os.PathLike,
+    dest_path: str | os.PathLike,
+    max_fraction: float = 0.5,
+) -> list[int] | None:
+    """
+    Writes a sub-PDF of just the financial statement pages of `src_path`.
+
+    Returns the kept page indices, or None when slicing isn't worth it:
+    no text layer (scanned report), no statement pages found, or the
+    selection would keep more than `max_fraction` of the document.
+    """
+    # Parsed once: the same reader supplies the pages to copy.
+    reader = PdfReader(src_path)
+    page_texts = read_page_texts(reader)
+    if not any(text.strip() for text in page_texts):
+        return None
+
+    pages = find_statement_pages(page_texts)
+    if not pages or len(pages) > max_fraction * len(page_texts):
+        return None
+
+    writer = PdfWriter()
+    for i in pages:
+        writer.add_page(reader.pages[i])
+    # Callers trust an existing slice, so never leave a partial one behind.
+    tmp_path = f"{dest_path}.tmp"
+    with open(tmp_path, "wb") as f:
+        writer.write(f)
+    os.replace(tmp_path, dest_path)
+
+    return pages
@@ -0,0 +1,230 @@
+import asyncio
+import hashlib
+import json
+import os
+import pathlib
+
+import httpx
+
+from metrics import METRICS
+from resilience import CircuitOpenError, Resilience, endpoint
+from utils import drive_confirm_request
+
+STORE_DIR = "downloaded_reports"
+
+# 1 MiB chunks keep RSS flat regardless of report size.
+CHUNK_SIZE = 1 << 20
+
+
+class PdfStore:
+    """
+    Content-addressed PDF store on disk.
+
+    Layout under `root`:
+        objects/<sha[:2]>/<sha>.pdf   finished files, named by SHA-256
+        partial/<sha256(url)>.part    in-progress downloads, resumable
+        sliced/<sha>.pdf              statement pages only (see pdf_slicer)
+        index.jsonl                   append-only title -> sha256 records
+    """
+
+    def __init__(self, root: str | os.PathLike = STORE_DIR):
+        self.root = pathlib.Path(root)
+        self.objects_dir = self.root / "objects"
+        self.partial_dir = self.root / "partial"
+        self.sliced_dir = self.root / "sliced"
+        self.index_path = self.root / "index.jsonl"
+
+        self.objects_dir.mkdir(parents=True, exist_ok=True)
+        self.partial_dir.mkdir(parents=True, exist_ok=True)
+        self.sliced_dir.mkdir(parents=True, exist_ok=True)
+
+        # Links downloaded by this process; one lock per link, because
+        # titles that share a link would share its partial file.
+        self.downloaded: dict[str, str] = {}
+        self._url_locks: dict[str, asyncio.Lock] = {}
+
+        self.index: dict[str, str] = {}
+        if self.index_path.exists():
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        record = json.loads(line)
+                        self.index[record["title"]] = record["sha256"]
+
+    def path_for(self, sha256: str) -> pathlib.Path:
+        return self.objects_dir / sha256[:2] / f"{sha256}.pdf"
+
+    def sliced_path(self, sha256: str) -> pathlib.Path:
+        return self.sliced_dir / f"{sha256}.pdf"
+
+    def partial_path(self, url: str) -> pathlib.Path:
+        return self.partial_dir / f"{hashlib.sha256(url.encode()).hexdigest()}.part"
+
+    def url_lock(self, url: str) -> asyncio.Lock:
+        return self._url_locks.setdefault(url, asyncio.Lock())
+
+    def lookup(self, title: str) -> pathlib.Path | None:
+        """Path of the stored PDF for `title`, or None if not downloaded yet."""
+        sha256 = self.index.get(title)
+        if sha256 is None:
+            return None
+        path = self.path_for(sha256)
+        return path if path.exists() else None
+
+    def record(self, title: str, sha256: str):
+        self.index[title] = sha256
+        with open(self.index_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"title": title, "sha256": sha256}) + "\n")
+
+    def commit(self, partial: pathlib.Path, sha256: str) -> pathlib.Path:
+        """Moves a finished download into the object store (dedup by hash)."""
+        path = self.path_for(sha256)
+        if path.exists():
+            partial.unlink()
+        else:
+            path.parent.mkdir(exist_ok=True)
+            os.replace(partial, path)
+        return path
+
+
+def _hash_file(path: pathlib.Path):
+    hasher = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(CHUNK_SIZE):
+            hasher.update(chunk)
+    return hasher
+
+
+async def stream_download(
+    client: httpx.AsyncClient, url: str, partial: pathlib.Path
+) -> str:
+    """
+    Streams `url` into `partial` chunk by chunk and returns the SHA-256 of
+    the full file. If `partial` already holds bytes from an interrupted run,
+    only the remainder is requested with a Range header; servers that ignore
+    the range (200 instead of 206) restart the file from zero.
+    """
+    offset = partial.stat().st_size if partial.exists() else 0
+    hasher = _hash_file(partial) if offset else hashlib.sha256()
+    params = None
+
+    for _ in range(2):
+        headers = {"Range": f"bytes={offset}-"} if offset else {}
+
+        async with client.stream("GET", url, params=params, headers=headers) as response:
+            # Range starts at the end of the file: the previous run got it all.
+            if response.status_code == 416 and offset:
+                return hasher.hexdigest()
+
+            response.raise_for_status()
+
+            # Large Drive files answer with a "can't scan for viruses" page first.
+            if "text/html" in response.headers.get("content-type", ""):
+                await response.aread()
+                confirm = drive_confirm_request(
+                    response.text, response.cookies, str(response.url)
+                )
+                if confirm is None:
+                    raise ValueError(f"Got an HTML page instead of a PDF for {url}")
+                url, params = confirm
+                continue
+
+            if response.status_code != 206 and offset:
+                offset = 0
+                hasher = hashlib.sha256()
+
+            written = 0
+            with open(partial, "ab" if offset else "wb") as f:
+                async for chunk in response.aiter_bytes(CHUNK_SIZE):
+                    f.write(chunk)
+                    hasher.update(chunk)
+                    written += len(chunk)
+
+            METRICS.inc("download_bytes", written)
+            if offset:
+                METRICS.inc("downloads_resumed")
+            return hasher.hexdigest()
+
+    raise ValueError(f"Drive kept returning the confirmation page for {url}")
+
+
+def new_download_client(workers: int = 4, **kwargs) -> httpx.AsyncClient:
+    """Shared connection pool for PDF downloads."""
+    return httpx.AsyncClient(
+        follow_redirects=True,
+        timeout=httpx.Timeout(30.0, read=300.0),
+        limits=httpx.Limits(
+            max_connections=workers, max_keepalive_connections=workers
+        ),
+        **kwargs,
+    )
+
+
+async def download_to_store(
+    store: PdfStore,
+    client: httpx.AsyncClient,
+    title: str,
+    url: str,
+    resilience: Resilience | None = None,
+) -> pathlib.Path:
+    """
+    Downloads one report into the store (or returns it if already there).
+    With `resilience`, transient failures are retried; each retry resumes
+    from the bytes already in the partial file. Titles sharing a link wait
+    for each other and then reuse the one download.
+    """
+    existing = store.lookup(title)
+    if existing is not None:
+        return existing
+
+    async with store.url_lock(url):
+        sha256 = store.downloaded.get(url)
+        if sha256 is None or not store.path_for(sha256).exists():
+            partial = store.partial_path(url)
+            with METRICS.span("download", attrs={"title": title}):
+                if resilience is None:
+                    sha256 = await stream_download(client, url, partial)
+                else:
+                    sha256 = await resilience.call(
+                        endpoint(url), stream_download, client, url, partial
+                    )
+            store.commit(partial, sha256)
+            store.downloaded[url] = sha256
+    store.record(title, sha256)
+    return store.path_for(sha256)
+
+
+async def download_all(
+    store: PdfStore, reports: list[tuple[str, str]], workers: int = 4, client=None
+) -> list[pathlib.Path | None]:
+    """
+    Downloads (title, url) pairs concurrently over one connection pool.
+    Returns store paths in input order, None for failed downloads; their
+    partial files stay on disk so the next run resumes them.
+    """
+    results: list[pathlib.Path | None] = [None] * len(reports)
+    semaphore = asyncio.Semaphore(workers)
+    resilience = Resilience(concurrency=workers)
+
+    async def download(index: int, title: str, url: str, client: httpx.AsyncClient):
+        async with semaphore:
+            try:
+                results[index] = await download_to_store(
+                    store, client, title, url, resilience
+                )
+                print(f"   -> SUCCESS: {title}")
+            except (httpx.HTTPError, ValueError, CircuitOpenError) as e:
+                print(f"   -> FAILED: {title}: {e}")
+
+    async def download_every(client: httpx.AsyncClient):
+        await asyncio.gather(
+            *(download(i, title, url, client) for i, (title, url) in enumerate(reports))
+        )
+
+    if client is None:
+        async with new_download_client(workers) as client:
+            await download_every(client)
+    else:
+        await download_every(client)
+
+    return results
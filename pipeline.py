@@ -0,0 +1,261 @@
+import argparse
+import hashlib
+import json
+import os
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from graphlib import TopologicalSorter
+from typing import Callable
+
+from company_master import COMPANIES_CSV
+from dataset_store import DATASET_DIR
+from metrics import METRICS, add_metrics_arguments, instrumented_run
+
+STATE_PATH = ".pipeline_state.json"
+
+QUEUE_CSV = "annual_reports_queue.csv"
+ANNUAL_REPORTS_CSV = "annual_reports_cleaned.csv"
+READY_CSV = "annual_reports_ready_for_ai.csv"
+EXTRACTED_JSONL = "financial_data_extracted.jsonl"
+
+
+@dataclass
+class Stage:
+    """
+    One step of the workflow. A stage runs after every stage that produces
+    one of its `inputs`; `run` is called with the stage itself so it can
+    read `workers` and `params`.
+    """
+
+    name: str
+    run: Callable[["Stage"], None]
+    inputs: list[str] = field(default_factory=list)
+    outputs: list[str] = field(default_factory=list)
+    workers: int = 1
+    params: dict = field(default_factory=dict)
+    # Reads from the web, so unchanged local inputs say nothing about it.
+    always_run: bool = False
+
+
+def file_digest(path: str) -> str | None:
+    """SHA-256 of a file, "dir" for directories, None if it doesn't exist."""
+    if os.path.isdir(path):
+        return "dir"
+    if not os.path.exists(path):
+        return None
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def fingerprint(stage: Stage) -> dict:
+    """Content hashes of a stage's inputs plus its params."""
+    return {
+        "inputs": {path: file_digest(path) for path in stage.inputs},
+        "params": stage.params,
+    }
+
+
+class Orchestrator:
+    """
+    Runs stages as a DAG built from their declared inputs and outputs.
+    Independent stages run side by side. A stage is skipped when its
+    outputs exist and its inputs hash the same as on its last successful
+    run, so a refresh only pays for the stages whose inputs changed.
+
+    Stages still hand off whole files rather than streaming records. Within
+    a stage the work is incremental (links and extraction skip rows their
+    checkpoint/ledger already has), so unchanged rows cost a re-read, not a
+    re-fetch.
+    """
+
+    def __init__(self, stages: list[Stage], state_path: str = STATE_PATH):
+        self.stages = {stage.name: stage for stage in stages}
+        self.state_path = state_path
+        self.state = self._load_state()
+
+        producers = {path: stage.name for stage in stages for path in stage.outputs}
+        self.graph = {
+            stage.name: {producers[path] for path in stage.inputs if path in producers}
+            for stage in stages
+        }
+
+    def _load_state(self) -> dict:
+        if not os.path.exists(self.state_path):
+            return {}
+        with open(self.state_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _save_state(self):
+        tmp_path = f"{self.state_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.state, f, indent=2)
+        os.replace(tmp_path, self.state_path)
+
+    def is_fresh(self, stage: Stage) -> bool:
+        if stage.always_run:
+            return False
+        if not all(os.path.exists(path) for path in stage.outputs):
+            return False
+        return self.state.get(stage.name) == fingerprint(stage)
+
+    def run_stage(self, stage: Stage, force: bool = False) -> bool:
+        """Runs one stage unless it's fresh; returns whether it ran."""
+        if not force and self.is_fresh(stage):
+            print(f">>> [{stage.name}] inputs unchanged, skipping.")
+            return False
+
+        print(f">>> [{stage.name}] running with {stage.workers} worker(s)...")
+        with METRICS.span("workflow_stage", stage=stage.name):
+            stage.run(stage)
+        self.state[stage.name] = fingerprint(stage)
+        self._save_state()
+        return True
+
+    def run(self, only: set[str] | None = None, force: set[str] | None = None) -> list[str]:
+        """
+        Runs the DAG (or just the `only` stages, in DAG order) and returns
+        the names of the stages that actually ran. Stages in `force` run
+        even when fresh.
+        """
+        force = force or set()
+        sorter = TopologicalSorter(self.graph)
+        sorter.prepare()
+        ran = []
+
+        with ThreadPoolExecutor(max_workers=len(self.stages)) as pool:
+            running = {}
+            while sorter.is_active():
+                for name in sorter.get_ready():
+                    if only is not None and name not in only:
+                        sorter.done(name)
+                        continue
+                    future = pool.submit(self.run_stage, self.stages[name], name in force)
+                    running[future] = name
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    if future.result():
+                        ran.append(name)
+                    sorter.done(name)
+
+        return ran
+
+
+# --- Stage implementations. Imports are local so that e.g. the Gemini
+# settings are only needed when the extract stage actually runs.
+
+
+def fetch_companies(stage: Stage):
+    import pandas as pd
+
+    from nse_listed_companies_extraction import fetch_listed_companies
+
+    data = fetch_listed_companies()
+    pd.DataFrame(data).to_csv(stage.outputs[0], index=False)
+    print(f"   -> Saved {len(data)} companies to {stage.outputs[0]}")
+
+
+def harvest_listing(stage: Stage):
+    import asyncio
+
+    from get_website_page_for_financial_report import harvest_incrementally, upsert_queue
+
+    rows = asyncio.run(harvest_incrementally(queue_csv=stage.outputs[0]))
+    added = upsert_queue(rows, stage.outputs[0])
+    print(f"   -> Added {added} new reports to {stage.outputs[0]}")
+
+
+def filter_reports(stage: Stage):
+    from filter_annual_reports import filter_annual_reports
+
+    total, kept = filter_annual_reports(stage.inputs[0], stage.outputs[0])
+    print(f"   -> Kept {kept} of {total} reports.")
+
+
+def resolve_links(stage: Stage):
+    from download_links import main_concurrent
+
+    main_concurrent(
+        stage.workers,
+        stage.params["rate"],
+        input_csv=stage.inputs[0],
+        output_csv=stage.outputs[0],
+    )
+
+
+def extract_financials(stage: Stage):
+    from gemini_pipeline import StageLimits
+    from process_with_gemini import run_extraction
+
+    run_extraction(
+        input_csv=stage.inputs[0],
+        limits=StageLimits(
+            download=stage.workers,
+            upload=stage.workers,
+            wait=stage.workers * 2,
+            generate=stage.params["generate_workers"],
+        ),
+        slice_pages=stage.params["slice_pages"],
+        min_rule_confidence=stage.params["min_rule_confidence"],
+    )
+
+
+def default_stages(args: argparse.Namespace) -> list[Stage]:
+    return [
+        Stage(
+            "companies", fetch_companies, outputs=[COMPANIES_CSV], always_run=True
+        ),
+        Stage("harvest", harvest_listing, outputs=[QUEUE_CSV], always_run=True),
+        Stage("filter", filter_reports, inputs=[QUEUE_CSV], outputs=[ANNUAL_REPORTS_CSV]),
+        Stage(
+            "links",
+            resolve_links,
+            inputs=[ANNUAL_REPORTS_CSV],
+            outputs=[READY_CSV],
+            workers=args.link_workers,
+            params={"rate": args.link_rate},
+        ),
+        Stage(
+            "extract",
+            extract_financials,
+            inputs=[READY_CSV],
+            outputs=[EXTRACTED_JSONL, DATASET_DIR],
+            workers=args.extract_workers,
+            params={
+                "generate_workers": args.generate_workers,
+                "slice_pages": args.slice_pages,
+                "min_rule_confidence": args.min_rule_confidence,
+            },
+        ),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Run the whole NSE workflow, skipping stages whose inputs are unchanged."
+    )
+    parser.add_argument("--only", nargs="+", help="Run just these stages.")
+    parser.add_argument("--force", nargs="+", default=[], help="Run these stages even if fresh.")
+    parser.add_argument("--link-workers", type=int, default=4)
+    parser.add_argument("--link-rate", type=float, default=1.0)
+    parser.add_argument("--extract-workers", type=int, default=4)
+    parser.add_argument("--generate-workers", type=int, default=2)
+    parser.add_argument("--slice-pages", action="store_true")
+    parser.add_argument("--min-rule-confidence", type=float, default=None)
+    add_metrics_arguments(parser)
+    args = parser.parse_args()
+
+    with instrumented_run(args.trace, args.metrics_port):
+        orchestrator = Orchestrator(default_stages(args))
+        ran = orchestrator.run(
+            only=set(args.only) if args.only else None, force=set(args.force)
+        )
+        print(f">>> Pipeline done. Ran: {', '.join(ran) or 'nothing'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,109 +1,177 @@
+import argparse
+import asyncio
 import csv
-import io
 import json
-import time
 
-import httpx
 from google import genai
 
-from schemas import (
-    FinancialReportExtraction,
-)
+from dataset_store import DATASET_DIR, FinancialDataset, flatten_record
+from extraction_ledger import LEDGER_PATH, ExtractionLedger, ReportState
+from gemini_batch import BATCH_SIZE, BatchExtractionPipeline
+from gemini_pipeline import ExtractionPipeline, ReportJob, StageLimits, jobs_from_reports
+from llm_cache import CACHE_DIR, ResponseCache
+from metrics import add_metrics_arguments, instrumented_run
+from pdf_store import STORE_DIR, PdfStore
 from settings import settings
 
 INPUT_CSV = "annual_reports_ready_for_ai.csv"
 OUTPUT_JSONL = "financial_data_extracted.jsonl"
 
-
-def main():
+# Results buffered before writing a Parquet part file.
+DATASET_BATCH_SIZE = 25
+
+
+class ResultWriter:
+    """
+    Appends each result to the JSONL log right away (crash-safe), and to
+    the Parquet dataset in batches so it doesn't fill up with tiny files.
+
+    With a `ledger`, reports are marked extracted only once their batch is
+    in the dataset, so a run killed mid-batch redoes them (from the
+    response cache) instead of skipping them for good.
+    """
+
+    def __init__(self, dataset: FinancialDataset, ledger: ExtractionLedger | None = None):
+        self.dataset = dataset
+        self.ledger = ledger
+        self.rows: list[dict] = []
+        self.jobs: list[ReportJob] = []
+
+    def __call__(self, job: ReportJob):
+        result_dict = save_result(job)
+        self.rows.extend(flatten_record(result_dict))
+        self.jobs.append(job)
+        if len(self.rows) >= DATASET_BATCH_SIZE:
+            self.flush()
+
+    def flush(self):
+        self.dataset.append(self.rows)
+        self.rows = []
+        if self.ledger is not None:
+            for job in self.jobs:
+                job.state = ReportState.EXTRACTED
+                self.ledger.mark(job.document_url, job.state, sha256=job.sha256)
+        self.jobs = []
+
+
+def save_result(job: ReportJob) -> dict:
+    # Convert back to dict for saving
+    result_dict = job.result.model_dump()
+    result_dict["source_title"] = job.title  # Add metadata
+    result_dict["document_url"] = job.document_url
+    result_dict["pdf_sha256"] = job.sha256
+    result_dict["extraction_source"] = job.source
+
+    # Append to JSONL file (safer than rewriting a huge JSON array)
+    with open(OUTPUT_JSONL, "a", encoding="utf-8") as outfile:
+        json.dump(result_dict, outfile)
+        outfile.write("\n")
+
+    print(f"   -> SUCCESS! Saved data for {job.result.company_name}")
+    return result_dict
+
+
+def run_extraction(
+    input_csv: str = INPUT_CSV,
+    limits: StageLimits | None = None,
+    retry_failed: bool = False,
+    slice_pages: bool = False,
+    min_rule_confidence: float | None = None,
+    batch_size: int | None = None,
+):
+    """With `batch_size`, reports go to Gemini as batch jobs of that many requests."""
     client = genai.Client(api_key=settings.gemini_api_key)
 
     # Load rows to process
     reports = []
-    with open(INPUT_CSV, "r", encoding="utf-8") as f:
+    with open(input_csv, "r", encoding="utf-8") as f:
         reader = csv.DictReader(f)
         reports = list(reader)
 
-    print(f">>> Found {len(reports)} reports to process.")
-
-    for i, report in enumerate(reports):
-        title = report.get("title", "Unknown")
-        download_url = report.get("direct_download_url")
-
-        # Skip if no URL
-        if not download_url:
-            print(f"[{i + 1}] Skipping {title} (No URL)")
-            continue
-
-        print(f"\n[{i + 1}/{len(reports)}] Processing: {title}")
-
-        try:
-            # 1. Download Bytes to RAM
-            print("   -> Streaming PDF bytes...")
-            # Follow redirects=True is CRITICAL for Google Drive links
-            response = httpx.get(download_url, follow_redirects=True, timeout=120)
-            response.raise_for_status()
-
-            # 2. Upload to Gemini
-            print("   -> Uploading to Gemini Files API...")
-            file_stream = io.BytesIO(response.content)
-
-            uploaded_file = client.files.upload(
-                file=file_stream,
-                config=dict(mime_type="application/pdf", display_name=title),
-            )
-
-            # Wait for processing
-            while uploaded_file.state.name == "PROCESSING":
-                print("   -> Waiting for processing...")
-                time.sleep(2)
-                uploaded_file = client.files.get(name=uploaded_file.name)
-
-            if uploaded_file.state.name == "FAILED":
-                print("   -> Gemini Processing FAILED.")
-                continue
-
-            # 3. Generate Content (The Extraction)
-            print("   -> Extracting financial data...")
-            prompt = """
-            Analyze this financial report. Extract the specific values for the Income Statement, 
-            Balance Sheet, and Cash Flow statement for the most recent fiscal year available.
-            
-            If a field is not present, return null. 
-            Ensure you capture the correct scale (e.g. if 'in millions', extract the number as seen).
-            """
-
-            response = client.models.generate_content(
-                model="gemini-2.0-flash",  # Use 2.0-flash or 1.5-pro for best doc analysis
-                contents=[uploaded_file, prompt],
-                config={
-                    "response_mime_type": "application/json",
-                    "response_json_schema": FinancialReportExtraction.model_json_schema(),
-                },
-            )
-
-            # 4. Validate & Save
-            # We parse it to ensure it matches our model
-            data_obj = FinancialReportExtraction.model_validate_json(response.text)
-
-            # Convert back to dict for saving
-            result_dict = data_obj.model_dump()
-            result_dict["source_title"] = title  # Add metadata
-
-            # Append to JSONL file (safer than rewriting a huge JSON array)
-            with open(OUTPUT_JSONL, "a", encoding="utf-8") as outfile:
-                json.dump(result_dict, outfile)
-                outfile.write("\n")
-
-            print(f"   -> SUCCESS! Saved data for {data_obj.company_name}")
-
-            # 5. Cleanup (Save Quota!)
-            client.files.delete(name=uploaded_file.name)
-            print("   -> Cleanup: File deleted.")
-
-        except Exception as e:
-            print(f"   -> ERROR: {e}")
-            # Optional: Log error to a separate file
+    # Skip finished work using the ledger from previous runs
+    ledger = ExtractionLedger(LEDGER_PATH)
+    jobs = [
+        job
+        for job in jobs_from_reports(reports)
+        if ledger.should_process(job.document_url, retry_failed=retry_failed)
+    ]
+    print(f">>> Found {len(reports)} reports, {len(jobs)} left to extract.")
+    print(f">>> Ledger: {ledger.counts()}")
+
+    writer = ResultWriter(FinancialDataset(DATASET_DIR), ledger)
+    options = dict(
+        limits=limits,
+        on_result=writer,
+        ledger=ledger,
+        mark_extracted=False,
+        cache=ResponseCache(CACHE_DIR),
+        slice_pages=slice_pages,
+        min_rule_confidence=min_rule_confidence,
+    )
+    if batch_size:
+        pipeline = BatchExtractionPipeline(
+            client, PdfStore(STORE_DIR), batch_size=batch_size, **options
+        )
+    else:
+        pipeline = ExtractionPipeline(client, PdfStore(STORE_DIR), **options)
+    try:
+        asyncio.run(pipeline.run(jobs))
+    finally:
+        writer.flush()
+
+    failed = [job for job in jobs if job.error]
+    print(f">>> Done! {len(jobs) - len(failed)} extracted, {len(failed)} failed.")
+
+
+def main():
+    defaults = StageLimits()
+    parser = argparse.ArgumentParser(
+        description="Extract financial statements from annual reports with Gemini."
+    )
+    parser.add_argument("--download-workers", type=int, default=defaults.download)
+    parser.add_argument("--upload-workers", type=int, default=defaults.upload)
+    parser.add_argument("--wait-workers", type=int, default=defaults.wait)
+    parser.add_argument("--generate-workers", type=int, default=defaults.generate)
+    parser.add_argument("--queue-size", type=int, default=defaults.queue_size)
+    parser.add_argument(
+        "--retry-failed",
+        action="store_true",
+        help="Also retry reports marked failed (retryable ones are always retried).",
+    )
+    parser.add_argument(
+        "--slice-pages",
+        action="store_true",
+        help="Upload only the financial statement pages of each report.",
+    )
+    parser.add_argument(
+        "--min-rule-confidence",
+        type=float,
+        default=None,
+        help="Try the offline rule extractor first; send only reports below this confidence (0-1) to Gemini.",
+    )
+    parser.add_argument(
+        "--batch",
+        action="store_true",
+        help="Submit reports as Gemini batch jobs (slower, cheaper; for backfills).",
+    )
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    add_metrics_arguments(parser)
+    args = parser.parse_args()
+
+    with instrumented_run(args.trace, args.metrics_port):
+        run_extraction(
+            limits=StageLimits(
+                download=args.download_workers,
+                upload=args.upload_workers,
+                wait=args.wait_workers,
+                generate=args.generate_workers,
+                queue_size=args.queue_size,
+            ),
+            retry_failed=args.retry_failed,
+            slice_pages=args.slice_pages,
+            min_rule_confidence=args.min_rule_confidence,
+            batch_size=args.batch_size if args.batch else None,
+        )
 
 
 if __name__ == "__main__":
@@ -0,0 +1,311 @@
+import asyncio
+import email.utils
+import random
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from urllib.parse import urlsplit
+
+import httpx
+from google.genai import errors as genai_errors
+from playwright.async_api import Error as PlaywrightError
+
+from metrics import METRICS
+
+# API statuses worth trying again (quota, overload, outages).
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+# Statuses that mean "slow down" rather than "broken".
+THROTTLE_STATUS_CODES = {429}
+GEMINI_QUOTA_STATUS = "RESOURCE_EXHAUSTED"
+# How often callers waiting on a half-open circuit look for the trial's result.
+TRIAL_POLL_INTERVAL = 0.5
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an endpoint that has been failing."""
+
+
+def status_code(error: Exception) -> int | None:
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code
+    if isinstance(error, genai_errors.APIError):
+        return error.code
+    return None
+
+
+def is_retryable(error: Exception) -> bool:
+    """Transient network/API errors, browser timeouts, throttling and open circuits."""
+    if isinstance(
+        error, (httpx.TransportError, asyncio.TimeoutError, CircuitOpenError, PlaywrightError)
+    ):
+        return True
+    return status_code(error) in RETRYABLE_STATUS_CODES
+
+
+def is_throttled(error: Exception) -> bool:
+    if isinstance(error, genai_errors.APIError) and error.status == GEMINI_QUOTA_STATUS:
+        return True
+    return status_code(error) in THROTTLE_STATUS_CODES
+
+
+def _parse_seconds(value: str) -> float | None:
+    """ "17", "17s", "1.5s" or an HTTP date -> seconds from now."""
+    value = value.strip()
+    try:
+        return max(0.0, float(value.removesuffix("s")))
+    except ValueError:
+        pass
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+def _find_retry_delay(details) -> str | None:
+    """Digs `retryDelay` out of a Google RPC error's RetryInfo detail."""
+    if isinstance(details, dict):
+        if "retryDelay" in details:
+            return details["retryDelay"]
+        details = list(details.values())
+    if isinstance(details, list):
+        for item in details:
+            found = _find_retry_delay(item)
+            if found is not None:
+                return found
+    return None
+
+
+def retry_after(error: Exception | None) -> float | None:
+    """The server's requested wait: a Retry-After header or Gemini's RetryInfo."""
+    response = getattr(error, "response", None)
+    if isinstance(response, httpx.Response) and "retry-after" in response.headers:
+        return _parse_seconds(response.headers["retry-after"])
+    if isinstance(error, genai_errors.APIError):
+        delay = _find_retry_delay(error.details)
+        if delay is not None:
+            return _parse_seconds(delay)
+    return None
+
+
+def endpoint(url: str) -> str:
+    """Breakers and limiters are per host."""
+    return urlsplit(url).netloc or url
+
+
+@dataclass
+class RetryPolicy:
+    attempts: int = 5
+    base_delay: float = 1.0
+    max_delay: float = 60.0
+
+    def delay(self, attempt: int, error: Exception | None = None) -> float:
+        """
+        The server's Retry-After if it sent one, else exponential backoff with
+        full jitter (uniform in [0, base * 2^attempt]) so that workers that
+        failed together don't retry together.
+        """
+        hinted = retry_after(error)
+        if hinted is not None:
+            return min(hinted, self.max_delay)
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2**attempt))
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive retryable failures, so
+    callers back off instead of hammering a dead endpoint. After
+    `reset_timeout` seconds one trial call is let through (half-open): a
+    success closes the circuit, a failure opens it again. A trial that
+    never reports back (e.g. a cancelled task) is given up on after
+    another `reset_timeout`.
+    """
+
+    def __init__(
+        self, failure_threshold: int = 5, reset_timeout: float = 30.0, clock=time.monotonic
+    ):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.failures = 0
+        self.opened_at: float | None = None
+        self.trial_running = False
+        self.trial_started = 0.0
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if self.clock() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def _trial_in_flight(self) -> bool:
+        return self.trial_running and self.clock() - self.trial_started < self.reset_timeout
+
+    def wait_time(self) -> float:
+        """Seconds until check() lets a call through; 0 if it would now."""
+        state = self.state
+        if state == "open":
+            return self.opened_at + self.reset_timeout - self.clock()
+        if state == "half_open" and self._trial_in_flight():
+            return TRIAL_POLL_INTERVAL
+        return 0.0
+
+    def check(self, name: str = "endpoint"):
+        state = self.state
+        if state == "open" or (state == "half_open" and self._trial_in_flight()):
+            METRICS.inc("circuit_rejected", endpoint=name)
+            raise CircuitOpenError(f"Circuit open for {name}")
+        if state == "half_open":
+            self.trial_running = True
+            self.trial_started = self.clock()
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self.trial_running = False
+
+    def record_failure(self):
+        self.failures += 1
+        self.trial_running = False
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            self.opened_at = self.clock()
+
+
+class AdaptiveLimiter:
+    """
+    Concurrency limit that adapts to throttling (AIMD): halved on every
+    throttled call, raised by one after a limit's worth of successes.
+    Used as `async with limiter:` around each call.
+    """
+
+    def __init__(self, limit: int, minimum: int = 1, maximum: int | None = None):
+        self.limit = limit
+        self.minimum = minimum
+        self.maximum = maximum or limit
+        self.in_flight = 0
+        self.successes = 0
+        self._condition = asyncio.Condition()
+
+    async def __aenter__(self):
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.in_flight < self.limit)
+            self.in_flight += 1
+
+    async def __aexit__(self, *exc_info):
+        async with self._condition:
+            self.in_flight -= 1
+            self._condition.notify_all()
+
+    def on_success(self):
+        self.successes += 1
+        if self.successes >= self.limit and self.limit < self.maximum:
+            self.limit += 1
+            self.successes = 0
+
+    def on_throttle(self):
+        self.limit = max(self.minimum, self.limit // 2)
+        self.successes = 0
+
+
+class Resilience:
+    """
+    Retries, circuit breakers and adaptive concurrency shared by the
+    network clients. Each endpoint (host, or a name like "gemini") gets
+    its own breaker and limiter; one instance is meant to be shared by
+    every call to the same endpoints in a run.
+
+    Throttling (429s) only shrinks the limiter; the breaker counts real
+    failures. Calls made while a circuit is open wait for it to half-open
+    rather than failing, so an outage delays reports instead of dropping
+    them.
+    """
+
+    def __init__(
+        self,
+        policy: RetryPolicy | None = None,
+        concurrency: int = 8,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+    ):
+        self.policy = policy or RetryPolicy()
+        self.concurrency = concurrency
+        self.breakers: dict[str, CircuitBreaker] = defaultdict(
+            lambda: CircuitBreaker(failure_threshold, reset_timeout)
+        )
+        self.limiters: dict[str, AdaptiveLimiter] = {}
+
+    def limiter(self, name: str, limit: int | None = None) -> AdaptiveLimiter:
+        """The endpoint's limiter, created with `limit` (default `concurrency`)."""
+        if name not in self.limiters:
+            self.limiters[name] = AdaptiveLimiter(limit or self.concurrency)
+        return self.limiters[name]
+
+    def _failed(self, name: str, error: Exception, attempt: int) -> float:
+        """Books a failure; returns the delay before the next attempt or re-raises."""
+        if isinstance(error, CircuitOpenError):
+            raise error
+        if not is_retryable(error):
+            # e.g. a 404: the endpoint answered, the request was just bad.
+            self.breakers[name].record_success()
+            raise error
+        if is_throttled(error):
+            # The endpoint is up, just busy: slow down, don't trip the breaker.
+            METRICS.inc("throttled", endpoint=name)
+            if name in self.limiters:
+                self.limiters[name].on_throttle()
+        else:
+            breaker = self.breakers[name]
+            was_open = breaker.opened_at is not None
+            breaker.record_failure()
+            if not was_open and breaker.opened_at is not None:
+                METRICS.inc("circuit_opened", endpoint=name)
+        if attempt + 1 >= self.policy.attempts:
+            METRICS.inc("retries_exhausted", endpoint=name)
+            raise error
+        delay = self.policy.delay(attempt, error)
+        METRICS.inc("retries", endpoint=name)
+        METRICS.observe("retry_delay_seconds", delay, endpoint=name)
+        print(f"   -> Retrying {name} in {delay:.1f}s ({type(error).__name__}: {error})")
+        return delay
+
+    def _circuit_wait(self, name: str) -> float:
+        wait = self.breakers[name].wait_time()
+        if wait > 0:
+            METRICS.observe("circuit_wait_seconds", wait, endpoint=name)
+        return wait
+
+    async def call(self, name: str, fn, /, *args, **kwargs):
+        """Awaits `fn(*args, **kwargs)`, retrying transient failures."""
+        breaker = self.breakers[name]
+        limiter = self.limiter(name)
+        for attempt in range(self.policy.attempts):
+            while (wait := self._circuit_wait(name)) > 0:
+                await asyncio.sleep(wait)
+            breaker.check(name)
+            try:
+                async with limiter:
+                    result = await fn(*args, **kwargs)
+            except Exception as e:
+                await asyncio.sleep(self._failed(name, e, attempt))
+                continue
+            breaker.record_success()
+            limiter.on_success()
+            return result
+
+    def call_sync(self, name: str, fn, /, *args, **kwargs):
+        """Blocking form of call(), without the concurrency limiter."""
+        breaker = self.breakers[name]
+        for attempt in range(self.policy.attempts):
+            while (wait := self._circuit_wait(name)) > 0:
+                time.sleep(wait)
+            breaker.check(name)
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                time.sleep(self._failed(name, e, attempt))
+                continue
+            breaker.record_success()
+            return result
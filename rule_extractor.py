@@ -0,0 +1,380 @@
+import os
+import re
+from dataclasses import dataclass, field
+
+from pdf_slicer import find_statement_pages, read_page_texts, score_page
+from schemas import FinancialReportExtraction, FiscalPeriodData
+
+# Normalized line label -> schema field, per statement. Earlier synonyms are
+# the more specific ones; the first exact match on a page wins.
+FIELD_SYNONYMS: dict[str, dict[str, tuple[str, ...]]] = {
+    "income_statement": {
+        "revenue": (
+            "revenue",
+            "total revenue",
+            "revenue from contracts with customers",
+            "turnover",
+            "net sales",
+            "sales",
+        ),
+        "gross_profit": ("gross profit",),
+        "sga_expenses": (
+            "selling general and administrative expenses",
+            "administrative and other operating expenses",
+            "administrative expenses",
+        ),
+        "rd_expenses": ("research and development expenses", "research and development"),
+        "depreciation_and_amortization": (
+            "depreciation and amortisation",
+            "depreciation and amortization",
+        ),
+        "operating_income": (
+            "operating profit",
+            "profit from operations",
+            "operating income",
+            "earnings before interest and tax",
+        ),
+        "interest_expense": ("finance costs", "finance cost", "interest expense"),
+        "net_income": (
+            "profit for the year",
+            "net profit for the year",
+            "profit after tax",
+            "profit after taxation",
+            "net income",
+        ),
+        "eps_diluted": (
+            "diluted earnings per share",
+            "basic and diluted earnings per share",
+            "earnings per share basic and diluted",
+            "earnings per share",
+        ),
+        "weighted_average_shares": (
+            "weighted average number of ordinary shares",
+            "weighted average number of shares",
+        ),
+    },
+    "balance_sheet": {
+        "current_assets": ("total current assets", "current assets"),
+        "current_liabilities": ("total current liabilities", "current liabilities"),
+        "net_receivables": (
+            "trade and other receivables",
+            "trade receivables",
+            "accounts receivable",
+        ),
+        "total_assets": ("total assets",),
+        "short_term_debt": (
+            "short term borrowings",
+            "current portion of borrowings",
+            "borrowings current",
+        ),
+        "long_term_debt": ("long term borrowings", "non current borrowings", "borrowings"),
+        "total_liabilities": ("total liabilities",),
+        "total_equity": (
+            "total equity",
+            "total shareholders equity",
+            "equity attributable to owners of the company",
+        ),
+        "treasury_stock": ("treasury shares", "treasury stock"),
+    },
+    "cash_flow": {
+        "capital_expenditures": (
+            "purchase of property plant and equipment",
+            "purchase of property and equipment",
+            "additions to property plant and equipment",
+            "capital expenditure",
+        ),
+        # D&A is usually only broken out as an add-back in operating cash flow.
+        "depreciation_and_amortization": (
+            "depreciation and amortisation",
+            "depreciation and amortization",
+            "depreciation",
+        ),
+    },
+}
+
+# Shown in brackets as outflows/expenses; the schema wants the magnitude.
+ABSOLUTE_FIELDS = {
+    "sga_expenses",
+    "rd_expenses",
+    "depreciation_and_amortization",
+    "interest_expense",
+    "capital_expenditures",
+    "treasury_stock",
+}
+
+# Fields that have to be found for the report to skip the LLM.
+CORE_FIELDS = (
+    "income_statement.revenue",
+    "income_statement.operating_income",
+    "income_statement.net_income",
+    "balance_sheet.current_assets",
+    "balance_sheet.current_liabilities",
+    "balance_sheet.total_assets",
+    "balance_sheet.total_equity",
+    "balance_sheet.total_liabilities",
+)
+
+EXACT_MATCH_CONFIDENCE = 1.0
+PREFIX_MATCH_CONFIDENCE = 0.7
+# Assets = liabilities + equity within this tolerance confirms the balance sheet.
+BALANCE_TOLERANCE = 0.02
+
+NUMBER_TOKEN = re.compile(r"^\(?-?\d[\d,]*(?:\.\d+)?\)?$")
+NIL_TOKENS = {"-", "–", "—"}
+LABEL_JUNK = re.compile(r"[^a-z ]+")
+WHITESPACE = re.compile(r"\s+")
+# A column header line on its own: "2025 2024", "Notes 2025 2024",
+# "2025 KShs'000 2024 KShs'000". Title lines ("...year ended 30 June 2025")
+# have words before the year, so they don't match.
+YEAR_HEADER = re.compile(
+    r"^\s*(?:notes?\s+)?(20\d{2})(?:\s+\S+)?\s+(20\d{2})(?:\s+\S+)?\s*$",
+    re.IGNORECASE | re.MULTILINE,
+)
+
+SCALE_PATTERN = re.compile(
+    r"(?P<currency>kshs|kes|kes\.|shs|ushs|tzs|usd|us\$|\$)\s*['’`]?\s*"
+    r"(?P<scale>000|'000|millions?|mn|m|billions?|bn)\b",
+    re.IGNORECASE,
+)
+SCALE_NAMES = {
+    "000": "Thousands",
+    "'000": "Thousands",
+    "million": "Millions",
+    "millions": "Millions",
+    "mn": "Millions",
+    "m": "Millions",
+    "billion": "Billions",
+    "billions": "Billions",
+    "bn": "Billions",
+}
+CURRENCY_NAMES = {"kshs": "KShs", "kes": "KES", "kes.": "KES", "shs": "KShs", "us$": "USD", "$": "USD"}
+
+
+@dataclass
+class LineItem:
+    label: str
+    values: list[float | None]
+
+
+@dataclass
+class RuleExtraction:
+    result: FinancialReportExtraction | None
+    field_confidence: dict[str, float] = field(default_factory=dict)
+    confidence: float = 0.0
+
+
+def normalize_label(label: str) -> str:
+    return WHITESPACE.sub(" ", LABEL_JUNK.sub(" ", label.lower())).strip()
+
+
+def parse_number(token: str) -> float | None:
+    if token in NIL_TOKENS:
+        return None
+    negative = token.startswith("(") or token.startswith("-")
+    value = float(token.strip("()-").replace(",", ""))
+    return -value if negative else value
+
+
+def _is_note(token: str) -> bool:
+    return token.isdigit() and int(token) < 100
+
+
+def parse_line(line: str) -> LineItem | None:
+    """
+    Splits a statement line into its label and trailing value columns:
+    "Revenue 5 388,688.9 (335,414.2)" -> ("revenue", [388688.9, -335414.2]).
+    A small integer followed by a value column is taken as the note number,
+    unless that column is a small integer too ("17 15" is two values).
+    """
+    tokens = line.split()
+    numbers = []
+    while tokens and (NUMBER_TOKEN.match(tokens[-1]) or tokens[-1] in NIL_TOKENS):
+        numbers.insert(0, tokens.pop())
+
+    label = normalize_label(" ".join(tokens))
+    if not label or not numbers:
+        return None
+
+    if len(numbers) >= 2 and _is_note(numbers[0]) and not _is_note(numbers[1]):
+        numbers = numbers[1:]
+
+    return LineItem(label, [parse_number(token) for token in numbers])
+
+
+def match_field(label: str, synonyms: dict[str, tuple[str, ...]]) -> tuple[str, float] | None:
+    """Best schema field for a label, with the match's confidence."""
+    best = None
+    for field_name, names in synonyms.items():
+        for name in names:
+            if label == name:
+                return field_name, EXACT_MATCH_CONFIDENCE
+            if best is None and label.startswith(name + " "):
+                best = (field_name, PREFIX_MATCH_CONFIDENCE)
+    return best
+
+
+def detect_scale(text: str) -> tuple[str | None, str | None]:
+    """(currency, scale) from a header like "KShs '000" or "Shs million"."""
+    match = SCALE_PATTERN.search(text)
+    if not match:
+        return None, None
+    currency = CURRENCY_NAMES.get(match["currency"].lower(), match["currency"].upper())
+    return currency, SCALE_NAMES[match["scale"].lower().lstrip("'")]
+
+
+def detect_fiscal_years(text: str) -> tuple[int | None, int | None]:
+    """
+    (current, comparative) years from a "2025 2024" column header line.
+    Only a header whose comparative is the year before counts; anything
+    else gives (None, None) rather than a guess.
+    """
+    for match in YEAR_HEADER.finditer(text):
+        current, comparative = int(match[1]), int(match[2])
+        if comparative == current - 1:
+            return current, comparative
+    return None, None
+
+
+def extract_statement_values(
+    page_texts: list[str], pages: list[int], column: int = 0
+) -> dict[str, tuple[float, float]]:
+    """
+    Maps "<statement>.<field>" to (value, confidence) using the `column`-th
+    value column (0 = current year, 1 = comparative) of each statement page.
+    """
+    found: dict[str, tuple[float, float]] = {}
+    for i in pages:
+        scores = score_page(page_texts[i])
+        statement = max(scores, key=scores.get)
+        synonyms = FIELD_SYNONYMS[statement]
+
+        for line in page_texts[i].splitlines():
+            item = parse_line(line)
+            if item is None or len(item.values) <= column:
+                continue
+            match = match_field(item.label, synonyms)
+            value = item.values[column]
+            if match is None or value is None:
+                continue
+
+            field_name, confidence = match
+            if field_name in ABSOLUTE_FIELDS:
+                value = abs(value)
+            section = (
+                "income_statement"
+                if field_name == "depreciation_and_amortization"
+                else statement
+            )
+            key = f"{section}.{field_name}"
+            if key not in found or found[key][1] < confidence:
+                found[key] = (value, confidence)
+
+    return found
+
+
+def _check_balance(found: dict[str, tuple[float, float]]):
+    """Halves balance sheet confidence when assets != liabilities + equity."""
+    try:
+        assets = found["balance_sheet.total_assets"][0]
+        liabilities = found["balance_sheet.total_liabilities"][0]
+        equity = found["balance_sheet.total_equity"][0]
+    except KeyError:
+        return
+    if abs(assets - liabilities - equity) > BALANCE_TOLERANCE * abs(assets):
+        for key, (value, confidence) in found.items():
+            if key.startswith("balance_sheet."):
+                found[key] = (value, confidence / 2)
+
+
+def _sections(found: dict[str, tuple[float, float]]) -> dict[str, dict]:
+    sections: dict[str, dict] = {section: {} for section in FIELD_SYNONYMS}
+    for key, (value, _) in found.items():
+        section, field_name = key.split(".")
+        sections[section][field_name] = value
+    return sections
+
+
+def build_extraction(
+    found: dict[str, tuple[float, float]],
+    company_name: str,
+    fiscal_year: int,
+    currency_symbol: str,
+    scale: str,
+    comparative: FiscalPeriodData | None = None,
+) -> FinancialReportExtraction:
+    sections = _sections(found)
+    return FinancialReportExtraction(
+        company_name=company_name,
+        fiscal_year=fiscal_year,
+        currency_symbol=currency_symbol,
+        scale=scale,
+        income_statement=sections["income_statement"],
+        balance_sheet=sections["balance_sheet"],
+        cash_flow=sections["cash_flow"],
+        comparative=comparative,
+    )
+
+
+def build_comparative(
+    found: dict[str, tuple[float, float]], fiscal_year: int | None
+) -> FiscalPeriodData | None:
+    if fiscal_year is None or not found:
+        return None
+    sections = _sections(found)
+    return FiscalPeriodData(
+        fiscal_year=fiscal_year,
+        income_statement=sections["income_statement"],
+        balance_sheet=sections["balance_sheet"],
+        cash_flow=sections["cash_flow"],
+    )
+
+
+def extract_from_texts(
+    page_texts: list[str], company_name: str, fiscal_year: int | None = None
+) -> RuleExtraction:
+    pages = find_statement_pages(page_texts)
+    if not pages:
+        return RuleExtraction(result=None)
+
+    statement_text = "\n".join(page_texts[i] for i in pages)
+    currency, scale = detect_scale(statement_text)
+    # Guessing the scale could be off by 1000x: leave these to the LLM.
+    if scale is None:
+        return RuleExtraction(result=None)
+    current_year, comparative_year = detect_fiscal_years(statement_text)
+    fiscal_year = current_year or fiscal_year
+    if fiscal_year is None:
+        return RuleExtraction(result=None)
+
+    found = extract_statement_values(page_texts, pages)
+    _check_balance(found)
+
+    # The comparative column comes from the same lines at no extra cost.
+    comparative_found = extract_statement_values(page_texts, pages, column=1)
+    _check_balance(comparative_found)
+    comparative = build_comparative(comparative_found, comparative_year)
+
+    field_confidence = {key: confidence for key, (_, confidence) in found.items()}
+    confidence = sum(field_confidence.get(key, 0.0) for key in CORE_FIELDS) / len(CORE_FIELDS)
+
+    return RuleExtraction(
+        result=build_extraction(
+            found, company_name, fiscal_year, currency, scale, comparative
+        ),
+        field_confidence=field_confidence,
+        confidence=confidence,
+    )
+
+
+def extract_from_pdf(
+    path: str | os.PathLike, company_name: str, fiscal_year: int | None = None
+) -> RuleExtraction:
+    """
+    Rule-based first pass over a text-layer PDF. `confidence` (0-1) is the
+    mean confidence of the core fields. Scanned PDFs, and statements whose
+    currency and scale can't be read, come back with None.
+    """
+    page_texts = read_page_texts(path)
+    if not any(text.strip() for text in page_texts):
+        return RuleExtraction(result=None)
+    return extract_from_texts(page_texts, company_name, fiscal_year)
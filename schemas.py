@@ -63,6 +63,13 @@ class CashFlowData(BaseModel):
     )
 
 
+class FiscalPeriodData(BaseModel):
+    fiscal_year: int = Field(..., description="The fiscal year these figures are for.")
+    income_statement: IncomeStatementData
+    balance_sheet: BalanceSheetData
+    cash_flow: CashFlowData
+
+
 class FinancialReportExtraction(BaseModel):
     company_name: str = Field(..., description="The name of the company.")
     fiscal_year: int = Field(
@@ -80,3 +87,18 @@ class FinancialReportExtraction(BaseModel):
     income_statement: IncomeStatementData
     balance_sheet: BalanceSheetData
     cash_flow: CashFlowData
+
+    comparative: Optional[FiscalPeriodData] = Field(
+        None,
+        description="The prior-year comparative figures printed next to the current year, in the same currency and scale.",
+    )
+
+    def periods(self) -> list[FiscalPeriodData]:
+        """The current year followed by the comparative year, if extracted."""
+        current = FiscalPeriodData(
+            fiscal_year=self.fiscal_year,
+            income_statement=self.income_statement,
+            balance_sheet=self.balance_sheet,
+            cash_flow=self.cash_flow,
+        )
+        return [current, self.comparative] if self.comparative else [current]
@@ -0,0 +1,265 @@
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from dataset_store import DATASET_DIR, FinancialDataset, deduplicate, join_companies
+from normalization import normalize
+
+# Short aliases for the flattened dataset columns.
+IS = "income_statement."
+BS = "balance_sheet."
+CF = "cash_flow."
+
+# Beneish (1999) M-score coefficients for the 8-variable model.
+BENEISH_INTERCEPT = -4.84
+BENEISH_WEIGHTS = {
+    "dsri": 0.920,
+    "gmi": 0.528,
+    "aqi": 0.404,
+    "sgi": 0.892,
+    "depi": 0.115,
+    "sgai": -0.172,
+    "tata": 4.679,
+    "lvgi": -0.327,
+}
+# Above this the model flags a likely earnings manipulator.
+BENEISH_THRESHOLD = -1.78
+
+PIOTROSKI_SIGNALS = [
+    "f_roa_positive",
+    "f_fcf_positive",
+    "f_roa_improving",
+    "f_accruals",
+    "f_leverage_falling",
+    "f_liquidity_improving",
+    "f_no_dilution",
+    "f_margin_improving",
+    "f_turnover_improving",
+]
+
+
+def _ratio(numerator: pd.Series, denominator: pd.Series) -> pd.Series:
+    """numerator / denominator, NaN where the denominator is 0 or missing."""
+    return numerator / denominator.where(denominator != 0)
+
+
+def _sum_present(*columns: pd.Series) -> pd.Series:
+    """Row-wise sum treating missing as 0, NaN only if every input is missing."""
+    frame = pd.concat(columns, axis=1)
+    return frame.sum(axis=1, min_count=1)
+
+
+def company_key(df: pd.DataFrame) -> pd.Series:
+    return df["ticker"].fillna(df["company_name"])
+
+
+def compute_ratios(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Adds single-year ratios as columns, computed for every row at once:
+    ROE, ROA, current ratio, debt/equity, EBIT margin, FCF (operating
+    income minus capex, as a proxy) and interest cover.
+    """
+    out = df.copy()
+    revenue = df[IS + "revenue"]
+    operating_income = df[IS + "operating_income"]
+    total_assets = df[BS + "total_assets"]
+    total_equity = df[BS + "total_equity"]
+
+    out["total_debt"] = _sum_present(df[BS + "short_term_debt"], df[BS + "long_term_debt"])
+    out["roe"] = _ratio(df[IS + "net_income"], total_equity)
+    out["roa"] = _ratio(df[IS + "net_income"], total_assets)
+    out["current_ratio"] = _ratio(df[BS + "current_assets"], df[BS + "current_liabilities"])
+    out["debt_to_equity"] = _ratio(out["total_debt"], total_equity)
+    out["ebit_margin"] = _ratio(operating_income, revenue)
+    out["gross_margin"] = _ratio(df[IS + "gross_profit"], revenue)
+    out["asset_turnover"] = _ratio(revenue, total_assets)
+    out["fcf"] = operating_income - df[CF + "capital_expenditures"].fillna(0)
+    out["fcf_margin"] = _ratio(out["fcf"], revenue)
+    out["interest_cover"] = _ratio(operating_income, df[IS + "interest_expense"])
+    out["leverage"] = _ratio(df[BS + "long_term_debt"], total_assets)
+    out["receivables_to_sales"] = _ratio(df[BS + "net_receivables"], revenue)
+    out["sga_to_sales"] = _ratio(df[IS + "sga_expenses"], revenue)
+    out["depreciation_rate"] = _ratio(df[IS + "depreciation_and_amortization"], total_assets)
+    out["non_current_asset_share"] = 1 - _ratio(df[BS + "current_assets"], total_assets)
+    out["liabilities_to_assets"] = _ratio(df[BS + "total_liabilities"], total_assets)
+    out["accruals"] = _ratio(df[IS + "net_income"] - out["fcf"], total_assets)
+    return out
+
+
+def previous_year(df: pd.DataFrame, columns: list[str]) -> pd.DataFrame:
+    """
+    The same company's values for fiscal_year - 1, aligned to each row
+    (NaN where that year is missing). One sort plus a grouped shift.
+    """
+    ordered = df.assign(_key=company_key(df)).sort_values(["_key", "fiscal_year"])
+    grouped = ordered.groupby("_key", sort=False)
+    shifted = grouped[columns].shift(1)
+    consecutive = grouped["fiscal_year"].shift(1) == ordered["fiscal_year"] - 1
+    return shifted.where(consecutive).reindex(df.index)
+
+
+def piotroski_score(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Piotroski-style F-score (0-9) from the schema fields. Operating cash
+    flow isn't extracted, so the FCF proxy stands in for CFO. Signals
+    that can't be evaluated (e.g. no prior year) count as 0.
+    """
+    prior = previous_year(
+        df,
+        [
+            "roa",
+            "leverage",
+            "current_ratio",
+            "gross_margin",
+            "asset_turnover",
+            IS + "weighted_average_shares",
+        ],
+    )
+    out = df.copy()
+    out["f_roa_positive"] = df["roa"] > 0
+    out["f_fcf_positive"] = df["fcf"] > 0
+    out["f_roa_improving"] = df["roa"] > prior["roa"]
+    out["f_accruals"] = df["fcf"] > df[IS + "net_income"]
+    out["f_leverage_falling"] = df["leverage"] < prior["leverage"]
+    out["f_liquidity_improving"] = df["current_ratio"] > prior["current_ratio"]
+    out["f_no_dilution"] = (
+        df[IS + "weighted_average_shares"] <= prior[IS + "weighted_average_shares"]
+    )
+    out["f_margin_improving"] = df["gross_margin"] > prior["gross_margin"]
+    out["f_turnover_improving"] = df["asset_turnover"] > prior["asset_turnover"]
+    out["piotroski_f_score"] = out[PIOTROSKI_SIGNALS].sum(axis=1)
+    return out
+
+
+def beneish_score(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Beneish-style M-score. Without PP&E or CFO in the schema, AQI uses the
+    non-current share of assets, DEPI uses D&A over total assets and TATA
+    uses the FCF proxy. Missing indices are set to 1 (no change) and
+    missing TATA to 0, so `beneish_inputs` says how many were real.
+    """
+    prior = previous_year(
+        df,
+        [
+            "receivables_to_sales",
+            "gross_margin",
+            "non_current_asset_share",
+            IS + "revenue",
+            "depreciation_rate",
+            "sga_to_sales",
+            "liabilities_to_assets",
+        ],
+    )
+    components = pd.DataFrame(
+        {
+            "dsri": _ratio(df["receivables_to_sales"], prior["receivables_to_sales"]),
+            "gmi": _ratio(prior["gross_margin"], df["gross_margin"]),
+            "aqi": _ratio(df["non_current_asset_share"], prior["non_current_asset_share"]),
+            "sgi": _ratio(df[IS + "revenue"], prior[IS + "revenue"]),
+            "depi": _ratio(prior["depreciation_rate"], df["depreciation_rate"]),
+            "sgai": _ratio(df["sga_to_sales"], prior["sga_to_sales"]),
+            "tata": df["accruals"],
+            "lvgi": _ratio(df["liabilities_to_assets"], prior["liabilities_to_assets"]),
+        },
+        index=df.index,
+    )
+    inputs = components.notna().sum(axis=1)
+    components = components.fillna(1.0)
+    components["tata"] = df["accruals"].fillna(0.0)
+
+    weights = pd.Series(BENEISH_WEIGHTS)
+    out = df.copy()
+    out[[f"beneish_{name}" for name in weights.index]] = components[weights.index].to_numpy()
+    out["beneish_m_score"] = (
+        BENEISH_INTERCEPT + components[weights.index].to_numpy() @ weights.to_numpy()
+    )
+    out["beneish_inputs"] = inputs
+    out["beneish_flag"] = (out["beneish_m_score"] > BENEISH_THRESHOLD) & (inputs >= 6)
+    return out
+
+
+def score_universe(df: pd.DataFrame) -> pd.DataFrame:
+    """All ratios and scores for every company-year in the frame."""
+    return beneish_score(piotroski_score(compute_ratios(df)))
+
+
+def screen(
+    scored: pd.DataFrame,
+    filters: dict[str, tuple[float | None, float | None]] | None = None,
+    rank_by: dict[str, bool] | None = None,
+) -> pd.DataFrame:
+    """
+    Filters on (min, max) bounds per column (None = unbounded) with one
+    boolean mask, then ranks by the mean percentile of `rank_by` columns
+    (True = higher is better). Returns the passing rows, best first.
+    """
+    mask = np.ones(len(scored), dtype=bool)
+    for column, (low, high) in (filters or {}).items():
+        values = scored[column]
+        if low is not None:
+            mask &= (values >= low).to_numpy()
+        if high is not None:
+            mask &= (values <= high).to_numpy()
+    passed = scored.loc[mask].copy()
+
+    if rank_by:
+        ranks = pd.concat(
+            [
+                passed[column].rank(pct=True, ascending=higher)
+                for column, higher in rank_by.items()
+            ],
+            axis=1,
+        )
+        passed["value_rank"] = ranks.mean(axis=1)
+        passed = passed.sort_values("value_rank", ascending=False)
+
+    return passed
+
+
+# A classic quality-value screen: profitable, liquid, not over-levered.
+DEFAULT_FILTERS = {
+    "roe": (0.10, None),
+    "current_ratio": (1.0, None),
+    "debt_to_equity": (None, 1.5),
+    "interest_cover": (3.0, None),
+}
+DEFAULT_RANKING = {
+    "roe": True,
+    "ebit_margin": True,
+    "piotroski_f_score": True,
+    "debt_to_equity": False,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Screen the NSE universe.")
+    parser.add_argument("--year", type=int, default=None, help="Fiscal year to show.")
+    parser.add_argument("--top", type=int, default=20)
+    args = parser.parse_args()
+
+    # Uncompacted partitions can hold a year twice (own report + comparative).
+    df = deduplicate(FinancialDataset(DATASET_DIR).read())
+    # Absolute figures (FCF, debt) are only comparable in one currency and unit.
+    df = normalize(df)
+    scored = score_universe(df)
+    if args.year is not None:
+        scored = scored[scored["fiscal_year"] == args.year]
+
+    result = join_companies(screen(scored, DEFAULT_FILTERS, DEFAULT_RANKING))
+    columns = [
+        "ticker",
+        "company_name",
+        "fiscal_year",
+        "roe",
+        "ebit_margin",
+        "current_ratio",
+        "debt_to_equity",
+        "piotroski_f_score",
+        "beneish_m_score",
+    ]
+    print(result[columns].head(args.top).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,27 @@
+import pytest
+
+from benchmark import STAGES, BenchResult, regressions, run_stage
+
+
+@pytest.mark.parametrize("stage", list(STAGES))
+def test_every_stage_runs_offline(stage):
+    size = 1 if stage in ("nse_parse", "nse_parse_soup", "title_filter") else 3
+    result = run_stage(stage, repeat=2, size=size)
+
+    assert result.stage == stage
+    assert result.items > 0
+    assert len(result.samples) == 2
+    assert result.p50 <= result.p95
+    assert result.peak_rss_mb > 0
+
+
+def test_regressions_flags_slower_stages_only():
+    results = [
+        BenchResult("validate", 10, [0.10, 0.10], 50.0),
+        BenchResult("screening", 10, [0.20, 0.20], 50.0),
+    ]
+    baseline = {"validate": {"p50": 0.05}, "screening": {"p50": 0.19}}
+
+    assert regressions(results, baseline, tolerance=0.25) == [
+        "validate: p50 50.0ms -> 100.0ms"
+    ]
@@ -0,0 +1,140 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from playwright.async_api import Error as PlaywrightError
+
+from browser_pool import ATTRIBUTE_ONLY_RESOURCE_TYPES, BrowserPool, should_block
+
+MAIN_FRAME = SimpleNamespace(parent_frame=None)
+SUBFRAME = SimpleNamespace(parent_frame=MAIN_FRAME)
+
+
+def request(url, resource_type="document", frame=MAIN_FRAME):
+    return SimpleNamespace(
+        url=url,
+        resource_type=resource_type,
+        frame=frame,
+        is_navigation_request=lambda: resource_type == "document",
+    )
+
+
+def test_should_block():
+    page = "https://africanfinancials.com/document/ke-scom-2025-ar-00/"
+    preview = "https://drive.google.com/file/d/ABC/preview"
+
+    assert not should_block(request(page))
+    assert should_block(request("https://africanfinancials.com/logo.png", "image"))
+    assert should_block(request("https://www.googletagmanager.com/gtag/js", "script"))
+    assert not should_block(request("https://africanfinancials.com/app.js", "script"))
+    # Stylesheets decide what the listing shows, so they load unless asked.
+    assert not should_block(request("https://africanfinancials.com/site.css", "stylesheet"))
+    assert should_block(
+        request("https://africanfinancials.com/site.css", "stylesheet"),
+        ATTRIBUTE_ONLY_RESOURCE_TYPES,
+    )
+    assert not should_block(request(preview, frame=SUBFRAME))
+    assert should_block(request(preview, frame=SUBFRAME), block_subframes=True)
+
+
+class FakeRoute:
+    def __init__(self, request):
+        self.request = request
+        self.aborted = False
+
+    async def abort(self):
+        self.aborted = True
+
+    async def continue_(self):
+        pass
+
+
+class FakePage:
+    def __init__(self, context):
+        self.context = context
+
+    async def goto(self, url):
+        for req in (request(url), request(url + "logo.png", "image")):
+            await self.context.handler(FakeRoute(req))
+
+    def is_closed(self):
+        return self.context.closed
+
+
+class FakeContext:
+    def __init__(self):
+        self.handler = None
+        self.closed = False
+
+    async def route(self, pattern, handler):
+        self.handler = handler
+
+    async def new_page(self):
+        return FakePage(self)
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeBrowser:
+    def __init__(self):
+        self.contexts = []
+
+    async def new_context(self, **options):
+        self.contexts.append(FakeContext())
+        return self.contexts[-1]
+
+
+def test_pool_recycles_contexts_after_max_navigations():
+    browser = FakeBrowser()
+
+    async def run():
+        async with BrowserPool(size=2, max_navigations=3, browser=browser) as pool:
+
+            async def visit(i):
+                async with pool.page() as page:
+                    await page.goto(f"https://africanfinancials.com/{i}/")
+
+            await asyncio.gather(*(visit(i) for i in range(12)))
+            return pool.recycled
+
+    recycled = asyncio.run(run())
+
+    # 12 navigations over 2 contexts of 3 navigations each.
+    assert recycled == 4
+    assert len(browser.contexts) == 6
+    assert all(context.closed for context in browser.contexts)
+
+
+class CrashingBrowser(FakeBrowser):
+    """Refuses to open contexts while `crashed` is set."""
+
+    def __init__(self):
+        super().__init__()
+        self.crashed = False
+
+    async def new_context(self, **options):
+        if self.crashed:
+            raise PlaywrightError("Browser has been closed")
+        return await super().new_context(**options)
+
+
+def test_pool_keeps_its_slot_when_a_replacement_fails():
+    browser = CrashingBrowser()
+
+    async def run():
+        async with BrowserPool(size=1, max_navigations=1, browser=browser) as pool:
+            browser.crashed = True
+            with pytest.raises(PlaywrightError):
+                async with pool.page() as page:
+                    await page.goto("https://africanfinancials.com/1/")
+            browser.crashed = False
+
+            # Would block forever if the slot had been lost.
+            async with asyncio.timeout(1):
+                async with pool.page() as page:
+                    await page.goto("https://africanfinancials.com/2/")
+            return pool.recycled
+
+    assert asyncio.run(run()) == 2
+    assert len(browser.contexts) == 3
@@ -0,0 +1,75 @@
+import pandas as pd
+import pytest
+
+from company_master import (
+    COMPANIES_CSV,
+    COMPANIES_SNAPSHOT_CSV,
+    CompanyMaster,
+    default_companies_csv,
+    name_tokens,
+)
+from dataset_store import join_companies
+
+
+@pytest.fixture(scope="module")
+def master():
+    return CompanyMaster.from_csv()
+
+
+def test_name_tokens():
+    assert name_tokens("Car and General (K) Ltd") == name_tokens("Car & General Limited")
+    assert name_tokens("E.A.Cables PLC") == ("east", "africa", "cable")
+    assert name_tokens("B.O.C Kenya Ltd") == name_tokens("BOC Kenya Limited")
+
+
+def test_lookup_by_key(master):
+    assert master.lookup(isin="KE1000001402").ticker == "SCOM"
+    assert master.lookup(ticker="scom").ticker == "SCOM"
+    # NSE list symbols carry a board suffix that titles don't.
+    assert master.lookup(ticker="SKL").ticker == "SKL"
+
+
+@pytest.mark.parametrize(
+    "name, ticker",
+    [
+        ("Safaricom PLC", "SCOM"),
+        ("The Kenya Power & Lighting Company Plc", "KPLC"),
+        ("Co-operative Bank of Kenya Limited", "COOP"),
+        ("Uchumi Supermarkets Limited", "UCHM"),
+        ("Stanbic Holdings Plc", "SBIC"),
+        ("Centum Investment Company Plc", "CTUM"),
+    ],
+)
+def test_fuzzy_name_lookup(master, name, ticker):
+    assert master.lookup(name=name).ticker == ticker
+
+
+def test_unknown_names_do_not_match(master):
+    assert master.lookup(name="Nonexistent Mining Corp") is None
+    assert master.lookup(name="National Bank of Kenya Limited") is None
+
+
+def test_join_companies_falls_back_to_names():
+    df = pd.DataFrame(
+        {
+            "ticker": ["SCOM", "CFC", None],
+            "company_name": ["Safaricom PLC", "Stanbic Holdings Plc", "KCB Group PLC"],
+        }
+    )
+
+    joined = join_companies(df)
+
+    assert joined["listed_ticker"].tolist() == ["SCOM", "SBIC", "KCB"]
+    assert joined["isin"].tolist() == ["KE1000001402", "KE0000000091", "KE0000000315"]
+
+
+def test_refreshed_company_list_replaces_the_snapshot(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    assert default_companies_csv() == COMPANIES_SNAPSHOT_CSV
+
+    pd.DataFrame(
+        [{"Exchange": "NSE", "Sector": "Banking", "Symbol": "NEWB",
+          "ISIN": "KE9999999999", "Company": "New Bank Plc"}]
+    ).to_csv(COMPANIES_CSV, index=False)
+    assert default_companies_csv() == COMPANIES_CSV
+    assert CompanyMaster.from_csv().lookup(isin="KE9999999999").ticker == "NEWB"
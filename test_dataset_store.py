@@ -0,0 +1,77 @@
+import pyarrow.dataset as ds
+
+from dataset_store import FinancialDataset, flatten_record, join_companies
+
+RECORD = {
+    "company_name": "Safaricom PLC",
+    "fiscal_year": 2025,
+    "currency_symbol": "KShs",
+    "scale": "Millions",
+    "income_statement": {"revenue": 388688.9, "net_income": 45757.2},
+    "balance_sheet": {"total_assets": 515284.2},
+    "cash_flow": {"capital_expenditures": 60792.7},
+    "comparative": {
+        "fiscal_year": 2024,
+        "income_statement": {"revenue": 335414.2},
+        "balance_sheet": {"total_assets": 498765.4},
+        "cash_flow": {},
+    },
+    "source_title": "Safaricom PLC (SCOM.ke) 2025 Annual Report",
+    "document_url": "https://africanfinancials.com/document/ke-scom-2025-ar-00/",
+}
+
+
+def test_flatten_record_emits_one_row_per_year():
+    rows = flatten_record(RECORD)
+
+    assert [(row["fiscal_year"], row["is_comparative"]) for row in rows] == [
+        (2025, False),
+        (2024, True),
+    ]
+    assert rows[0]["ticker"] == "SCOM"
+    assert rows[0]["income_statement.revenue"] == 388688.9
+    assert rows[1]["balance_sheet.total_assets"] == 498765.4
+    assert rows[1]["income_statement.net_income"] is None
+
+
+def test_append_read_and_compact(tmp_path):
+    dataset = FinancialDataset(tmp_path)
+    dataset.append(flatten_record(RECORD))
+
+    # The 2025 report of next year restates 2025 as its comparative.
+    next_year = {
+        **RECORD,
+        "fiscal_year": 2026,
+        "income_statement": {"revenue": 400000.0},
+        "comparative": {
+            **RECORD["comparative"],
+            "fiscal_year": 2025,
+            "income_statement": {"revenue": 1.0},
+        },
+    }
+    dataset.append(flatten_record(next_year))
+
+    df = dataset.read(
+        columns=["ticker", "fiscal_year", "income_statement.revenue"],
+        filter=ds.field("fiscal_year") == 2025,
+    )
+    assert list(df.columns) == ["ticker", "fiscal_year", "income_statement.revenue"]
+    assert len(df) == 2
+
+    dataset.compact()
+
+    df = dataset.read()
+    assert sorted(df["fiscal_year"]) == [2024, 2025, 2026]
+    assert df.loc[df["fiscal_year"] == 2025, "income_statement.revenue"].item() == 388688.9
+    assert len(list((tmp_path / "fiscal_year=2025").glob("*.parquet"))) == 1
+    assert not list(tmp_path.rglob("*.tmp"))
+
+
+def test_join_companies(tmp_path):
+    dataset = FinancialDataset(tmp_path)
+    dataset.append(flatten_record(RECORD))
+
+    df = join_companies(dataset.read(columns=["ticker", "fiscal_year"]))
+
+    assert set(df["isin"]) == {"KE1000001402"}
+    assert set(df["sector"]) == {"TELECOMMUNICATION AND TECHNOLOGY"}
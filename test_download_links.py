@@ -0,0 +1,61 @@
+import csv
+
+import pytest
+
+import download_links
+from download_links import LinkCheckpoint, main_concurrent
+
+ROWS = [
+    {"title": f"Report {i}", "document_url": f"https://doc/{i}/"} for i in range(4)
+]
+
+
+def write_queue(path):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=["title", "document_url"])
+        writer.writeheader()
+        writer.writerows(ROWS)
+
+
+def test_checkpoint_survives_a_torn_last_line(tmp_path):
+    path = tmp_path / "links.jsonl"
+    checkpoint = LinkCheckpoint(path)
+    checkpoint.record("https://doc/0/", "https://drive/0")
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"document_url": "https://doc/1/", "direct_')
+
+    reloaded = LinkCheckpoint(path)
+
+    assert reloaded.links == {"https://doc/0/": "https://drive/0"}
+
+
+def test_each_link_is_persisted_as_it_is_found(tmp_path, monkeypatch):
+    queue, output, links = (tmp_path / n for n in ("queue.csv", "out.csv", "links.jsonl"))
+    write_queue(queue)
+    calls = []
+
+    async def killed_midway(doc_urls, workers, rate, on_found):
+        calls.append(doc_urls)
+        on_found(0, "https://drive/0")
+        on_found(2, "https://drive/2")
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(download_links, "resolve_download_urls", killed_midway)
+    with pytest.raises(KeyboardInterrupt):
+        main_concurrent(2, 1.0, str(queue), str(output), str(links))
+
+    async def resolve_rest(doc_urls, workers, rate, on_found):
+        calls.append(doc_urls)
+        for i in range(len(doc_urls)):
+            on_found(i, f"https://drive/{doc_urls[i].split('/')[-2]}")
+        return [f"https://drive/{url.split('/')[-2]}" for url in doc_urls]
+
+    monkeypatch.setattr(download_links, "resolve_download_urls", resolve_rest)
+    main_concurrent(2, 1.0, str(queue), str(output), str(links))
+
+    assert calls[1] == ["https://doc/1/", "https://doc/3/"]
+    with open(output, newline="", encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+    assert [row["direct_download_url"] for row in rows] == [
+        f"https://drive/{i}" for i in range(4)
+    ]
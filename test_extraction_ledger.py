@@ -0,0 +1,37 @@
+import httpx
+
+from extraction_ledger import ExtractionLedger, ReportState, classify_error
+
+
+def test_ledger_replays_latest_state(tmp_path):
+    path = tmp_path / "ledger.jsonl"
+    ledger = ExtractionLedger(path)
+    ledger.mark("https://doc/a", ReportState.UPLOADED, sha256="aaa")
+    ledger.mark("https://doc/a", ReportState.EXTRACTED, sha256="aaa")
+    ledger.mark("https://doc/b", ReportState.FAILED, error="ValidationError")
+    ledger.mark("https://doc/c", ReportState.RETRYABLE, error="ReadTimeout")
+
+    reloaded = ExtractionLedger(path)
+
+    assert reloaded.state("https://doc/a") == ReportState.EXTRACTED
+    assert reloaded.state("https://doc/a", sha256="bbb") == ReportState.PENDING
+    assert not reloaded.should_process("https://doc/a")
+    assert not reloaded.should_process("https://doc/b")
+    assert reloaded.should_process("https://doc/b", retry_failed=True)
+    assert reloaded.should_process("https://doc/c")
+    assert reloaded.should_process("https://doc/new")
+
+
+def test_classify_error():
+    request = httpx.Request("GET", "https://drive.test")
+    throttled = httpx.HTTPStatusError(
+        "429", request=request, response=httpx.Response(429, request=request)
+    )
+    missing = httpx.HTTPStatusError(
+        "404", request=request, response=httpx.Response(404, request=request)
+    )
+
+    assert classify_error(throttled) == ReportState.RETRYABLE
+    assert classify_error(httpx.ConnectTimeout("slow")) == ReportState.RETRYABLE
+    assert classify_error(missing) == ReportState.FAILED
+    assert classify_error(ValueError("bad json")) == ReportState.FAILED
@@ -0,0 +1,143 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+from extraction_ledger import ExtractionLedger, ReportState
+from gemini_batch import BatchExtractionPipeline
+from gemini_pipeline import jobs_from_reports
+from llm_cache import ResponseCache
+from test_gemini_pipeline import EXTRACTION, FakeClient, seeded_store
+
+
+class FakeBatches:
+    """Local stand-in for the batch service: each job succeeds on its second poll."""
+
+    def __init__(self, bad_urls=(), final_state="JOB_STATE_SUCCEEDED"):
+        self.bad_urls = set(bad_urls)
+        self.final_state = final_state
+        self.jobs = {}
+        self.polls = 0
+        # Cleared to make polls hang, like a run killed while waiting.
+        self.answering = asyncio.Event()
+        self.answering.set()
+
+    async def create(self, *, model, src, config):
+        name = f"batches/{len(self.jobs)}"
+        self.jobs[name] = src
+        return SimpleNamespace(name=name, state=SimpleNamespace(name="JOB_STATE_PENDING"))
+
+    async def get(self, *, name):
+        await self.answering.wait()
+        self.polls += 1
+        responses = []
+        for request in self.jobs[name]:
+            if request["metadata"]["document_url"] in self.bad_urls:
+                text = json.dumps({"company_name": "Truncated"})
+            else:
+                text = json.dumps(EXTRACTION)
+            responses.append(
+                SimpleNamespace(response=SimpleNamespace(text=text), error=None)
+            )
+        return SimpleNamespace(
+            name=name,
+            state=SimpleNamespace(name=self.final_state),
+            dest=SimpleNamespace(inlined_responses=responses),
+        )
+
+
+def batch_client(**kwargs) -> FakeClient:
+    client = FakeClient()
+    client.aio.batches = FakeBatches(**kwargs)
+    return client
+
+
+def reports(titles):
+    return [
+        {"title": t, "direct_download_url": f"https://files.test/{i}"}
+        for i, t in enumerate(titles)
+    ]
+
+
+def test_reports_are_extracted_in_batches(tmp_path):
+    titles = [f"Report {i}" for i in range(5)]
+    client = batch_client(bad_urls={"https://files.test/4"})
+    saved, errors = [], []
+    pipeline = BatchExtractionPipeline(
+        client,
+        seeded_store(tmp_path / "store", titles),
+        poll_interval=0,
+        batch_size=2,
+        batch_poll_interval=0,
+        on_result=saved.append,
+        on_error=errors.append,
+        cache=ResponseCache(tmp_path / "cache"),
+    )
+    asyncio.run(pipeline.run(jobs_from_reports(reports(titles))))
+
+    assert [len(src) for src in client.aio.batches.jobs.values()] == [2, 2, 1]
+    assert client.aio.models.calls == 0
+    assert sorted(job.title for job in saved) == titles[:4]
+    assert all(job.source == "gemini-batch" for job in saved)
+    assert [job.title for job in errors] == ["Report 4"]
+    assert "ValidationError" in errors[0].error
+    assert sorted(client.aio.files.deleted) == sorted(client.aio.files.uploaded)
+
+
+def test_failed_batch_marks_its_reports_retryable(tmp_path):
+    titles = ["A", "B"]
+    client = batch_client(final_state="JOB_STATE_EXPIRED")
+    errors = []
+    pipeline = BatchExtractionPipeline(
+        client,
+        seeded_store(tmp_path, titles),
+        poll_interval=0,
+        batch_poll_interval=0,
+        on_error=errors.append,
+    )
+    jobs = asyncio.run(pipeline.run(jobs_from_reports(reports(titles))))
+
+    assert [job.state.value for job in jobs] == ["retryable", "retryable"]
+    assert "JOB_STATE_EXPIRED" in errors[0].error
+
+
+def test_restarted_run_resumes_submitted_batches(tmp_path):
+    titles = ["A", "B", "C"]
+    client = batch_client()
+    ledger_path = tmp_path / "ledger.jsonl"
+
+    def run_pipeline(timeout=None):
+        saved = []
+        pipeline = BatchExtractionPipeline(
+            client,
+            seeded_store(tmp_path / "store", titles),
+            poll_interval=0,
+            batch_size=2,
+            batch_poll_interval=0,
+            on_result=saved.append,
+            ledger=ExtractionLedger(ledger_path),
+        )
+        jobs = jobs_from_reports(reports(titles))
+        asyncio.run(asyncio.wait_for(pipeline.run(jobs), timeout))
+        return saved
+
+    # Killed after submitting, while waiting on the batches.
+    client.aio.batches.answering = asyncio.Event()
+    try:
+        run_pipeline(timeout=0.5)
+    except TimeoutError:
+        pass
+    urls = [f"https://files.test/{i}" for i in range(3)]
+    ledger = ExtractionLedger(ledger_path)
+    assert {ledger.state(url) for url in urls} == {ReportState.SUBMITTED}
+
+    client.aio.batches.answering = asyncio.Event()
+    client.aio.batches.answering.set()
+    uploads = len(client.aio.files.uploaded)
+    saved = run_pipeline()
+
+    assert len(client.aio.batches.jobs) == 2
+    assert len(client.aio.files.uploaded) == uploads
+    assert sorted(job.title for job in saved) == titles
+    assert all(job.sha256 for job in saved)
+    ledger = ExtractionLedger(ledger_path)
+    assert {ledger.state(url) for url in urls} == {ReportState.EXTRACTED}
@@ -0,0 +1,222 @@
+import asyncio
+import hashlib
+import json
+from types import SimpleNamespace
+
+from extraction_ledger import ReportState
+from gemini_pipeline import ExtractionPipeline, StageLimits, jobs_from_reports
+from llm_cache import ResponseCache
+from pdf_store import PdfStore
+
+EXTRACTION = {
+    "company_name": "Safaricom PLC",
+    "fiscal_year": 2025,
+    "currency_symbol": "KShs",
+    "scale": "Millions",
+    "income_statement": {"revenue": 388688.9, "net_income": 45757.2},
+    "balance_sheet": {"total_assets": 515284.2, "total_equity": 224021.1},
+    "cash_flow": {"capital_expenditures": 60792.7},
+}
+
+
+class FakeFiles:
+    def __init__(self, fail_titles=(), upload_seconds=0.0):
+        self.fail_titles = set(fail_titles)
+        self.upload_seconds = upload_seconds
+        self.uploaded = {}
+        self.deleted = []
+        self.polls = 0
+        self.uploads_in_flight = 0
+        self.max_uploads_in_flight = 0
+
+    async def upload(self, *, file, config):
+        self.uploads_in_flight += 1
+        self.max_uploads_in_flight = max(self.max_uploads_in_flight, self.uploads_in_flight)
+        await asyncio.sleep(self.upload_seconds)
+        self.uploads_in_flight -= 1
+        name = f"files/{len(self.uploaded)}"
+        self.uploaded[name] = config["display_name"]
+        return SimpleNamespace(
+            name=name, uri=f"https://files.test/{name}", state=SimpleNamespace(name="PROCESSING")
+        )
+
+    async def get(self, *, name):
+        self.polls += 1
+        state = "FAILED" if self.uploaded[name] in self.fail_titles else "ACTIVE"
+        return SimpleNamespace(
+            name=name, uri=f"https://files.test/{name}", state=SimpleNamespace(name=state)
+        )
+
+    async def delete(self, *, name):
+        self.deleted.append(name)
+
+
+class FakeModels:
+    def __init__(self):
+        self.calls = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def generate_content(self, *, model, contents, config):
+        self.calls += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0.01)
+        self.in_flight -= 1
+        return SimpleNamespace(text=json.dumps(EXTRACTION))
+
+
+class FakeClient:
+    def __init__(self, fail_titles=()):
+        self.aio = SimpleNamespace(files=FakeFiles(fail_titles), models=FakeModels())
+
+
+def seeded_store(tmp_path, titles):
+    """Store that already holds a PDF for each title, so no HTTP is needed."""
+    store = PdfStore(tmp_path)
+    for title in titles:
+        pdf = f"%PDF-1.4 {title}".encode()
+        sha256 = hashlib.sha256(pdf).hexdigest()
+        path = store.path_for(sha256)
+        path.parent.mkdir(exist_ok=True)
+        path.write_bytes(pdf)
+        store.record(title, sha256)
+    return store
+
+
+def test_pipeline_extracts_every_report(tmp_path):
+    titles = [f"Report {i}" for i in range(6)]
+    reports = [
+        {"title": t, "direct_download_url": f"https://files.test/{i}"}
+        for i, t in enumerate(titles)
+    ] + [{"title": "No link", "direct_download_url": ""}]
+
+    client = FakeClient()
+    saved = []
+    pipeline = ExtractionPipeline(
+        client,
+        seeded_store(tmp_path, titles),
+        limits=StageLimits(generate=3, queue_size=2),
+        poll_interval=0,
+        on_result=saved.append,
+    )
+    jobs = asyncio.run(pipeline.run(jobs_from_reports(reports)))
+
+    assert len(jobs) == 6
+    assert sorted(job.title for job in saved) == titles
+    assert all(job.result.company_name == "Safaricom PLC" for job in jobs)
+    assert client.aio.models.max_in_flight > 1
+    assert sorted(client.aio.files.deleted) == sorted(client.aio.files.uploaded)
+
+
+def test_failed_processing_is_reported_and_cleaned_up(tmp_path):
+    titles = ["Good", "Bad"]
+    client = FakeClient(fail_titles={"Bad"})
+    errors = []
+    pipeline = ExtractionPipeline(
+        client,
+        seeded_store(tmp_path, titles),
+        poll_interval=0,
+        on_error=errors.append,
+    )
+    jobs = jobs_from_reports(
+        [{"title": t, "direct_download_url": "https://files.test/x"} for t in titles]
+    )
+    asyncio.run(pipeline.run(jobs))
+
+    assert [job.title for job in errors] == ["Bad"]
+    assert "FAILED" in jobs[1].error
+    assert jobs[0].result is not None
+    assert client.aio.models.calls == 1
+    assert len(client.aio.files.deleted) == 2
+
+
+def test_cached_reports_skip_the_api(tmp_path):
+    titles = ["Cached"]
+    reports = [{"title": "Cached", "direct_download_url": "https://files.test/0"}]
+    store = seeded_store(tmp_path / "store", titles)
+    cache = ResponseCache(tmp_path / "cache")
+
+    first = FakeClient()
+    asyncio.run(
+        ExtractionPipeline(first, store, poll_interval=0, cache=cache).run(
+            jobs_from_reports(reports)
+        )
+    )
+    second = FakeClient()
+    jobs = asyncio.run(
+        ExtractionPipeline(second, store, poll_interval=0, cache=cache).run(
+            jobs_from_reports(reports)
+        )
+    )
+
+    assert first.aio.models.calls == 1
+    assert second.aio.models.calls == 0
+    assert second.aio.files.uploaded == {}
+    assert jobs[0].result.company_name == "Safaricom PLC"
+
+
+def test_unreadable_pdfs_are_uploaded_whole(tmp_path):
+    # The seeded "PDFs" are only a header, which pypdf can't parse.
+    store = seeded_store(tmp_path, ["Broken"])
+    pipeline = ExtractionPipeline(FakeClient(), store, poll_interval=0, slice_pages=True)
+    jobs = asyncio.run(
+        pipeline.run(
+            jobs_from_reports([{"title": "Broken", "direct_download_url": "https://files.test/0"}])
+        )
+    )
+
+    assert jobs[0].result is not None
+    assert jobs[0].upload_path == jobs[0].path
+    assert not store.sliced_path(jobs[0].sha256).exists()
+
+
+def test_uploads_are_not_held_to_the_generate_limit(tmp_path):
+    titles = [f"Report {i}" for i in range(8)]
+    client = FakeClient()
+    client.aio.files = FakeFiles(upload_seconds=0.05)
+    pipeline = ExtractionPipeline(
+        client,
+        seeded_store(tmp_path, titles),
+        limits=StageLimits(upload=4, generate=2),
+        poll_interval=0,
+    )
+    asyncio.run(
+        pipeline.run(
+            jobs_from_reports(
+                [{"title": t, "direct_download_url": "https://files.test/x"} for t in titles]
+            )
+        )
+    )
+
+    assert client.aio.files.max_uploads_in_flight == 4
+
+
+def test_failing_result_handler_fails_only_that_report(tmp_path):
+    titles = ["Saved", "Unsaved"]
+    saved, errors = [], []
+
+    def on_result(job):
+        if job.title == "Unsaved":
+            raise OSError("disk full")
+        saved.append(job)
+
+    pipeline = ExtractionPipeline(
+        FakeClient(),
+        seeded_store(tmp_path, titles),
+        poll_interval=0,
+        on_result=on_result,
+        on_error=errors.append,
+    )
+    asyncio.run(
+        pipeline.run(
+            jobs_from_reports(
+                [{"title": t, "direct_download_url": "https://files.test/x"} for t in titles]
+            )
+        )
+    )
+
+    assert [job.title for job in saved] == ["Saved"]
+    assert [job.title for job in errors] == ["Unsaved"]
+    assert errors[0].state == ReportState.RETRYABLE
+    assert errors[0].error == "OSError: disk full"
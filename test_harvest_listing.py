@@ -0,0 +1,239 @@
+import asyncio
+import threading
+from contextlib import asynccontextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+
+import get_website_page_for_financial_report as harvest
+from get_website_page_for_financial_report import (
+    ChangeDetector,
+    harvest_concurrently,
+    harvest_incrementally,
+    listing_page_url,
+    read_queue,
+    upsert_queue,
+)
+from resilience import RetryPolicy
+
+TOTAL_PAGES = 5
+CARDS_PER_PAGE = 3
+
+
+def render_listing_page(page_num: int) -> str:
+    cards = "".join(
+        f"""
+        <div class="af20-news">
+            <h2><a href="/document/ke-t{page_num}-{i}/">Report {page_num}.{i}</a></h2>
+            <cite><a href="/company/ke-t{page_num}/">Company {page_num}</a></cite>
+        </div>"""
+        for i in range(CARDS_PER_PAGE)
+    )
+    # A hidden card, like the templates the live site keeps in the DOM.
+    hidden = '<div class="af20-news" style="display:none"><h2><a href="/x">Hidden</a></h2></div>'
+    links = "".join(
+        f'<a class="wpv-archive-pagination-link" href="?wpv_paged={n}">{n}</a>'
+        for n in range(1, TOTAL_PAGES + 1)
+    )
+    return f"<html><body>{cards}{hidden}<nav>{links}</nav></body></html>"
+
+
+class ListingHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        query = parse_qs(urlsplit(self.path).query)
+        page_num = int(query.get("wpv_paged", ["1"])[0])
+        body = render_listing_page(page_num) if page_num <= TOTAL_PAGES else ""
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.end_headers()
+        self.wfile.write(body.encode())
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def listing_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), ListingHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}/kenya-listed-company-documents/"
+    server.shutdown()
+
+
+def test_listing_page_url():
+    base = "https://example.com/docs/?wpv_view_count=7"
+    assert listing_page_url(base, 1) == base
+    assert listing_page_url(base, 3) == "https://example.com/docs/?wpv_view_count=7&wpv_paged=3"
+
+
+def test_harvest_concurrently_merges_in_page_order(listing_server):
+    rows = asyncio.run(harvest_concurrently(base_url=listing_server, workers=3))
+
+    assert len(rows) == TOTAL_PAGES * CARDS_PER_PAGE
+    assert [row["page_number"] for row in rows] == sorted(
+        row["page_number"] for row in rows
+    )
+    assert rows[0] == {
+        "title": "Report 1.0",
+        "document_url": "/document/ke-t1-0/",
+        "company_url": "/company/ke-t1/",
+        "page_number": 1,
+    }
+    assert all(row["title"] != "Hidden" for row in rows)
+
+
+def test_harvest_concurrently_respects_max_pages(listing_server):
+    rows = asyncio.run(
+        harvest_concurrently(base_url=listing_server, workers=2, max_pages=2)
+    )
+
+    assert {row["page_number"] for row in rows} == {1, 2}
+
+
+class StubPool:
+    def __init__(self, size):
+        pass
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        pass
+
+    @asynccontextmanager
+    async def page(self):
+        yield None
+
+
+def test_failed_listing_pages_are_retried_without_truncating(monkeypatch):
+    calls = {}
+
+    async def fetch_listing_page(page, base_url, page_num):
+        calls[page_num] = calls.get(page_num, 0) + 1
+        if page_num == 2 and calls[page_num] == 1:
+            raise PlaywrightTimeoutError("goto timed out")
+        if page_num == 3 and calls[page_num] < 3:
+            return []
+        if page_num == 4:
+            return []
+        return [{"title": f"Report {page_num}", "page_number": page_num}]
+
+    async def read_page_count(page):
+        return TOTAL_PAGES
+
+    monkeypatch.setattr(harvest, "BrowserPool", StubPool)
+    monkeypatch.setattr(harvest, "fetch_listing_page", fetch_listing_page)
+    monkeypatch.setattr(harvest, "read_page_count", read_page_count)
+    monkeypatch.setattr(harvest, "PAGE_RETRY_POLICY", RetryPolicy(attempts=3, base_delay=0))
+
+    rows = asyncio.run(harvest_concurrently(base_url="https://listing.test/", workers=2))
+
+    # Page 4 never loads, but page 5 after it is still harvested.
+    assert [row["page_number"] for row in rows] == [1, 2, 3, 5]
+    assert calls[4] == 3
+
+
+def card(url: str, title: str = "Report") -> dict:
+    return {"title": title, "document_url": url, "company_url": "/c/", "page_number": 1}
+
+
+def test_change_detector_stops_after_a_run_of_known_urls():
+    detector = ChangeDetector({"/a", "/b", "/c"}, stop_after=2)
+
+    assert detector.feed([card("/new1"), card("/a"), card("/new2")]) == [
+        card("/new1"),
+        card("/new2"),
+    ]
+    assert not detector.done
+    assert detector.feed([card("/b"), card("/c")]) == []
+    assert detector.done
+
+
+def test_upsert_queue(tmp_path):
+    queue = str(tmp_path / "queue.csv")
+    assert upsert_queue([card("/a", "Old title"), card("/b")], queue) == 2
+
+    added = upsert_queue([card("/new"), card("/a", "New title")], queue)
+
+    rows = read_queue(queue)
+    assert added == 1
+    assert [row["document_url"] for row in rows] == ["/new", "/a", "/b"]
+    assert rows[1]["title"] == "New title"
+
+
+def test_harvest_incrementally_stops_at_known_reports(listing_server, tmp_path):
+    queue = str(tmp_path / "queue.csv")
+    # Everything from page 2 on was harvested by an earlier run.
+    upsert_queue(
+        [
+            card(f"/document/ke-t{page_num}-{i}/")
+            for page_num in range(2, TOTAL_PAGES + 1)
+            for i in range(CARDS_PER_PAGE)
+        ],
+        queue,
+    )
+
+    rows = asyncio.run(
+        harvest_incrementally(base_url=listing_server, queue_csv=queue, stop_after=4)
+    )
+
+    assert [row["document_url"] for row in rows] == [
+        f"/document/ke-t1-{i}/" for i in range(CARDS_PER_PAGE)
+    ]
+    assert {row["page_number"] for row in rows} == {1}
+
+
+def stub_listing(monkeypatch, fetch_listing_page):
+    async def read_page_count(page):
+        return TOTAL_PAGES
+
+    monkeypatch.setattr(harvest, "BrowserPool", StubPool)
+    monkeypatch.setattr(harvest, "fetch_listing_page", fetch_listing_page)
+    monkeypatch.setattr(harvest, "read_page_count", read_page_count)
+    monkeypatch.setattr(harvest, "PAGE_RETRY_POLICY", RetryPolicy(attempts=3, base_delay=0))
+
+
+def test_incremental_harvest_retries_a_flaky_page(monkeypatch, tmp_path):
+    calls = {}
+
+    async def fetch_listing_page(page, base_url, page_num):
+        calls[page_num] = calls.get(page_num, 0) + 1
+        if page_num == 2 and calls[page_num] == 1:
+            raise PlaywrightTimeoutError("goto timed out")
+        if page_num == 3 and calls[page_num] < 3:
+            # Cards that didn't render in time, not the end of the list.
+            return []
+        return [card(f"/document/ke-t{page_num}/")]
+
+    stub_listing(monkeypatch, fetch_listing_page)
+
+    queue = str(tmp_path / "q.csv")
+    rows = asyncio.run(harvest_incrementally(base_url="https://listing.test/", queue_csv=queue))
+
+    assert [row["document_url"] for row in rows] == [
+        f"/document/ke-t{page_num}/" for page_num in range(1, TOTAL_PAGES + 1)
+    ]
+    assert calls == {1: 1, 2: 2, 3: 3, 4: 1, 5: 1}
+
+
+def test_incremental_harvest_saves_progress_before_giving_up(monkeypatch, tmp_path):
+    queue = str(tmp_path / "q.csv")
+
+    async def fetch_listing_page(page, base_url, page_num):
+        if page_num == 3:
+            return []
+        return [card(f"/document/ke-t{page_num}/")]
+
+    stub_listing(monkeypatch, fetch_listing_page)
+
+    with pytest.raises(RuntimeError, match="page 3"):
+        asyncio.run(harvest_incrementally(base_url="https://listing.test/", queue_csv=queue))
+
+    assert [row["document_url"] for row in read_queue(queue)] == [
+        "/document/ke-t1/",
+        "/document/ke-t2/",
+    ]
@@ -0,0 +1,113 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+import httpx
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+
+import iframe_resolver
+from iframe_resolver import extract_iframe_src, resolve_with_browser, resolve_with_http
+from resilience import RetryPolicy
+
+DOCUMENT_PAGE = """
+<html><body>
+    <iframe id="other" src="https://example.com/ad"></iframe>
+    <iframe id="annual-report" src="https://drive.google.com/file/d/ABC123/preview"
+        width="100%"></iframe>
+</body></html>
+"""
+
+
+def test_extract_iframe_src():
+    assert (
+        extract_iframe_src(DOCUMENT_PAGE)
+        == "https://drive.google.com/file/d/ABC123/preview"
+    )
+    assert extract_iframe_src("<html><body>No report</body></html>") is None
+
+
+def test_extract_iframe_src_lazy_loaded():
+    html = '<iframe id="annual-report" src="" data-src="https://drive.google.com/file/d/LAZY/preview">'
+    assert extract_iframe_src(html) == "https://drive.google.com/file/d/LAZY/preview"
+
+
+def test_resolve_with_http_keeps_input_order():
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.path == "/missing/":
+            return httpx.Response(200, text="<html></html>")
+        if request.url.path == "/broken/":
+            return httpx.Response(500)
+        return httpx.Response(
+            200,
+            text=f'<iframe id="annual-report" src="https://drive.google.com/file/d/{request.url.path.strip("/")}/preview">',
+        )
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            return await resolve_with_http(
+                [
+                    "https://site.test/one/",
+                    "https://site.test/missing/",
+                    "https://site.test/broken/",
+                    "https://site.test/two/",
+                ],
+                rate=1000,
+                client=client,
+            )
+
+    assert asyncio.run(run()) == [
+        "https://drive.google.com/uc?export=download&id=one",
+        None,
+        None,
+        "https://drive.google.com/uc?export=download&id=two",
+    ]
+
+
+class FlakyPage:
+    """Document page whose first load times out."""
+
+    loads = 0
+
+    async def goto(self, url, timeout):
+        FlakyPage.loads += 1
+        if FlakyPage.loads == 1:
+            raise PlaywrightTimeoutError("Timeout 60000ms exceeded.")
+        self.url = url
+
+    def locator(self, selector):
+        return self
+
+    async def wait_for(self, state, timeout):
+        pass
+
+    async def get_attribute(self, name):
+        return f"https://drive.google.com/file/d/{self.url.rstrip('/').rsplit('/', 1)[-1]}/preview"
+
+
+class StubPool:
+    def __init__(self, size, **options):
+        pass
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        pass
+
+    @asynccontextmanager
+    async def page(self):
+        yield FlakyPage()
+
+
+def test_resolve_with_browser_retries_timeouts(monkeypatch):
+    monkeypatch.setattr(iframe_resolver, "BrowserPool", StubPool)
+    monkeypatch.setattr(iframe_resolver, "BROWSER_RETRY_POLICY", RetryPolicy(base_delay=0))
+
+    links = asyncio.run(
+        resolve_with_browser(["https://site.test/one/", "https://site.test/two/"], rate=1000)
+    )
+
+    assert links == [
+        "https://drive.google.com/uc?export=download&id=one",
+        "https://drive.google.com/uc?export=download&id=two",
+    ]
+    assert FlakyPage.loads == 3
@@ -0,0 +1,32 @@
+import os
+import time
+
+from llm_cache import ResponseCache, cache_key
+
+
+def test_cache_key_changes_with_each_input():
+    base = cache_key("sha", "gemini-2.0-flash", "prompt", {"type": "object"})
+
+    assert base == cache_key("sha", "gemini-2.0-flash", "prompt", {"type": "object"})
+    assert base != cache_key("sha2", "gemini-2.0-flash", "prompt", {"type": "object"})
+    assert base != cache_key("sha", "gemini-2.5-flash", "prompt", {"type": "object"})
+    assert base != cache_key("sha", "gemini-2.0-flash", "prompt!", {"type": "object"})
+    assert base != cache_key("sha", "gemini-2.0-flash", "prompt", {"type": "array"})
+
+
+def test_eviction_drops_least_recently_used(tmp_path):
+    cache = ResponseCache(tmp_path, max_bytes=250)
+    cache.put("a", "x" * 100)
+    cache.put("b", "x" * 100)
+
+    # Make "a" recently used and "b" stale.
+    old = time.time() - 60
+    os.utime(tmp_path / "b.json", (old, old))
+    assert cache.get("a") is not None
+
+    cache.put("c", "x" * 100)
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.get("c") is not None
+    assert cache.size <= 250
@@ -0,0 +1,56 @@
+import json
+
+import httpx
+import pytest
+
+from metrics import Metrics
+
+
+def test_counters_and_histograms_are_kept_per_label():
+    metrics = Metrics()
+    metrics.inc("retries", endpoint="gemini")
+    metrics.inc("retries", endpoint="gemini")
+    metrics.inc("retries", endpoint="drive.google.com")
+    for value in (1.0, 2.0, 3.0):
+        metrics.observe("retry_delay_seconds", value, endpoint="gemini")
+
+    assert metrics.counter("retries", endpoint="gemini") == 2
+    assert metrics.counter("retries", endpoint="drive.google.com") == 1
+    assert metrics.values("retry_delay_seconds", endpoint="gemini") == [1.0, 2.0, 3.0]
+    assert 'retries{endpoint="gemini"}' in metrics.summary()
+
+
+def test_spans_are_timed_and_traced(tmp_path):
+    trace = tmp_path / "trace.jsonl"
+    metrics = Metrics()
+    metrics.open_trace(str(trace))
+
+    with metrics.span("gemini_generate", attrs={"title": "Report"}):
+        pass
+    with pytest.raises(ValueError):
+        with metrics.span("gemini_generate"):
+            raise ValueError("bad json")
+    metrics.close()
+
+    assert len(metrics.values("gemini_generate_seconds")) == 2
+    records = [json.loads(line) for line in trace.read_text().splitlines()]
+    assert [r["title"] for r in records if "title" in r] == ["Report"]
+    assert records[1]["error"] == "ValueError: bad json"
+
+
+def test_prometheus_endpoint():
+    metrics = Metrics()
+    metrics.inc("download_bytes", 1024)
+    metrics.observe("download_seconds", 0.5)
+    server = metrics.serve(port=0)
+    try:
+        response = httpx.get(f"http://127.0.0.1:{server.server_port}/metrics")
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    lines = response.text.splitlines()
+    assert "# TYPE download_bytes counter" in lines
+    assert "download_bytes 1024" in lines
+    assert 'download_seconds{quantile="0.5"} 0.5' in lines
+    assert "download_seconds_count 1" in lines
@@ -0,0 +1,80 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from normalization import FxTable, canonical_currency, canonical_scale, normalize
+
+FX = FxTable(
+    pd.DataFrame(
+        {
+            "currency": ["USD", "USD"],
+            "year_end": ["2023-12-31", "2024-12-31"],
+            "rate": [156.46, 129.29],
+        }
+    )
+)
+
+
+def test_canonical_values():
+    scales = pd.Series(["Millions", "KShs '000", "'000", "mn", "Bn", "lakhs", None])
+    currencies = pd.Series(["KShs", "Shs.", "$", "US$", "KES", "???", None])
+
+    assert list(canonical_scale(scales).astype(object)) == [
+        "Millions",
+        np.nan,
+        "Thousands",
+        "Millions",
+        "Billions",
+        np.nan,
+        np.nan,
+    ]
+    assert list(canonical_currency(currencies).astype(object)) == [
+        "KES",
+        "KES",
+        "USD",
+        "USD",
+        "KES",
+        np.nan,
+        np.nan,
+    ]
+
+
+def test_normalize_converts_to_base_units():
+    df = pd.DataFrame(
+        {
+            "fiscal_year": [2025, 2024, 2024, 2024],
+            "currency_symbol": ["KShs", "$", "$", "KShs"],
+            "scale": ["Millions", "Thousands", "Thousands", "furlongs"],
+            "fiscal_year_end": [None, "2024-12-31", "2024-06-30", None],
+            "income_statement.revenue": [388.0, 2.0, 2.0, 5.0],
+            "income_statement.eps_diluted": [1.1, 0.5, 0.5, 1.0],
+            "income_statement.weighted_average_shares": [40.0, 10.0, 10.0, 1.0],
+        }
+    )
+
+    out = normalize(df, FX)
+
+    assert out["income_statement.revenue"].iloc[0] == pytest.approx(388e6)
+    # December 2024 year-end uses the 2024 rate, June 2024 the 2023 one.
+    assert out["income_statement.revenue"].iloc[1] == pytest.approx(2e3 * 129.29)
+    assert out["income_statement.revenue"].iloc[2] == pytest.approx(2e3 * 156.46)
+    assert out["income_statement.eps_diluted"].iloc[1] == pytest.approx(0.5 * 129.29)
+    assert list(out["income_statement.weighted_average_shares"]) == [40, 10, 10, 1]
+    assert list(out["normalized"]) == [True, True, True, False]
+    assert np.isnan(out["income_statement.revenue"].iloc[3])
+
+
+def test_currency_missing_from_table_is_not_normalized():
+    df = pd.DataFrame(
+        {
+            "fiscal_year": [2024],
+            "currency_symbol": ["UGX"],
+            "scale": ["Millions"],
+            "income_statement.revenue": [10.0],
+        }
+    )
+
+    out = normalize(df, FX)
+
+    assert not out["normalized"].item()
+    assert np.isnan(out["income_statement.revenue"].item())
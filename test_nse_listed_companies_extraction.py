@@ -0,0 +1,70 @@
+import pytest
+
+from benchmark import NSE_HTML
+from nse_listed_companies_extraction import (
+    ListedCompany,
+    parse_listed_companies,
+    parse_nse_data,
+    parse_snapshots,
+)
+
+
+@pytest.fixture(scope="module")
+def page():
+    return NSE_HTML.read_text(encoding="utf-8")
+
+
+def test_lxml_matches_soup_on_fixture_page(page):
+    # The fixture page is rendered from the snapshot CSV, so checking it
+    # against that CSV would be circular. The soup parser, written against
+    # the live site, is the reference instead.
+    assert parse_nse_data(page, backend="lxml") == parse_nse_data(page, backend="soup")
+
+
+@pytest.mark.parametrize("backend", ["lxml", "soup"])
+def test_fixture_page_rows(page, backend):
+    rows = {row["Symbol"]: row for row in parse_nse_data(page, backend=backend)}
+
+    assert len(rows) == 64
+    assert rows["SCOM"] == {
+        "Exchange": "Nairobi Securities Exchange PLC",
+        "Sector": "TELECOMMUNICATION AND TECHNOLOGY",
+        "Symbol": "SCOM",
+        "ISIN": "KE1000001402",
+        "Company": "Safaricom PLC",
+    }
+    assert rows["EGAD"]["Company"] == "Eaagads Ltd"
+    assert rows["KCB"]["Sector"] == "BANKING"
+
+
+def test_lxml_matches_soup_on_edge_cases():
+    page = """
+    <div class="toggle default"><h3><a class="toggle-heading"> BANKING <i>+</i></a></h3>
+      <div class="nectar-animated-title"><h6>First Bank Ltd Ord 5.00 AIMS</h6></div>
+      <div class="nse_comptext"><p>Trading Symbol:&nbsp;FBL<!-- old: XYZ --><br>
+        ISIN Code: KE0000000001<script>var ISIN = "KE9";</script></p></div>
+      <div class="nse_comptext"><p>Suspended</p></div>
+    </div>
+    <div class="toggle"><p>No heading here</p>
+      <div class="nse_comptext">Trading Symbol: SKIP</div></div>
+    """
+
+    records = list(parse_listed_companies(page))
+
+    assert [r.as_row() for r in records] == parse_nse_data(page, backend="soup")
+    assert records[0] == ListedCompany(
+        "Nairobi Securities Exchange PLC", "BANKING+", "FBL", "KE0000000001", "First Bank Ltd"
+    )
+    assert records[1].symbol == "N/A"
+    assert records[1].company == "First Bank Ltd"
+
+
+@pytest.mark.parametrize("backend", ["lxml", "soup"])
+def test_parse_snapshots(tmp_path, page, backend):
+    for day in ("20250101", "20260101"):
+        (tmp_path / f"nse_{day}.html").write_text(page, encoding="utf-8")
+
+    df = parse_snapshots(sorted(str(p) for p in tmp_path.iterdir()), backend=backend)
+
+    assert len(df) == 2 * 64
+    assert df["Snapshot"].unique().tolist() == ["nse_20250101.html", "nse_20260101.html"]
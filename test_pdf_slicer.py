@@ -0,0 +1,115 @@
+from pypdf import PdfReader
+
+from pdf_slicer import find_statement_pages, score_page, slice_pdf
+
+
+def make_text_pdf(pages: list[list[str]]) -> bytes:
+    """Minimal PDF with one Helvetica text line per string, one page per list."""
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,  # page tree, filled in below
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    page_ids = []
+    for lines in pages:
+        ops = ["BT /F1 10 Tf 14 TL 40 800 Td"]
+        for line in lines:
+            escaped = line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+            ops.append(f"({escaped}) Tj T*")
+        ops.append("ET")
+        stream = "\n".join(ops).encode("latin-1")
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        content_id = len(objects)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_id
+        )
+        page_ids.append(len(objects))
+    kids = " ".join(f"{i} 0 R" for i in page_ids).encode()
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(page_ids))
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (
+        len(objects) + 1,
+        xref,
+    )
+    return bytes(out)
+
+
+NARRATIVE = ["Chairman's statement", "We had a good year and thank our staff."]
+INCOME_STATEMENT = [
+    "Consolidated statement of profit or loss",
+    "Revenue 388,688.9 335,414.2",
+    "Gross profit 287,607.6 250,102.3",
+    "Operating profit 104,050.1 99,870.0",
+    "Finance costs (30,131.5) (25,010.2)",
+    "Profit before tax 73,918.6 74,859.8",
+    "Income tax (28,161.4) (22,312.9)",
+    "Profit for the year 45,757.2 52,546.9",
+    "Earnings per share 1.70 1.56",
+]
+BALANCE_SHEET = [
+    "Consolidated statement of financial position",
+    "Trade and other receivables 22,842.1 19,560.0",
+    "Current assets 84,049.2 77,100.5",
+    "Total assets 515,284.2 498,765.4",
+    "Current liabilities 155,032.3 140,223.8",
+    "Borrowings 64,744.4 70,002.1",
+    "Total liabilities 291,263.1 280,111.0",
+    "Retained earnings 200,111.2 190,000.0",
+    "Total equity 224,021.1 218,654.4",
+]
+CASH_FLOW = [
+    "Consolidated statement of cash flows",
+    "Cash generated from operating activities 150,222.1 140,111.0",
+    "Depreciation 68,100.8 60,221.3",
+    "Purchase of property and equipment (60,792.7) (55,432.1)",
+    "Net cash used in investing activities (70,001.2) (61,234.0)",
+    "Net cash used in financing activities (50,222.0) (47,321.9)",
+    "Cash and cash equivalents 12,334.5 10,221.0",
+]
+
+
+def annual_report_pages() -> list[list[str]]:
+    return [NARRATIVE] * 6 + [INCOME_STATEMENT, BALANCE_SHEET, CASH_FLOW] + [NARRATIVE] * 6
+
+
+def test_statement_pages_outscore_narrative():
+    text = "\n".join(INCOME_STATEMENT)
+    narrative = "\n".join(NARRATIVE)
+
+    assert score_page(text)["income_statement"] > score_page(narrative)["income_statement"]
+    assert score_page(text)["income_statement"] > score_page(text)["balance_sheet"]
+
+
+def test_find_statement_pages():
+    texts = ["\n".join(lines) for lines in annual_report_pages()]
+
+    assert find_statement_pages(texts, spill_over=0) == [6, 7, 8]
+
+
+def test_slice_pdf_keeps_only_statement_pages(tmp_path):
+    src = tmp_path / "report.pdf"
+    src.write_bytes(make_text_pdf(annual_report_pages()))
+    dest = tmp_path / "sliced.pdf"
+
+    pages = slice_pdf(src, dest)
+
+    assert pages == [6, 7, 8, 9]
+    reader = PdfReader(dest)
+    assert len(reader.pages) == 4
+    assert "statement of profit or loss" in reader.pages[0].extract_text()
+
+
+def test_slice_pdf_skips_reports_without_statements(tmp_path):
+    src = tmp_path / "report.pdf"
+    src.write_bytes(make_text_pdf([NARRATIVE] * 4))
+
+    assert slice_pdf(src, tmp_path / "sliced.pdf") is None
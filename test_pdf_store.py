@@ -0,0 +1,112 @@
+import asyncio
+import hashlib
+
+import httpx
+
+from pdf_store import PdfStore, download_all, download_to_store
+
+PDF = b"%PDF-1.4\n" + bytes(range(256)) * 4000
+
+
+def range_handler(requests: list[httpx.Request]):
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        range_header = request.headers.get("range")
+        if range_header:
+            start = int(range_header.removeprefix("bytes=").rstrip("-"))
+            return httpx.Response(
+                206, content=PDF[start:], headers={"content-type": "application/pdf"}
+            )
+        return httpx.Response(200, content=PDF, headers={"content-type": "application/pdf"})
+
+    return handler
+
+
+def run_download(store: PdfStore, handler, title="Report", url="https://files.test/a"):
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            return await download_to_store(store, client, title, url)
+
+    return asyncio.run(run())
+
+
+def test_download_is_stored_by_hash(tmp_path):
+    store = PdfStore(tmp_path)
+    path = run_download(store, range_handler([]))
+
+    sha256 = hashlib.sha256(PDF).hexdigest()
+    assert path == store.path_for(sha256)
+    assert path.read_bytes() == PDF
+    assert PdfStore(tmp_path).lookup("Report") == path
+
+
+def test_partial_download_resumes_with_range(tmp_path):
+    store = PdfStore(tmp_path)
+    url = "https://files.test/a"
+    store.partial_path(url).write_bytes(PDF[:1000])
+
+    requests = []
+    path = run_download(store, range_handler(requests), url=url)
+
+    assert requests[0].headers["range"] == "bytes=1000-"
+    assert path.read_bytes() == PDF
+    assert not store.partial_path(url).exists()
+
+
+def test_drive_confirmation_page_is_followed(tmp_path):
+    warning_page = """
+    <form id="download-form" action="https://drive.usercontent.test/download" method="get">
+        <input type="hidden" name="id" value="XYZ">
+        <input type="hidden" name="confirm" value="t">
+    </form>"""
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.host == "drive.usercontent.test":
+            assert request.url.params["confirm"] == "t"
+            return httpx.Response(200, content=PDF, headers={"content-type": "application/pdf"})
+        return httpx.Response(200, text=warning_page, headers={"content-type": "text/html"})
+
+    path = run_download(PdfStore(tmp_path), handler)
+
+    assert path.read_bytes() == PDF
+
+
+def test_download_all_dedups_identical_files(tmp_path):
+    store = PdfStore(tmp_path)
+
+    async def run():
+        async with httpx.AsyncClient(
+            transport=httpx.MockTransport(range_handler([]))
+        ) as client:
+            return await download_all(
+                store,
+                [("A", "https://files.test/a"), ("B", "https://files.test/b")],
+                client=client,
+            )
+
+    paths = asyncio.run(run())
+
+    assert paths[0] == paths[1]
+    assert len(list(store.objects_dir.rglob("*.pdf"))) == 1
+
+
+def test_titles_sharing_a_link_download_it_once(tmp_path):
+    store = PdfStore(tmp_path)
+    requests = []
+
+    async def run():
+        async with httpx.AsyncClient(
+            transport=httpx.MockTransport(range_handler(requests))
+        ) as client:
+            return await download_all(
+                store,
+                [("Annual Report", "https://files.test/a"), ("Abridged", "https://files.test/a")],
+                client=client,
+            )
+
+    paths = asyncio.run(run())
+
+    assert len(requests) == 1
+    assert paths[0] == paths[1]
+    assert paths[0].read_bytes() == PDF
+    assert store.lookup("Abridged") == paths[0]
@@ -0,0 +1,102 @@
+import argparse
+import pathlib
+
+from company_master import COMPANIES_CSV, COMPANIES_SNAPSHOT_CSV
+from pipeline import Orchestrator, Stage, default_stages, filter_reports
+
+
+def copy_upper(stage: Stage):
+    text = pathlib.Path(stage.inputs[0]).read_text()
+    pathlib.Path(stage.outputs[0]).write_text(text.upper())
+
+
+def make_stages(tmp_path, calls: list[str]) -> list[Stage]:
+    raw, upper, final = (str(tmp_path / name) for name in ("raw", "upper", "final"))
+
+    def source(stage):
+        calls.append("source")
+        pathlib.Path(raw).write_text((tmp_path / "remote").read_text())
+
+    def step(stage):
+        calls.append(stage.name)
+        copy_upper(stage)
+
+    return [
+        # Declared out of order on purpose: the DAG comes from inputs/outputs.
+        Stage("final", step, inputs=[upper], outputs=[final]),
+        Stage("upper", step, inputs=[raw], outputs=[upper]),
+        Stage("source", source, outputs=[raw], always_run=True),
+    ]
+
+
+def test_orchestrator_skips_stages_with_unchanged_inputs(tmp_path):
+    (tmp_path / "remote").write_text("v1")
+    state = str(tmp_path / "state.json")
+    calls: list[str] = []
+
+    assert Orchestrator(make_stages(tmp_path, calls), state).run() == [
+        "source",
+        "upper",
+        "final",
+    ]
+    assert (tmp_path / "final").read_text() == "V1"
+
+    # Source re-runs but writes the same bytes: nothing downstream runs.
+    assert Orchestrator(make_stages(tmp_path, calls), state).run() == ["source"]
+
+    (tmp_path / "remote").write_text("v2")
+    assert Orchestrator(make_stages(tmp_path, calls), state).run() == [
+        "source",
+        "upper",
+        "final",
+    ]
+    assert (tmp_path / "final").read_text() == "V2"
+
+
+def test_orchestrator_only_and_force(tmp_path):
+    (tmp_path / "remote").write_text("v1")
+    state = str(tmp_path / "state.json")
+    calls: list[str] = []
+    Orchestrator(make_stages(tmp_path, calls), state).run()
+
+    ran = Orchestrator(make_stages(tmp_path, calls), state).run(
+        only={"upper", "final"}, force={"final"}
+    )
+
+    assert ran == ["final"]
+
+
+def test_filter_stage_streams_annual_reports(tmp_path):
+    queue = tmp_path / "queue.csv"
+    queue.write_text(
+        "title,document_url\n"
+        "Safaricom PLC (SCOM.ke) 2025 Annual Report,https://x/ke-scom-2025-ar-00/\n"
+        "Centum (CTUM.ke) HY2026 Interim Report,https://x/ke-ctum-2026-ir-hy/\n"
+        "KCB Group (KCB.ke) 2024 annual report,https://x/ke-kcb-2024-ar-00/\n"
+    )
+    output = tmp_path / "cleaned.csv"
+
+    filter_reports(Stage("filter", filter_reports, [str(queue)], [str(output)]))
+
+    lines = output.read_text().splitlines()
+    assert lines[0] == "title,document_url"
+    assert [line.split(",")[1] for line in lines[1:]] == [
+        "https://x/ke-scom-2025-ar-00/",
+        "https://x/ke-kcb-2024-ar-00/",
+    ]
+
+
+def test_companies_stage_refreshes_without_touching_the_snapshot():
+    args = argparse.Namespace(
+        link_workers=1,
+        link_rate=1.0,
+        extract_workers=1,
+        generate_workers=1,
+        slice_pages=False,
+        min_rule_confidence=None,
+    )
+    companies = {stage.name: stage for stage in default_stages(args)}["companies"]
+
+    assert companies.always_run
+    assert companies.outputs == [COMPANIES_CSV]
+    assert COMPANIES_SNAPSHOT_CSV not in companies.outputs
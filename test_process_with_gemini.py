@@ -0,0 +1,40 @@
+import os
+
+# settings.py reads the keys at import time.
+os.environ.setdefault("GEMINI_API_KEY", "test")
+os.environ.setdefault("OLLAMA_API_KEY", "test")
+
+import process_with_gemini  # noqa: E402
+from dataset_store import FinancialDataset  # noqa: E402
+from extraction_ledger import ExtractionLedger, ReportState  # noqa: E402
+from gemini_pipeline import ReportJob  # noqa: E402
+from process_with_gemini import ResultWriter  # noqa: E402
+from schemas import FinancialReportExtraction  # noqa: E402
+from test_gemini_pipeline import EXTRACTION  # noqa: E402
+
+
+def test_results_are_marked_extracted_only_once_written(tmp_path, monkeypatch):
+    monkeypatch.setattr(process_with_gemini, "OUTPUT_JSONL", str(tmp_path / "out.jsonl"))
+    ledger = ExtractionLedger(tmp_path / "ledger.jsonl")
+    dataset = FinancialDataset(tmp_path / "dataset")
+    writer = ResultWriter(dataset, ledger)
+
+    job = ReportJob(
+        index=0,
+        title="Safaricom PLC (SCOM.ke) 2025 Annual Report",
+        download_url="https://files.test/0",
+        document_url="https://africanfinancials.com/document/ke-scom-2025-ar-00/",
+        sha256="abc",
+        result=FinancialReportExtraction.model_validate(EXTRACTION),
+        source="gemini",
+    )
+    writer(job)
+
+    # Buffered: a crash now must leave the report to be redone.
+    assert ledger.state(job.document_url) == ReportState.PENDING
+    assert dataset.read().empty
+
+    writer.flush()
+
+    assert ledger.state(job.document_url, "abc") == ReportState.EXTRACTED
+    assert dataset.read()["ticker"].tolist() == ["SCOM"]
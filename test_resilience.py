@@ -0,0 +1,144 @@
+import asyncio
+
+import httpx
+import pytest
+from google.genai import errors as genai_errors
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+
+from resilience import (
+    AdaptiveLimiter,
+    CircuitBreaker,
+    CircuitOpenError,
+    Resilience,
+    RetryPolicy,
+    is_retryable,
+    retry_after,
+)
+
+
+def http_error(status: int, headers: dict | None = None) -> httpx.HTTPStatusError:
+    request = httpx.Request("GET", "https://example.com/report.pdf")
+    response = httpx.Response(status, headers=headers, request=request)
+    return httpx.HTTPStatusError("boom", request=request, response=response)
+
+
+def test_retry_after_reads_header_and_gemini_retry_info():
+    assert retry_after(http_error(503, {"Retry-After": "7"})) == 7.0
+
+    quota = genai_errors.ClientError(
+        429,
+        {
+            "error": {
+                "code": 429,
+                "status": "RESOURCE_EXHAUSTED",
+                "message": "Quota exceeded",
+                "details": [
+                    {"@type": "type.googleapis.com/google.rpc.RetryInfo", "retryDelay": "17s"}
+                ],
+            }
+        },
+    )
+    assert retry_after(quota) == 17.0
+    assert retry_after(http_error(500)) is None
+
+
+def test_breaker_opens_then_half_opens_after_timeout():
+    now = [0.0]
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10, clock=lambda: now[0])
+
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        breaker.check()
+
+    now[0] = 10.0
+    breaker.check()  # the single trial call
+    with pytest.raises(CircuitOpenError):
+        breaker.check()
+    breaker.record_success()
+    assert breaker.state == "closed"
+
+
+def test_limiter_halves_on_throttle_and_grows_back():
+    limiter = AdaptiveLimiter(8)
+    limiter.on_throttle()
+    limiter.on_throttle()
+    assert limiter.limit == 2
+
+    for _ in range(2):
+        limiter.on_success()
+    assert limiter.limit == 3
+
+
+def test_call_retries_transient_errors_only():
+    resilience = Resilience(RetryPolicy(attempts=3, base_delay=0))
+    calls = []
+
+    async def flaky():
+        calls.append(1)
+        if len(calls) < 3:
+            raise http_error(429)
+        return "ok"
+
+    async def missing():
+        raise http_error(404)
+
+    assert asyncio.run(resilience.call("example.com", flaky)) == "ok"
+    assert resilience.limiters["example.com"].limit < resilience.concurrency
+    with pytest.raises(httpx.HTTPStatusError):
+        asyncio.run(resilience.call("example.com", missing))
+
+
+def test_browser_timeouts_are_retryable():
+    assert is_retryable(PlaywrightTimeoutError("Timeout 60000ms exceeded."))
+    assert not is_retryable(ValueError("bad json"))
+
+
+def burst(status: int, failures: int):
+    """An endpoint that answers `status` to its first `failures` calls."""
+    calls = []
+
+    async def fetch(i):
+        calls.append(i)
+        failed = len(calls) <= failures
+        await asyncio.sleep(0)
+        if failed:
+            raise http_error(status)
+        return i
+
+    return fetch, calls
+
+
+def test_throttle_burst_does_not_open_the_circuit():
+    resilience = Resilience(
+        RetryPolicy(attempts=5, base_delay=0), concurrency=2, failure_threshold=5
+    )
+    fetch, calls = burst(429, failures=6)
+
+    async def run():
+        return await asyncio.gather(
+            *(resilience.call("drive.google.com", fetch, i) for i in range(50))
+        )
+
+    assert asyncio.run(run()) == list(range(50))
+    assert len(calls) == 56
+    assert resilience.breakers["drive.google.com"].state == "closed"
+
+
+def test_calls_wait_out_an_open_circuit_instead_of_failing():
+    resilience = Resilience(
+        RetryPolicy(attempts=5, base_delay=0),
+        concurrency=2,
+        failure_threshold=5,
+        reset_timeout=0.05,
+    )
+    fetch, calls = burst(503, failures=6)
+
+    async def run():
+        return await asyncio.gather(
+            *(resilience.call("example.com", fetch, i) for i in range(50))
+        )
+
+    assert asyncio.run(run()) == list(range(50))
+    assert resilience.breakers["example.com"].state == "closed"
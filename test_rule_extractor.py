@@ -0,0 +1,119 @@
+import pytest
+
+from rule_extractor import (
+    detect_fiscal_years,
+    detect_scale,
+    extract_from_pdf,
+    extract_from_texts,
+    parse_line,
+)
+from test_pdf_slicer import (
+    BALANCE_SHEET,
+    CASH_FLOW,
+    INCOME_STATEMENT,
+    NARRATIVE,
+    make_text_pdf,
+)
+
+HEADER = ["KShs millions", "2025 2024"]
+
+
+def test_parse_line():
+    item = parse_line("Revenue 5 388,688.9 (335,414.2)")
+
+    assert item.label == "revenue"
+    assert item.values == [388688.9, -335414.2]
+    assert parse_line("Profit for the year - 1,200").values == [None, 1200.0]
+    assert parse_line("2025 2024") is None
+    # Note reference with only a current-year column.
+    assert parse_line("Revenue 5 388,688.9").values == [388688.9]
+    assert parse_line("Earnings per share 17 15").values == [17.0, 15.0]
+
+
+def test_detect_scale():
+    assert detect_scale("All figures in KShs '000") == ("KShs", "Thousands")
+    assert detect_scale("Shs million") == ("KShs", "Millions")
+    assert detect_scale("No units here") == (None, None)
+
+
+def test_detect_fiscal_years_reads_the_column_header_only():
+    title = "Statement of profit or loss for the year ended 30 June 2025"
+
+    assert detect_fiscal_years(f"{title}\nNotes 2025 2024") == (2025, 2024)
+    assert detect_fiscal_years("2025 KShs'000 2024 KShs'000") == (2025, 2024)
+    assert detect_fiscal_years(f"{title}\n2025 2025") == (None, None)
+    assert detect_fiscal_years(title) == (None, None)
+
+
+def test_title_year_is_not_taken_for_the_current_column():
+    title = INCOME_STATEMENT[0] + " for the year ended 30 June 2025"
+    pages = [
+        "\n".join([title, "Notes 2025 2024", "KShs millions", *INCOME_STATEMENT[1:]]),
+        "\n".join([BALANCE_SHEET[0], *HEADER, *BALANCE_SHEET[1:]]),
+    ]
+
+    result = extract_from_texts(pages, company_name="Safaricom PLC").result
+
+    assert result.fiscal_year == 2025
+    assert result.income_statement.revenue == 388688.9
+    assert result.comparative.fiscal_year == 2024
+    assert result.comparative.income_statement.revenue == 335414.2
+
+
+def test_extract_from_pdf(tmp_path):
+    pages = [NARRATIVE] * 4 + [
+        [INCOME_STATEMENT[0], *HEADER, *INCOME_STATEMENT[1:]],
+        [BALANCE_SHEET[0], *HEADER, *BALANCE_SHEET[1:]],
+        [CASH_FLOW[0], *HEADER, *CASH_FLOW[1:]],
+    ]
+    path = tmp_path / "report.pdf"
+    path.write_bytes(make_text_pdf(pages))
+
+    extraction = extract_from_pdf(path, company_name="Safaricom PLC")
+    result = extraction.result
+
+    assert result.fiscal_year == 2025
+    assert (result.currency_symbol, result.scale) == ("KShs", "Millions")
+    assert result.income_statement.revenue == 388688.9
+    assert result.income_statement.interest_expense == 30131.5
+    assert result.income_statement.net_income == 45757.2
+    assert result.income_statement.depreciation_and_amortization == 68100.8
+    assert result.balance_sheet.total_assets == 515284.2
+    assert result.balance_sheet.net_receivables == 22842.1
+    assert result.cash_flow.capital_expenditures == 60792.7
+    assert extraction.confidence == pytest.approx(1.0)
+
+    comparative = result.comparative
+    assert comparative.fiscal_year == 2024
+    assert comparative.income_statement.revenue == 335414.2
+    assert comparative.balance_sheet.total_equity == 218654.4
+    assert comparative.cash_flow.capital_expenditures == 55432.1
+    assert [period.fiscal_year for period in result.periods()] == [2025, 2024]
+
+
+def test_unbalanced_balance_sheet_lowers_confidence(tmp_path):
+    broken = [line.replace("224,021.1", "24,021.1") for line in BALANCE_SHEET]
+    pages = [
+        [INCOME_STATEMENT[0], *HEADER, *INCOME_STATEMENT[1:]],
+        [broken[0], *HEADER, *broken[1:]],
+        [CASH_FLOW[0], *HEADER, *CASH_FLOW[1:]],
+    ] + [NARRATIVE] * 4
+    path = tmp_path / "report.pdf"
+    path.write_bytes(make_text_pdf(pages))
+
+    extraction = extract_from_pdf(path, company_name="Safaricom PLC")
+
+    assert extraction.field_confidence["balance_sheet.total_assets"] == 0.5
+    assert extraction.confidence < 0.8
+
+
+def test_statements_without_a_scale_are_left_to_the_llm():
+    pages = [
+        "\n".join([INCOME_STATEMENT[0], "2025 2024", *INCOME_STATEMENT[1:]]),
+        "\n".join([BALANCE_SHEET[0], "2025 2024", *BALANCE_SHEET[1:]]),
+    ]
+
+    extraction = extract_from_texts(pages, company_name="Safaricom PLC")
+
+    assert extraction.result is None
+    assert extraction.confidence == 0.0
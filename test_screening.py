@@ -0,0 +1,95 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from dataset_store import NUMERIC_COLUMNS
+from screening import score_universe, screen
+
+
+def company_year(ticker, year, **values):
+    row = {"ticker": ticker, "company_name": ticker, "fiscal_year": year}
+    row.update({column: np.nan for column in NUMERIC_COLUMNS})
+    row.update({column.replace("__", "."): value for column, value in values.items()})
+    return row
+
+
+@pytest.fixture
+def universe():
+    return pd.DataFrame(
+        [
+            company_year(
+                "SCOM", 2024,
+                income_statement__revenue=335.0, income_statement__gross_profit=240.0,
+                income_statement__operating_income=95.0, income_statement__net_income=52.0,
+                income_statement__interest_expense=25.0,
+                income_statement__weighted_average_shares=40.0,
+                balance_sheet__current_assets=77.0, balance_sheet__current_liabilities=140.0,
+                balance_sheet__total_assets=498.0, balance_sheet__total_equity=218.0,
+                balance_sheet__long_term_debt=70.0, balance_sheet__total_liabilities=280.0,
+                cash_flow__capital_expenditures=55.0,
+            ),
+            company_year(
+                "SCOM", 2025,
+                income_statement__revenue=388.0, income_statement__gross_profit=287.0,
+                income_statement__operating_income=104.0, income_statement__net_income=45.0,
+                income_statement__interest_expense=30.0,
+                income_statement__weighted_average_shares=40.0,
+                balance_sheet__current_assets=84.0, balance_sheet__current_liabilities=155.0,
+                balance_sheet__total_assets=515.0, balance_sheet__total_equity=224.0,
+                balance_sheet__short_term_debt=42.0, balance_sheet__long_term_debt=64.0,
+                balance_sheet__total_liabilities=291.0,
+                cash_flow__capital_expenditures=60.0,
+            ),
+            company_year(
+                "EGAD", 2025,
+                income_statement__revenue=10.0, income_statement__operating_income=-2.0,
+                income_statement__net_income=-3.0,
+                balance_sheet__current_assets=8.0, balance_sheet__current_liabilities=2.0,
+                balance_sheet__total_assets=50.0, balance_sheet__total_equity=45.0,
+            ),
+        ]
+    )
+
+
+def test_ratios(universe):
+    scored = score_universe(universe).set_index(["ticker", "fiscal_year"])
+    scom = scored.loc[("SCOM", 2025)]
+
+    assert scom["roe"] == pytest.approx(45 / 224)
+    assert scom["current_ratio"] == pytest.approx(84 / 155)
+    assert scom["debt_to_equity"] == pytest.approx((42 + 64) / 224)
+    assert scom["ebit_margin"] == pytest.approx(104 / 388)
+    assert scom["fcf"] == pytest.approx(104 - 60)
+    assert scom["interest_cover"] == pytest.approx(104 / 30)
+    assert np.isnan(scored.loc[("EGAD", 2025), "interest_cover"])
+
+
+def test_scores_use_the_previous_year(universe):
+    scored = score_universe(universe).set_index(["ticker", "fiscal_year"])
+
+    scom = scored.loc[("SCOM", 2025)]
+    assert scom["f_margin_improving"]  # 287/388 > 240/335
+    assert not scom["f_roa_improving"]
+    assert scom["beneish_sgi"] == pytest.approx(388 / 335)
+    assert scom["beneish_inputs"] >= 5
+
+    # First year on record: no year-over-year signals, neutral Beneish indices.
+    first = scored.loc[("SCOM", 2024)]
+    assert not first["f_roa_improving"]
+    assert first["beneish_sgi"] == 1.0
+
+
+def test_screen_filters_and_ranks(universe):
+    scored = score_universe(universe)
+
+    result = screen(
+        scored,
+        filters={"roe": (0.0, None)},
+        rank_by={"roe": True, "debt_to_equity": False},
+    )
+
+    assert list(zip(result["ticker"], result["fiscal_year"])) == [
+        ("SCOM", 2024),
+        ("SCOM", 2025),
+    ]
+    assert result["value_rank"].is_monotonic_decreasing
@@ -0,0 +1,70 @@
+import pandas as pd
+
+from title_parser import latest_revisions, parse_report, parse_reports
+
+REPORTS = pd.DataFrame(
+    {
+        "title": [
+            "Longhorn Publishers Plc (LKL.ke) 2025 Annual Report",
+            "Centum Investment Company Plc (CTUM.ke) HY2026 Interim Report",
+            "BK Group Plc (BKG.ke) Q32023 Interim Report",
+            "UNGA Group PLC HY2025 Interim Report",
+            "Eveready East Africa Limited (EVRD.ke) 2022 Annual Report",
+            "Car & General Limited (CGEN.ke) 2024 Annual Report",
+            "Car & General Limited (CGEN.ke) 2024 Annual Report",
+            "Board changes",
+        ],
+        "document_url": [
+            "https://africanfinancials.com/document/ke-lkl-2025-ar-00/",
+            "https://africanfinancials.com/document/ke-ctum-2026-ir-hy/",
+            "https://africanfinancials.com/document/ke-bkg-2023-ir-q3/",
+            "https://africanfinancials.com/document/ke-unga-2025-ir-hy/",
+            "https://africanfinancials.com/document/eveready-east-africa-limited-evrd-ke-2022-annual-report/",
+            "https://africanfinancials.com/document/ke-cgen-2024-ar-00/",
+            "https://africanfinancials.com/document/ke-cgen-2024-ar-00-2/",
+            "https://africanfinancials.com/news/board-changes/",
+        ],
+    }
+)
+
+
+def test_parse_reports():
+    parsed = parse_reports(REPORTS)
+
+    assert parsed["ticker"].tolist()[:7] == [
+        "LKL",
+        "CTUM",
+        "BKG",
+        "UNGA",
+        "EVRD",
+        "CGEN",
+        "CGEN",
+    ]
+    assert parsed["fiscal_year"].tolist()[:4] == [2025, 2026, 2023, 2025]
+    assert parsed["report_kind"].tolist()[:3] == ["annual", "interim", "interim"]
+    assert parsed["period"].tolist()[:4] == ["FY", "HY", "Q3", "HY"]
+    assert parsed["revision"].tolist()[5:7] == [1, 2]
+    assert parsed["company"][3] == "UNGA Group PLC"
+    assert str(parsed["fiscal_year"].dtype) == "Int16"
+    assert parsed.iloc[7].isna().all()
+
+
+def test_latest_revisions():
+    parsed = parse_reports(REPORTS).iloc[:7]
+
+    latest = latest_revisions(parsed)
+
+    assert list(latest.index) == [0, 1, 2, 3, 4, 6]
+
+
+def test_parse_report_matches_the_vectorized_parser():
+    parsed = parse_reports(REPORTS)
+
+    for i, row in REPORTS.iterrows():
+        info = parse_report(row["title"], row["document_url"])
+        expected = parsed.loc[i]
+        assert info.ticker == (None if pd.isna(expected["ticker"]) else expected["ticker"])
+        assert info.fiscal_year == (
+            None if pd.isna(expected["fiscal_year"]) else expected["fiscal_year"]
+        )
+        assert info.period == (None if pd.isna(expected["period"]) else expected["period"])
@@ -0,0 +1,53 @@
+import pandas as pd
+import pytest
+
+from company_master import COMPANIES_SNAPSHOT_CSV
+from utils import clean_company_name, clean_company_names
+
+
+@pytest.mark.parametrize(
+    "raw, expected",
+    [
+        ("Safaricom Plc Ord 0.05 AIMS", "Safaricom Plc"),
+        ("Kakuzi Plc ORD. 5.00", "Kakuzi Plc"),
+        ("Home Afrika Ltd.", "Home Afrika Ltd"),
+        ("Safaricom\xa0 PLC (SCOM.ke)", "Safaricom PLC"),
+        ("  BK Group   Plc (BKG.KE) ", "BK Group Plc"),
+        ("", ""),
+    ],
+)
+def test_clean_company_name(raw, expected):
+    assert clean_company_name(raw) == expected
+
+
+def test_nse_names_are_unchanged():
+    names = pd.read_csv(COMPANIES_SNAPSHOT_CSV, dtype=str, keep_default_na=False)["Company"]
+    listed = names + " Ord 5.00 AIMS"
+
+    assert [clean_company_name(name) for name in listed] == names.tolist()
+    assert clean_company_names(listed).tolist() == names.tolist()
+
+
+def test_batch_matches_scalar_and_keeps_nulls():
+    names = pd.Series(
+        ["Safaricom Plc Ord 0.05 AIMS", None, "Safaricom\xa0 PLC (SCOM.ke)", "Safaricom Plc Ord 0.05 AIMS"],
+        index=[10, 11, 12, 13],
+        name="listed_company_name",
+    )
+
+    cleaned = clean_company_names(names)
+
+    assert cleaned.index.tolist() == [10, 11, 12, 13]
+    assert cleaned.name == "listed_company_name"
+    assert cleaned.isna().tolist() == [False, True, False, False]
+    assert cleaned.dropna().tolist() == [clean_company_name(n) for n in names.dropna()]
+    assert clean_company_names(names.iloc[:0]).empty
+
+
+def test_batch_rejects_non_strings_like_scalar():
+    names = pd.Series(["Safaricom Plc", 1.5], dtype=object)
+
+    with pytest.raises(TypeError):
+        clean_company_name(1.5)
+    with pytest.raises(TypeError):
+        clean_company_names(names)
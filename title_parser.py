@@ -0,0 +1,139 @@
+import re
+from dataclasses import dataclass
+
+import pandas as pd
+
+# "Longhorn Publishers Plc (LKL.ke) 2025 Annual Report"
+# "Centum Investment Company Plc (CTUM.ke) HY2026 Interim Report"
+# "BK Group Plc (BKG.ke) Q32023 Interim Report"
+TITLE_PATTERN = re.compile(
+    r"""^\s*(?P<company>.*?)\s*
+    (?:\((?P<ticker>[A-Za-z0-9]+)\.ke\)\s*)?
+    (?P<period>HY|Q[1-4])?(?P<year>(?:19|20)\d{2})\s+
+    (?P<kind>Annual|Interim|Abridged|Presentation|Prospectus|Circular)\b""",
+    re.IGNORECASE | re.VERBOSE,
+)
+
+# https://africanfinancials.com/document/ke-lkl-2025-ar-00/
+# https://africanfinancials.com/document/ke-cgen-2024-ar-00-2/  (re-upload)
+SLUG_PATTERN = re.compile(
+    r"""/document/ke-(?P<ticker>[a-z0-9]+)-(?P<year>(?:19|20)\d{2})-
+    (?P<kind>ar|ir|ab|pr|ps|cr)-(?P<period>00|hy|q[1-4])(?:-(?P<revision>\d+))?/?$""",
+    re.IGNORECASE | re.VERBOSE,
+)
+
+REPORT_KINDS = ["annual", "interim", "abridged", "presentation", "prospectus", "circular"]
+PERIODS = ["FY", "HY", "Q1", "Q2", "Q3", "Q4"]
+
+SLUG_KINDS = {
+    "ar": "annual",
+    "ir": "interim",
+    "ab": "abridged",
+    "pr": "presentation",
+    "ps": "prospectus",
+    "cr": "circular",
+}
+SLUG_PERIODS = {"00": "FY", "hy": "HY", "q1": "Q1", "q2": "Q2", "q3": "Q3", "q4": "Q4"}
+
+COLUMNS = ["company", "ticker", "fiscal_year", "report_kind", "period", "revision"]
+
+
+def _typed(company, ticker, year, kind, period, revision, index) -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "company": company.astype("string"),
+            "ticker": ticker.astype("string").str.upper(),
+            "fiscal_year": pd.to_numeric(year).astype("Int16"),
+            "report_kind": pd.Categorical(kind, categories=REPORT_KINDS),
+            "period": pd.Categorical(period, categories=PERIODS),
+            "revision": pd.to_numeric(revision).astype("Int8"),
+        },
+        index=index,
+    )
+
+
+def parse_titles(titles: pd.Series) -> pd.DataFrame:
+    """One regex pass over a column of titles -> typed COLUMNS (revision is always 1)."""
+    parts = titles.astype("string").str.extract(TITLE_PATTERN)
+    kind = parts["kind"].str.lower()
+    # Full-year reports carry no HY/Qn prefix.
+    period = parts["period"].str.upper().fillna("FY").where(parts["year"].notna())
+    company = parts["company"].where(parts["company"] != "")
+    revision = pd.Series(1, index=titles.index).where(parts["year"].notna())
+    return _typed(
+        company, parts["ticker"], parts["year"], kind, period, revision, titles.index
+    )
+
+
+def parse_slugs(urls: pd.Series) -> pd.DataFrame:
+    """The same columns from document URL slugs like ke-lkl-2025-ar-00 (no company)."""
+    parts = urls.astype("string").str.extract(SLUG_PATTERN)
+    kind = parts["kind"].str.lower().map(SLUG_KINDS)
+    period = parts["period"].str.lower().map(SLUG_PERIODS)
+    revision = parts["revision"].fillna("1").where(parts["year"].notna())
+    company = pd.Series(pd.NA, index=urls.index, dtype="string")
+    return _typed(company, parts["ticker"], parts["year"], kind, period, revision, urls.index)
+
+
+def parse_reports(
+    df: pd.DataFrame, title: str = "title", url: str = "document_url"
+) -> pd.DataFrame:
+    """
+    Parses both the title and the URL slug of every row. The slug is the
+    site's own key so it wins; the title fills whatever the slug lacks
+    (old free-text slugs, the company name).
+    """
+    from_slug = parse_slugs(df[url]) if url in df else None
+    from_title = parse_titles(df[title]) if title in df else None
+    if from_slug is None:
+        return from_title
+    if from_title is None:
+        return from_slug
+    return from_slug.combine_first(from_title)[COLUMNS]
+
+
+def with_report_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """`df` with the parsed COLUMNS added (existing columns are kept)."""
+    parsed = parse_reports(df)
+    return df.join(parsed[[c for c in COLUMNS if c not in df]])
+
+
+def latest_revisions(parsed: pd.DataFrame) -> pd.DataFrame:
+    """Drops re-uploads (ke-...-ar-00-2), keeping the highest revision per report."""
+    key = ["ticker", "fiscal_year", "report_kind", "period"]
+    ordered = parsed.sort_values("revision", kind="stable")
+    return ordered[~ordered.duplicated(key, keep="last")].sort_index()
+
+
+@dataclass
+class ReportInfo:
+    company: str | None
+    ticker: str | None
+    fiscal_year: int | None
+    report_kind: str | None
+    period: str | None
+    revision: int | None
+
+
+def parse_report(title: str | None, document_url: str | None = None) -> ReportInfo:
+    """Single-record form of parse_reports, with the same patterns and precedence."""
+    info = ReportInfo(None, None, None, None, None, None)
+
+    title_match = TITLE_PATTERN.match(title or "")
+    if title_match:
+        info.company = title_match["company"] or None
+        info.ticker = title_match["ticker"] and title_match["ticker"].upper()
+        info.fiscal_year = int(title_match["year"])
+        info.report_kind = title_match["kind"].lower()
+        info.period = (title_match["period"] or "FY").upper()
+        info.revision = 1
+
+    slug_match = SLUG_PATTERN.search(document_url or "")
+    if slug_match:
+        info.ticker = slug_match["ticker"].upper()
+        info.fiscal_year = int(slug_match["year"])
+        info.report_kind = SLUG_KINDS[slug_match["kind"].lower()]
+        info.period = SLUG_PERIODS[slug_match["period"].lower()]
+        info.revision = int(slug_match["revision"] or 1)
+
+    return info
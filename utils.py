@@ -1,6 +1,24 @@
+import html
 import re
+from functools import lru_cache
 
 import httpx
+import numpy as np
+import pandas as pd
+
+from resilience import Resilience
+
+# Drive's "can't scan this file for viruses" page submits this form to get
+# the actual file.
+DRIVE_CONFIRM_FORM = re.compile(r"<form[^>]*download-form[^>]*>", re.IGNORECASE)
+FORM_ACTION = re.compile(r'action="([^"]+)"')
+HIDDEN_INPUT = re.compile(
+    r'<input[^>]*type="hidden"[^>]*name="([^"]+)"[^>]*value="([^"]*)"', re.IGNORECASE
+)
+
+# Shared by the blocking Drive helpers so their breaker sees every call.
+DRIVE_ENDPOINT = "drive.google.com"
+DRIVE_RESILIENCE = Resilience()
 
 
 def convert_to_download_url(drive_preview_url: str) -> str | None:
@@ -17,12 +35,83 @@ def convert_to_download_url(drive_preview_url: str) -> str | None:
     return None
 
 
+def drive_confirm_request(
+    page_html: str, cookies, url: str
+) -> tuple[str, dict[str, str]] | None:
+    """
+    Given Drive's virus-scan warning page, returns the (url, params) that
+    download the actual file, or None if the page isn't a warning page.
+    Handles both the confirm form and the older `download_warning` cookie.
+    """
+    form = DRIVE_CONFIRM_FORM.search(page_html)
+    if form:
+        action = FORM_ACTION.search(form.group(0))
+        if action:
+            params = {name: html.unescape(value) for name, value in HIDDEN_INPUT.findall(page_html)}
+            return html.unescape(action.group(1)), params
+
+    for key, value in cookies.items():
+        if key.startswith("download_warning"):
+            base = httpx.URL(url)
+            return str(base.copy_with(query=None)), {**dict(base.params), "confirm": value}
+
+    return None
+
+
+def stream_google_drive_file(file_id: str, dest_path, chunk_size: int = 1 << 20) -> int:
+    """
+    Streaming variant of get_google_drive_file_content: writes the file to
+    `dest_path` chunk by chunk instead of holding it in memory. Transient
+    failures are retried with backoff.
+
+    Returns:
+        int: Number of bytes written.
+    """
+    return DRIVE_RESILIENCE.call_sync(
+        DRIVE_ENDPOINT, _stream_google_drive_file, file_id, dest_path, chunk_size
+    )
+
+
+def _stream_google_drive_file(file_id: str, dest_path, chunk_size: int) -> int:
+    url = "https://drive.google.com/uc"
+    params = {"export": "download", "id": file_id}
+
+    with httpx.Client(follow_redirects=True, timeout=httpx.Timeout(30.0, read=300.0)) as client:
+        for _ in range(2):
+            with client.stream("GET", url, params=params) as response:
+                response.raise_for_status()
+
+                if "text/html" in response.headers.get("content-type", ""):
+                    response.read()
+                    confirm = drive_confirm_request(
+                        response.text, response.cookies, str(response.url)
+                    )
+                    if confirm is None:
+                        raise ValueError(f"Drive returned HTML instead of file {file_id}")
+                    url, params = confirm
+                    continue
+
+                written = 0
+                with open(dest_path, "wb") as f:
+                    for chunk in response.iter_bytes(chunk_size):
+                        f.write(chunk)
+                        written += len(chunk)
+                return written
+
+    raise ValueError(f"Drive kept returning the confirmation page for {file_id}")
+
+
 def get_google_drive_file_content(file_id: str) -> bytes:
     """
     Robustly downloads file content from Google Drive, handling:
     1. HTTP Redirects (Essential for Drive links)
     2. Large file virus scan confirmation tokens
+    3. Transient failures (retried with backoff)
     """
+    return DRIVE_RESILIENCE.call_sync(DRIVE_ENDPOINT, _get_google_drive_file_content, file_id)
+
+
+def _get_google_drive_file_content(file_id: str) -> bytes:
     url = "https://drive.google.com/uc"
     params = {"export": "download", "id": file_id}
 
@@ -69,19 +158,55 @@ def read_pdf_into_bytes(file_path):
         return None
 
 
+# " Ord 5.00 AIMS", "ORD. 0.50", " 1.25": share class / par value suffixes.
+SHARE_CLASS_SUFFIX = re.compile(
+    r"\s*(?:[O0]rd\.?|Ord\.?|ORD\.?)?\s*\d+(\.\d+)?\s*(?:AIMS|MIMS|MAIN)?$",
+    re.IGNORECASE,
+)
+TRAILING_PUNCTUATION = re.compile(r"[.,]\s*$")
+# Report titles and LLM output: "Safaricom PLC (SCOM.ke)", "Safaricom\xa0 PLC".
+TICKER_IN_PARENS = re.compile(r"\s*\([A-Za-z0-9]+\.ke\)", re.IGNORECASE)
+WHITESPACE_RUN = re.compile(r"\s+")
+# The same few thousand names recur across the NSE list, titles and LLM output.
+CLEAN_NAME_CACHE_SIZE = 65536
+
+
+@lru_cache(maxsize=CLEAN_NAME_CACHE_SIZE)
 def clean_company_name(raw_name: str) -> str:
-    # Normalize whitespace
-    name = raw_name.strip()
+    # Normalize whitespace (including non-breaking spaces and runs)
+    name = WHITESPACE_RUN.sub(" ", raw_name).strip()
+
+    # Drop a "(TICKER.ke)" tag copied from a report title
+    name = TICKER_IN_PARENS.sub("", name)
 
     # Remove trailing share class / par value info
-    name = re.sub(
-        r"\s*(?:[O0]rd\.?|Ord\.?|ORD\.?)?\s*\d+(\.\d+)?\s*(?:AIMS|MIMS|MAIN)?$",
-        "",
-        name,
-        flags=re.IGNORECASE,
-    )
+    name = SHARE_CLASS_SUFFIX.sub("", name)
 
     # Remove trailing punctuation
-    name = re.sub(r"[.,]\s*$", "", name)
+    name = TRAILING_PUNCTUATION.sub("", name)
 
     return name.strip()
+
+
+def clean_company_names(names: pd.Series) -> pd.Series:
+    """
+    clean_company_name over a whole column: each distinct name is cleaned
+    once with vectorized string ops, then mapped back. Nulls stay null;
+    other non-strings raise TypeError, as they do in clean_company_name.
+    """
+    codes, uniques = pd.factorize(names)
+    if pd.api.types.infer_dtype(uniques, skipna=True) not in ("string", "empty"):
+        bad = next(value for value in uniques if not isinstance(value, str))
+        raise TypeError(f"expected company names as str, got {type(bad).__name__}: {bad!r}")
+    cleaned = (
+        pd.Series(uniques, dtype=object)
+        .str.replace(WHITESPACE_RUN, " ", regex=True)
+        .str.strip()
+        .str.replace(TICKER_IN_PARENS, "", regex=True)
+        .str.replace(SHARE_CLASS_SUFFIX, "", regex=True)
+        .str.replace(TRAILING_PUNCTUATION, "", regex=True)
+        .str.strip()
+        .to_numpy(dtype=object)
+    )
+    values = np.where(codes >= 0, cleaned[codes] if len(cleaned) else None, None)
+    return pd.Series(values, index=names.index, name=names.name).astype(names.dtype)